@@ -0,0 +1,92 @@
+"""
+Caché de respuestas para la GraphCypherQAChain.
+
+La clave es la pregunta normalizada (sin mayúsculas, tildes, signos de
+puntuación ni espacios repetidos). Las entradas expiran por TTL, se desalojan
+por LRU cuando el caché se llena y se descartan todas cuando cambia la
+versión del grafo (ver graph_version.py). Las respuestas cuya consulta lee
+propiedades de estado (cansancio, recomendaciones) guardan además la versión
+de estado y dejan de servirse cuando la telemetría la cambia.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from graph_version import reads_state
+
+
+def normalize_question(question):
+    """
+    Normaliza una pregunta para usarla como clave de caché.
+    "¿Qué jugadores deben ser SUSTITUIDOS?" -> "que jugadores deben ser sustituidos"
+    """
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class AnswerCache:
+    """
+    Caché LRU + TTL de respuestas, invalidado por versión del grafo.
+    Es seguro para usar desde varias sesiones de Streamlit a la vez.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._graph_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, graph_version):
+        # Si el grafo cambió, ninguna respuesta guardada es confiable
+        if graph_version != self._graph_version:
+            self._entries.clear()
+            self._graph_version = graph_version
+
+    def get(self, question, graph_version, state_version=None):
+        """
+        Devuelve la respuesta guardada o None si no hay una vigente.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(graph_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, response, entry_state = entry
+            expired = time.monotonic() - stored_at > self.ttl_seconds
+            if expired or (entry_state is not None and entry_state != state_version):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, question, graph_version, response, state_version=None):
+        """
+        Guarda la respuesta de la cadena para esta pregunta.
+        """
+        key = normalize_question(question)
+        cypher = (response.get("intermediate_steps") or {}).get("query")
+        entry_state = state_version if reads_state(cypher) else None
+        with self._lock:
+            self._check_version(graph_version)
+            self._entries[key] = (time.monotonic(), response, entry_state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,216 +1,261 @@
 import streamlit as st
 import os
-import re
-from langchain_community.graphs import Neo4jGraph
-from langchain_community.chat_models import ChatOllama
-from langchain_community.chains.graph_qa.cypher import GraphCypherQAChain
-from langchain_core.prompts import PromptTemplate
-from langchain_core.callbacks.base import BaseCallbackHandler
+import time
+from contextlib import closing
 from neo4j.exceptions import AuthError, ServiceUnavailable
+from startup import ChainLoader, build_pipeline
+from qa_pipeline import InvalidCypherError
+from request_pool import RequestPool
+from metrics import MetricsRegistry
+from chat_history import ChatHistory, ChatStore, new_session_id
+from connections import get_settings, pool_stats as neo4j_pool_stats
+from graph_version import get_graph_version, get_state_version
+from substitution_board import SubstitutionBoard, urgency
 
 # --- 1. CONFIGURACIÓN (Tomada de PG6 y PG7) ---
 
-# Configuración de conexión a Neo4j (de tu script PG6)
-os.environ["NEO4J_URI"] = "neo4j://127.0.0.1:7687"
-os.environ["NEO4J_USERNAME"] = "neo4j"
-os.environ["NEO4J_PASSWORD"] = "neo4j123"
-OLLAMA_MODEL = "mistral"
-
-# PLANTILLA DE PROMPT CYPHER (La clave de tu PG6)
-CYPHER_PROMPT_TEMPLATE = PromptTemplate(
-    input_variables=["schema", "question"],
-    template="""You are a Neo4j Cypher expert. Generate ONLY valid Cypher syntax.
-
-CRITICAL RULES:
-- NEVER use SQL keywords: SELECT, FROM, JOIN, INSERT, UPDATE, DELETE
-- ALWAYS use Cypher keywords: MATCH, WHERE, RETURN
-- For exact matches use: {{property: 'value'}}
-- For partial matches use: WHERE property CONTAINS 'value'
-- NEVER use CONTAINS inside {{}}
-- Use exact property names from schema
-
-AVAILABLE NODES:
-- Jugador (properties: nombre)
-- EstadoFisico (properties: cansancio, ritmo_cardiaco)
-- Recomendacion (properties: accion)
-- Partido (properties: fecha, resultado)
-- Rival (properties: nombre)
-- JugadorRival (properties: nombre)
-
-RELATIONSHIPS:
-- (Jugador)-[:TIENE_ESTADO]->(EstadoFisico)
-- (EstadoFisico)-[:GENERA_RECOMENDACION]->(Recomendacion)
-- (Jugador)-[:JUEGA_EN]->(Partido)
-- (Partido)-[:ENFRENTA]->(Rival)
-- (Rival)-[:TIENE_JUGADOR_CLAVE]->(JugadorRival)
-
-EXAMPLES (copy these patterns EXACTLY):
-
-Question: ¿Qué jugadores deben ser sustituidos?
-Cypher: MATCH (j:Jugador)-[:TIENE_ESTADO]->()-[:GENERA_RECOMENDACION]->(r:Recomendacion)
-WHERE r.accion CONTAINS 'Sustitucion'
-RETURN j.nombre
-
-Question: ¿Cuál es el cansancio de Martinez?
-Cypher: MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico)
-WHERE j.nombre = 'Martinez'
-RETURN e.cansancio
-
-Question: ¿Qué rivales tenemos?
-Cypher: MATCH (r:Rival)
-RETURN r.nombre
-
-Question: ¿Quién es el jugador clave de Boca Unidos?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE r.nombre CONTAINS 'Boca Unidos'
-RETURN j.nombre
-
-Question: ¿Quién es el jugador estrella de Atletico Parana?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE r.nombre CONTAINS 'Atletico Parana'
-RETURN j.nombre
-
-Question: ¿Quién es el jugador clave de Atletico Parana?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE r.nombre CONTAINS 'Atletico Parana'
-RETURN j.nombre
-
-Question: ¿Qué información tenemos sobre Rodriguez?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE j.nombre CONTAINS 'Rodriguez'
-RETURN r.nombre AS Equipo, j.nombre AS Jugador
-
-Question: ¿Qué información tenemos sobre Fernandez?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE j.nombre CONTAINS 'Fernandez'
-RETURN r.nombre AS Equipo, j.nombre AS Jugador
-
-Question: ¿De qué equipo es Rodriguez?
-Cypher: MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)
-WHERE j.nombre CONTAINS 'Rodriguez'
-RETURN r.nombre
-
-Question: ¿Contra quién jugamos?
-Cypher: MATCH (p:Partido)-[:ENFRENTA]->(r:Rival)
-RETURN r.nombre
-
-Schema: {schema}
-Question: {question}
-
-Generate ONLY the Cypher query (no explanations). Use WHERE with CONTAINS for partial matches:
-"""
-)
-
-# PLANTILLA DE PROMPT DE RESPUESTA (La clave de tu PG6)
-QA_PROMPT_TEMPLATE = PromptTemplate(
-    input_variables=["question", "context"],
-    template="""
-Eres un asistente de Director Técnico de fútbol.
-Se te da una pregunta y el resultado de una consulta a la base de datos (Contexto).
-Debes responder la pregunta en español usando UNICAMENTE la información del contexto.
-Sé directo y conciso.
-Si el contexto está vacío, di que no encontraste información.
-
-Pregunta: {question}
-Contexto (Resultado de la consulta): {context}
-Respuesta:
-"""
-)
-
-
-# --- 2. LÓGICA DE LA APP (Cargando la Cadena) ---
-
-class CypherValidationCallback(BaseCallbackHandler):
-    """Callback para validar queries Cypher antes de ejecutarlas"""
-    
-    def on_tool_start(self, serialized, input_str, **kwargs):
-        """Se llama antes de ejecutar cada herramienta (incluido el query Cypher)"""
-        # Verificar si el input contiene un query Cypher
-        if isinstance(input_str, str):
-            query_upper = input_str.upper()
-            
-            # Palabras SQL prohibidas
-            sql_keywords = ['SELECT', 'FROM', 'JOIN', 'INSERT', 'UPDATE', 'DELETE', 'TABLE']
-            
-            for keyword in sql_keywords:
-                if keyword in query_upper:
-                    raise ValueError(
-                        f"❌ Error: Query inválido contiene sintaxis SQL '{keyword}'. "
-                        f"Solo se permite sintaxis Cypher (MATCH, WHERE, RETURN).\n\n"
-                        f"💡 Intenta reformular tu pregunta de forma más simple."
-                    )
-            
-            # Detectar CONTAINS dentro de llaves (sintaxis incorrecta)
-            if re.search(r'\{[^}]*CONTAINS[^}]*\}', input_str, re.IGNORECASE):
-                raise ValueError(
-                    "❌ Error: CONTAINS no puede usarse dentro de {{}}. "
-                    "Usa: MATCH (n:Node) WHERE n.property CONTAINS 'value'\n\n"
-                    "💡 Intenta reformular tu pregunta."
-                )
-
-def validate_cypher_query(query):
+# Conexión a Neo4j y Ollama: connections.py (conexiones.json o variables de entorno,
+# por defecto neo4j://127.0.0.1:7687 y mistral), compartida con la página de scouting
+CONNECTIONS = get_settings()
+OLLAMA_MODEL = CONNECTIONS.ollama_model
+
+# Caché de respuestas (preguntas repetidas no vuelven a pasar por Ollama)
+ANSWER_CACHE_MAX_ENTRIES = 256
+ANSWER_CACHE_TTL_SECONDS = 600
+# Caché de plantillas Cypher (una generación por forma de pregunta)
+CYPHER_CACHE_MAX_ENTRIES = 512
+# Mostrar la respuesta del LLM token a token en lugar de esperar el texto completo
+STREAM_ANSWERS = True
+# Responder resultados simples (un número, una lista corta) sin la segunda llamada al LLM
+FORMAT_SIMPLE_RESULTS = True
+# Ejecución compartida entre sesiones: hilos del pool y llamadas simultáneas a Ollama
+REQUEST_POOL_WORKERS = 4
+OLLAMA_MAX_CONCURRENCY = 1
+# Nuevos pedidos al LLM si el Cypher sigue inválido después de la reparación local
+CYPHER_MAX_RETRIES = 1
+# Ejemplos few-shot por pregunta en el prompt Cypher (los más parecidos, como máximo)
+CYPHER_FEW_SHOT_K = 3
+# Tope del resultado de las consultas generadas: filas y bytes (JSON) que llegan a la respuesta;
+# si no entran, Neo4j devuelve un resumen (total y valores más frecuentes) en lugar de filas
+RESULT_MAX_ROWS = 10
+RESULT_MAX_BYTES = 4000
+# Copia del grafo en memoria para la ruta rápida (se reexporta en segundo plano si cambia la versión del
+# grafo; con la versión de estado solo se releen los estados y recomendaciones que cambiaron)
+USE_GRAPH_SNAPSHOT = True
+# Historial del chat en SQLite (.chat_history.sqlite): mensajes dibujados por rerun y página de anteriores
+CHAT_WINDOW = 20
+CHAT_PAGE_SIZE = 20
+# Tablero de sustituciones: cada cuántos segundos se refresca el panel (sin volver a correr el chat)
+SUBSTITUTION_BOARD_REFRESH_SECONDS = 5
+# Métricas por etapa en formato Prometheus: archivo (.metrics.prom) y, si hay puerto, /metrics por HTTP
+METRICS_PORT = int(os.environ.get("DT_METRICS_PORT", "0")) or None
+
+@st.cache_resource
+def get_metrics():
     """
-    Valida que la consulta sea Cypher válido y no SQL.
-    Retorna (es_valido, mensaje_error)
+    Registro de métricas que usa el callback de cada pregunta. Se crea (y se
+    abre el puerto de /metrics) una sola vez, aunque se reintente la conexión.
     """
-    query_upper = query.upper()
-    
-    # Palabras prohibidas de SQL
-    sql_keywords = ['SELECT', 'FROM', 'JOIN', 'INSERT', 'UPDATE', 'DELETE', 'TABLE']
-    
-    for keyword in sql_keywords:
-        if keyword in query_upper:
-            return False, f"❌ Error: La consulta contiene sintaxis SQL '{keyword}'. Solo se permite sintaxis Cypher (MATCH, WHERE, RETURN)."
-    
-    # Validar que tenga al menos MATCH o CREATE/MERGE
-    if 'MATCH' not in query_upper and 'CREATE' not in query_upper and 'MERGE' not in query_upper:
-        return False, "❌ Error: La consulta debe contener al menos MATCH, CREATE o MERGE."
-    
-    return True, ""
+    metrics = MetricsRegistry()
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    return metrics
 
 # Usamos cache_resource para no reconectar/recargar todo cada vez
 @st.cache_resource
 def load_chain():
     """
-    Carga la GraphCypherQAChain con las plantillas personalizadas.
+    Arranca en segundo plano la conexión a Neo4j (schema incluido) y el
+    precalentamiento de Ollama. Devuelve el ChainLoader sin esperar.
+    Si la conexión falla, se descarta del caché (ver más abajo) para reintentar.
     """
-    try:
-        # 1. Conectar al Grafo
-        graph = Neo4jGraph()
-        graph.refresh_schema()
-        
-    except AuthError:
-        st.error("ERROR: Autenticación de Neo4j fallida. Revisa tu contraseña en el script.")
-        st.stop()
-    except ServiceUnavailable:
-        st.error("ERROR: No se pudo conectar a Neo4j. Asegúrate de que la base de datos esté corriendo en 'neo4j://127.0.0.1:7687'.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Error inesperado al conectar con Neo4j: {e}")
-        st.stop()
+    return ChainLoader(settings=CONNECTIONS, metrics=get_metrics()).start()
 
-    try:
-        # 2. Conectar al LLM (Ollama)
-        llm = ChatOllama(model=OLLAMA_MODEL, temperature=0)
-        llm.invoke("Hola") # Prueba de conexión
-        
-    except Exception as e:
-        st.error(f"ERROR: No se pudo conectar a Ollama. Asegúrate de que esté corriendo (ej. 'ollama serve' o 'ollama run mistral').")
-        st.stop()
+def describe_graph_error(error):
+    """
+    Mensaje para el usuario según el error de conexión a Neo4j.
+    Neo4jGraph envuelve los errores del driver en ValueError.
+    """
+    text = str(error)
+    if isinstance(error, AuthError) or "authentication" in text.lower():
+        return "ERROR: Autenticación de Neo4j fallida. Revisa NEO4J_PASSWORD o conexiones.json."
+    if isinstance(error, ServiceUnavailable) or "could not connect" in text.lower():
+        return f"ERROR: No se pudo conectar a Neo4j. Asegúrate de que la base de datos esté corriendo en '{CONNECTIONS.neo4j_uri}'."
+    return f"Error inesperado al conectar con Neo4j: {error}"
 
-    # 3. Crear la Cadena (Chain) con los PromptTemplates y callback de validación
-    chain = GraphCypherQAChain.from_llm(
-        llm,
-        graph=graph,
-        verbose=True, # Para ver la consulta en la terminal
-        cypher_prompt=CYPHER_PROMPT_TEMPLATE, # ¡Tu prompt personalizado!
-        qa_prompt=QA_PROMPT_TEMPLATE,         # ¡Tu prompt personalizado!
-        return_intermediate_steps=True, # Para mostrar el Cypher en la UI
-        allow_dangerous_requests=True,  # Requerido por LangChain para operaciones con bases de datos
-        callbacks=[CypherValidationCallback()]  # Validar antes de ejecutar
+@st.cache_resource
+def get_pipeline():
+    """
+    Pipeline con los cachés compartidos por todas las sesiones.
+    """
+    return build_pipeline(
+        load_chain().chain,
+        metrics=load_chain().metrics,
+        answer_cache_max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        answer_cache_ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+        cypher_cache_max_entries=CYPHER_CACHE_MAX_ENTRIES,
+        format_simple_results=FORMAT_SIMPLE_RESULTS,
+        ollama_max_concurrency=OLLAMA_MAX_CONCURRENCY,
+        cypher_few_shot_k=CYPHER_FEW_SHOT_K,
+        cypher_retries=CYPHER_MAX_RETRIES,
+        result_max_rows=RESULT_MAX_ROWS,
+        result_max_bytes=RESULT_MAX_BYTES,
+        use_graph_snapshot=USE_GRAPH_SNAPSHOT,
+        schema_version=load_chain().schema_version,
+        schema_cache_path=load_chain().schema_cache_path,
     )
-    
-    return chain, graph.schema
+
+@st.cache_resource
+def get_request_pool():
+    """
+    Pool compartido: limita las llamadas a Ollama y fusiona preguntas idénticas en vuelo.
+    """
+    return RequestPool(get_pipeline(), max_workers=REQUEST_POOL_WORKERS)
+
+@st.cache_resource
+def get_chat_store():
+    """
+    Archivo SQLite del historial, compartido por todas las sesiones.
+    """
+    return ChatStore()
+
+def get_chat_history():
+    """
+    Historial de la sesión indicada en la URL (?sesion=...); sin id se crea
+    una sesión nueva. En session_state queda solo la ventana reciente.
+    """
+    session_id = st.query_params.get("sesion")
+    if not session_id:
+        session_id = new_session_id()
+        st.query_params["sesion"] = session_id
+    history = st.session_state.get("chat_history")
+    if history is None or history.session_id != session_id:
+        history = ChatHistory(get_chat_store(), session_id, window=CHAT_WINDOW, page_size=CHAT_PAGE_SIZE)
+        st.session_state.chat_history = history
+    return history
+
+@st.cache_resource
+def get_substitution_board():
+    """
+    Tablero compartido por todas las sesiones: se arma una vez y después
+    solo se releen los jugadores que cambiaron.
+    """
+    return SubstitutionBoard()
+
+URGENCY_ICONS = {0: "🔴", 1: "🟡", 2: "🟢", 3: "⚪"}
+
+@st.fragment(run_every=SUBSTITUTION_BOARD_REFRESH_SECONDS)
+def render_substitution_board(graph):
+    """
+    Panel del tablero de sustituciones. Es un fragmento: se vuelve a dibujar
+    solo cada SUBSTITUTION_BOARD_REFRESH_SECONDS, sin rerun de la página ni
+    del pipeline, y consulta Neo4j solo si cambió la versión del grafo o la de estado.
+    """
+    board = get_substitution_board()
+    try:
+        changed = set(board.ensure_fresh(graph, (get_graph_version(), get_state_version())))
+    except (ServiceUnavailable, OSError) as e:
+        st.warning(f"No se pudo actualizar el tablero: {e}")
+        changed = set()
+    rows = board.rows()
+    if not rows:
+        st.caption("Todavía no hay jugadores en el grafo.")
+        return
+    st.dataframe(
+        [
+            {
+                "": URGENCY_ICONS[urgency(row)] + (" 🔄" if row["jugador_id"] in changed else ""),
+                "Jugador": row["jugador"],
+                "Cansancio": row["cansancio"],
+                "Riesgo lesión": row["riesgoLesion"],
+                "Minuto": row["minuto"],
+                "Recomendación": row["accion"] or "sin datos",
+                "Confianza": row["confianza"],
+            }
+            for row in rows
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(
+        f"{len(board.substitutions())} a sustituir · actualizado {time.strftime('%H:%M:%S')} "
+        f"(versión del grafo {board.graph_version[0]}, de estado {board.graph_version[1]}) · "
+        f"se refresca cada {SUBSTITUTION_BOARD_REFRESH_SECONDS}s"
+    )
+
+def wait_for_job(job):
+    """
+    Espera el resultado mostrando la posición en la fila y la espera estimada.
+    """
+    placeholder = st.empty()
+    while not job.done():
+        state, position, eta = request_pool.status(job)
+        text = f"⏳ Consultando el grafo... ({state}"
+        if position:
+            text += f", {position} por delante"
+        if eta is not None:
+            text += f", ~{eta:.0f}s"
+        placeholder.info(text + ")")
+        job.wait(timeout=0.25)
+    placeholder.empty()
+    return job.result()
+
+# Etiquetas para mostrar qué camino generó cada respuesta
+PATH_LABELS = {
+    "router": "⚡ Ruta rápida (sin LLM)",
+    "cache": "⚡ Respuesta servida desde caché",
+    "template": "♻️ Consulta reutilizada del caché de plantillas (LLM solo para la respuesta)",
+    "llm": "🧠 Generada por el LLM (GraphCypherQAChain)",
+}
+
+def path_caption(msg):
+    label = PATH_LABELS.get(msg.get("path"), "")
+    if msg.get("intent"):
+        label += f" · intención: `{msg['intent']}`"
+    if msg.get("answered_by") == "formatter":
+        label += " · respuesta armada sin LLM"
+    return label
+
+# Etapas del panel de métricas: (clave, etiqueta)
+METRIC_STAGES = [
+    ("cola_llm", "Espera por Ollama"),
+    ("cypher_llm", "LLM: generar Cypher"),
+    ("neo4j", "Neo4j: ejecutar consulta"),
+    ("qa_llm", "LLM: redactar respuesta"),
+    ("total", "Total"),
+]
+
+def render_metrics(metrics):
+    """
+    Panel plegable con los tiempos, tokens y filas de una respuesta.
+    """
+    if not metrics:
+        return
+    rows = []
+    for key, label in METRIC_STAGES:
+        seconds = metrics.get(f"{key}_seg")
+        if seconds is None:
+            continue
+        row = {"Etapa": label, "Tiempo (ms)": round(seconds * 1000, 1), "Tokens (entrada/salida)": "", "Filas": ""}
+        if key == "cypher_llm":
+            details = [f"{metrics['cypher_ejemplos']} ejemplos"] if "cypher_ejemplos" in metrics else []
+            if metrics.get("cypher_reparaciones"):
+                details.append(f"{metrics['cypher_reparaciones']} reparaciones")
+            if metrics.get("cypher_reintentos"):
+                details.append(f"{metrics['cypher_reintentos']} reintentos")
+            if metrics.get("cypher_avisos"):
+                details.append(f"{metrics['cypher_avisos']} avisos de schema")
+            if details:
+                row["Etapa"] = f"{label} ({', '.join(details)})"
+        if f"{key}_tokens_entrada" in metrics:
+            row["Tokens (entrada/salida)"] = f"{metrics[f'{key}_tokens_entrada']} / {metrics.get(f'{key}_tokens_salida', 0)}"
+        if key == "neo4j":
+            row["Filas"] = metrics.get("neo4j_filas", 0)
+            if metrics.get("neo4j_recortadas"):
+                row["Filas"] = f"{row['Filas']}+ (resumido)"
+        rows.append(row)
+    with st.expander(f"Ver métricas ({metrics.get('total_seg', 0):.2f}s)"):
+        st.table(rows)
 
 # --- 3. INTERFAZ DE STREAMLIT (UI) ---
 
@@ -219,87 +264,195 @@ st.title("🤖 Asistente DT Virtual Amateur")
 st.caption("Desarrollado por: Cirrincione, Cisterna, Donnarumma")
 
 try:
-    # Cargar la cadena y el schema
-    chain, schema = load_chain()
+    # Cargar la cadena y el schema (en segundo plano)
+    loader = load_chain()
+
+    if not loader.graph_done:
+        # La página se dibuja enseguida; se vuelve a intentar hasta que el grafo esté listo
+        with st.status("🔥 Calentando: conectando a Neo4j y cargando el schema...", expanded=False):
+            st.write("Ollama se precalienta en paralelo.")
+        loader.wait_graph(timeout=0.5)
+        time.sleep(0.1)
+        st.rerun()
+
+    if loader.graph_error is not None:
+        st.error(describe_graph_error(loader.graph_error))
+        # El ChainLoader fallido no queda en el caché: el próximo rerun vuelve a conectar
+        load_chain.clear()
+        if st.button("🔄 Reintentar la conexión"):
+            st.rerun()
+        st.stop()
+
+    pipeline = get_pipeline()
+    request_pool = get_request_pool()
+    schema = loader.graph.schema
+
+    # Estado del LLM: las preguntas de la ruta rápida funcionan aunque Mistral no esté listo
+    with st.sidebar:
+        st.subheader("⚙️ Estado")
+        st.write(f"Neo4j: ✅ listo ({loader.timings.get('neo4j', 0):.1f}s, schema desde {loader.schema_source})")
+        if loader.schema_error is not None:
+            st.warning(
+                f"No se pudieron crear los constraints/índices ({loader.schema_error}). "
+                "Revisar con 'python3 schema_bootstrap.py --report'."
+            )
+        if loader.llm_ready:
+            st.write(f"Ollama ({OLLAMA_MODEL}): ✅ listo ({loader.timings.get('ollama', 0):.1f}s)")
+        elif loader.llm_done:
+            st.error("ERROR: No se pudo conectar a Ollama. Asegúrate de que esté corriendo (ej. 'ollama serve' o 'ollama run mistral').")
+        else:
+            st.write(f"Ollama ({OLLAMA_MODEL}): 🔥 calentando el modelo...")
+            st.caption("Las preguntas frecuentes ya se pueden responder.")
+        if pipeline.graph_snapshot is not None and pipeline.graph_snapshot.loaded:
+            snapshot_stats = pipeline.graph_snapshot.stats()
+            st.caption(
+                f"Copia del grafo en memoria: {snapshot_stats['nodos']} nodos, "
+                f"{sum(snapshot_stats['relaciones'].values())} relaciones (versión {snapshot_stats['version']}, "
+                f"de estado {snapshot_stats['version_estado']}) · "
+                f"{snapshot_stats['actualizaciones_estado']} actualizaciones de estado"
+            )
+
+    # Contadores del pipeline (cuántas respuestas salió por cada camino)
+    with st.sidebar:
+        st.subheader("📊 Caminos de respuesta")
+        stats = pipeline.stats
+        if stats:
+            for key in sorted(stats):
+                st.write(f"`{key}`: {stats[key]}")
+        else:
+            st.caption("Todavía no hay preguntas.")
+        pool_stats = request_pool.stats()
+        st.caption(
+            f"Fila: {pool_stats['en_cola']} en cola · "
+            f"Ollama: {pool_stats['llm_activas']} activas, {pool_stats['llm_en_espera']} esperando · "
+            f"{pool_stats['fusionadas']} preguntas fusionadas"
+        )
+        neo4j_stats = neo4j_pool_stats(CONNECTIONS)
+        if neo4j_stats["abiertas"] is not None:
+            st.caption(
+                f"Neo4j: {neo4j_stats['en_uso']}/{neo4j_stats['abiertas']} conexiones en uso "
+                f"(máx. {neo4j_stats['tamaño_pool']}) · {neo4j_stats['consultas']} consultas · "
+                f"{neo4j_stats['reintentos']} reintentos"
+            )
+
+    # Tablero de sustituciones en vivo (se refresca solo)
+    with st.expander("📋 Tablero de sustituciones", expanded=True):
+        render_substitution_board(loader.graph)
 
     # Mostrar el schema en un expander (útil para debug)
     with st.expander("Ver Schema del Grafo (detectado por LangChain)"):
         st.code(schema, language="text")
 
-    # Inicializar el historial del chat en st.session_state
-    if "messages" not in st.session_state:
-        st.session_state.messages = [{
-            "role": "assistant",
-            "content": "¡Hola, DT! Estoy conectado a la base de conocimiento. Haz tus preguntas sobre el grafo."
-        }]
+    # Historial del chat: ventana reciente en memoria, el resto en SQLite
+    history = get_chat_history()
+    with st.sidebar:
+        st.subheader("💬 Conversación")
+        st.caption(f"Sesión `{history.session_id}` · {history.store.count(history.session_id)} mensajes guardados")
+        if st.button("Nueva conversación"):
+            st.query_params["sesion"] = new_session_id()
+            st.rerun()
+
+    if history.has_older:
+        if st.button("⬆️ Cargar mensajes anteriores"):
+            history.load_older()
+    if not history.has_older:
+        with st.chat_message("assistant"):
+            st.markdown("¡Hola, DT! Estoy conectado a la base de conocimiento. Haz tus preguntas sobre el grafo.")
 
     # Mostrar mensajes del historial
-    for msg in st.session_state.messages:
+    for msg in history.messages():
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
-            # Si el mensaje tiene pasos intermedios (Cypher), muéstralos
-            if "intermediate_steps" in msg:
+            if msg.get("path"):
+                st.caption(path_caption(msg))
+            # Si el mensaje tiene Cypher, muéstralo; las filas se leen del historial solo si se piden
+            if msg.get("query"):
                  with st.expander("Ver consulta Cypher generada"):
-                    st.code(msg["intermediate_steps"]["query"], language="cypher")
+                    st.code(msg["query"], language="cypher")
+                    if st.checkbox("Mostrar filas del resultado", key=f"filas_{msg['seq']}"):
+                        st.dataframe(history.context(msg).get("context", []), use_container_width=True)
+            render_metrics(msg.get("metrics"))
 
     # Obtener nueva entrada del usuario
     if prompt := st.chat_input("¿Qué jugadores deben ser sustituidos?"):
         # Agregar mensaje del usuario al historial y mostrarlo
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        history.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
 
         # Generar respuesta del asistente
         with st.chat_message("assistant"):
-            with st.spinner("Consultando el grafo..."):
-                try:
-                    # Invocar la cadena
-                    response = chain.invoke({"query": prompt})
-                    
-                    # Extraer resultados
-                    result_text = response["result"]
-                    intermediate_steps = response.get("intermediate_steps", {})
-                    
-                    # VALIDACIÓN: Verificar que el Cypher generado NO sea SQL
-                    if "query" in intermediate_steps:
-                        generated_cypher = intermediate_steps["query"]
-                        is_valid, error_msg = validate_cypher_query(generated_cypher)
-                        
-                        if not is_valid:
-                            # Mostrar error específico
-                            st.error("❌ " + error_msg)
-                            st.warning("⚠️ El modelo generó SQL en lugar de Cypher.")
-                            st.info("💡 **Sugerencia**: Intenta reformular tu pregunta de forma más simple, por ejemplo:\n- '¿Quiénes son los jugadores clave de Boca Unidos?'\n- '¿Qué rivales tenemos?'")
-                            
-                            # Guardar error en historial
-                            st.session_state.messages.append({
-                                "role": "assistant",
-                                "content": f"Error: {error_msg}",
-                                "intermediate_steps": intermediate_steps
-                            })
-                            st.stop()  # Detener ejecución aquí
-
-                    # Mostrar respuesta
-                    st.markdown(result_text)
-                    
-                    # Mostrar Cypher generado (si existe)
-                    if "query" in intermediate_steps:
-                        with st.expander("Ver consulta Cypher generada"):
-                            st.code(intermediate_steps["query"], language="cypher")
-                    
-                    # Guardar respuesta completa en el historial
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": result_text,
-                        "intermediate_steps": intermediate_steps
-                    })
-
-                except Exception as e:
-                    st.error(f"Ha ocurrido un error inesperado: {e}")
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": f"Error al procesar la consulta: {e}"
-                    })
+            try:
+                # Ruta rápida -> caché de respuestas -> plantillas Cypher -> LLM
+                # (en el pool compartido; preguntas idénticas en vuelo se preparan una
+                # vez, pero cada sesión redacta su respuesta con sus propias métricas)
+                response = wait_for_job(request_pool.submit(prompt, stage="prepare"))
+                intermediate_steps = response["intermediate_steps"]
+
+                if response["result"] is None:
+                    # Mostrar el Cypher y las filas apenas están listos
+                    with st.expander("Ver consulta Cypher generada"):
+                        st.code(intermediate_steps["query"], language="cypher")
+                    rows = intermediate_steps["context"]
+                    with st.expander(f"Ver resultado de la consulta ({len(rows)} filas)"):
+                        st.dataframe(rows, use_container_width=True)
+
+                    if STREAM_ANSWERS:
+                        # Redactar la respuesta token a token
+                        # closing(): si la página se recarga a mitad de la respuesta,
+                        # el turno del LLM se libera ya y no cuando se recolecte el generador
+                        with closing(pipeline.stream_answer(prompt, rows, response.get("_metrics"))) as stream:
+                            response["result"] = st.write_stream(stream)
+                    else:
+                        with st.spinner("Redactando la respuesta..."):
+                            response["result"] = pipeline.answer(prompt, rows, response.get("_metrics"))
+                        st.markdown(response["result"])
+                    pipeline.finish(prompt, response)
+                    cypher_shown = True
+                else:
+                    st.markdown(response["result"])
+                    cypher_shown = False
+
+                message = {
+                    "role": "assistant",
+                    "content": response["result"],
+                    "intermediate_steps": intermediate_steps,
+                    "path": response["path"],
+                    "intent": response.get("intent"),
+                    "answered_by": response.get("answered_by"),
+                    "metrics": response.get("metrics"),
+                }
+                st.caption(path_caption(message))
+                
+                # Mostrar Cypher generado (si existe)
+                if not cypher_shown and "query" in intermediate_steps:
+                    with st.expander("Ver consulta Cypher generada"):
+                        st.code(intermediate_steps["query"], language="cypher")
+                render_metrics(message["metrics"])
+                
+                # Guardar respuesta completa en el historial
+                history.append(message)
+
+            except InvalidCypherError as e:
+                # VALIDACIÓN: el Cypher siguió inválido después de repararlo y reintentar
+                error_msg = str(e)
+                st.error(error_msg)
+                st.warning("⚠️ El modelo no generó una consulta Cypher válida de solo lectura.")
+                st.info("💡 **Sugerencia**: Intenta reformular tu pregunta de forma más simple, por ejemplo:\n- '¿Quiénes son los jugadores clave de Boca Unidos?'\n- '¿Qué rivales tenemos?'")
+                
+                # Guardar error en historial
+                history.append({
+                    "role": "assistant",
+                    "content": f"Error: {error_msg}",
+                    "intermediate_steps": {"query": e.query}
+                })
+
+            except Exception as e:
+                st.error(f"Ha ocurrido un error inesperado: {e}")
+                history.append({
+                    "role": "assistant",
+                    "content": f"Error al procesar la consulta: {e}"
+                })
 
 except Exception as e:
     st.error(f"Error fatal al inicializar la aplicación: {e}")
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Preguntas en lote, sin Streamlit, para armar el informe previo al partido.
+
+Usa el mismo pipeline que el chat (startup.ChainLoader + build_pipeline:
+prompts, validación, cachés, ruta rápida) y ejecuta muchas preguntas con
+concurrencia acotada:
+
+- de un archivo (una pregunta por línea, las que empiezan con # se ignoran),
+- o de plantillas con {jugador}, {rival} o {jugador_rival}, que se expanden
+  con todos los nombres de esa etiqueta en el grafo,
+
+y escribe por pregunta la respuesta, el Cypher, el camino y los tiempos en
+JSONL o CSV (según la extensión de --salida). Las consultas iguales (mismo
+Cypher y parámetros) se ejecutan una sola vez en Neo4j aunque las generen
+varias preguntas; las llamadas a Ollama quedan limitadas como en el chat.
+
+Uso:
+    python3 batch_runner.py --preguntas preguntas.txt --salida informe.jsonl
+    python3 batch_runner.py --plantilla "¿Cuál es el cansancio de {jugador}?" \\
+        --plantilla "¿Quién es el jugador clave de {rival}?" --salida informe.csv --concurrencia 8
+"""
+import argparse
+import csv
+import itertools
+import json
+import string
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from qa_pipeline import QAPipeline
+
+DEFAULT_CONCURRENCY = 4
+
+# Marcadores de las plantillas -> etiqueta cuyos nombres los reemplazan
+TEMPLATE_LABELS = {
+    "jugador": "Jugador",
+    "rival": "Rival",
+    "jugador_rival": "JugadorRival",
+}
+
+# Columnas del CSV (los tiempos salen de response["metrics"])
+CSV_COLUMNS = [
+    "pregunta", "respuesta", "cypher", "camino", "respondido_por", "filas",
+    "total_seg", "cypher_llm_seg", "neo4j_seg", "qa_llm_seg", "error",
+]
+
+
+class BatchPipeline(QAPipeline):
+    """
+    QAPipeline que ejecuta cada consulta distinta (Cypher normalizado +
+    parámetros) una sola vez, aunque varias preguntas la pidan a la vez.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._queries = {}
+        self._queries_lock = threading.Lock()
+
+    def execute_cypher(self, cypher, params=None, metrics=None):
+        key = (" ".join(cypher.split()), json.dumps(params or {}, sort_keys=True, default=str))
+        with self._queries_lock:
+            future = self._queries.get(key)
+            owner = future is None
+            if owner:
+                future = self._queries[key] = Future()
+        if owner:
+            try:
+                future.set_result(super().execute_cypher(cypher, params, metrics))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            self._count("cypher:repetida")
+        return future.result()
+
+
+def read_questions(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def template_fields(template):
+    return [name for _, name, _, _ in string.Formatter().parse(template) if name]
+
+
+def entity_names(graph, label):
+    rows = graph.query(
+        f"MATCH (n:{label}) WHERE n.nombre IS NOT NULL RETURN DISTINCT n.nombre AS nombre ORDER BY nombre"
+    )
+    return [row["nombre"] for row in rows]
+
+
+def expand_templates(graph, templates):
+    """
+    Preguntas de cada plantilla con todas las combinaciones de nombres de
+    sus marcadores (los nombres de cada etiqueta se consultan una vez).
+    """
+    names = {}
+    questions = []
+    for template in templates:
+        fields = template_fields(template)
+        unknown = [f for f in fields if f not in TEMPLATE_LABELS]
+        if unknown:
+            raise ValueError(f"Marcador desconocido en {template!r}: {', '.join(unknown)}")
+        for field in fields:
+            if field not in names:
+                names[field] = entity_names(graph, TEMPLATE_LABELS[field])
+        for combination in itertools.product(*(names[f] for f in fields)):
+            questions.append(template.format(**dict(zip(fields, combination))))
+    return questions
+
+
+def answer_question(pipeline, question):
+    """Registro de salida de una pregunta (con el error si falló)."""
+    start = time.perf_counter()
+    record = {"pregunta": question}
+    try:
+        response = pipeline.run(question)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["cypher"] = getattr(e, "query", None)
+        record["segundos"] = time.perf_counter() - start
+        return record
+    steps = response.get("intermediate_steps") or {}
+    record.update({
+        "respuesta": response["result"],
+        "cypher": steps.get("query"),
+        "parametros": steps.get("params"),
+        "camino": response["path"],
+        "respondido_por": response.get("answered_by"),
+        "filas": len(steps.get("context") or []),
+        "metricas": response.get("metrics") or {},
+        "segundos": time.perf_counter() - start,
+    })
+    return record
+
+
+def run_batch(pipeline, questions, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    """
+    Responde las preguntas con `concurrency` hilos. Devuelve un iterador de
+    registros en el orden de las preguntas.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lote") as executor:
+        futures = [executor.submit(answer_question, pipeline, q) for q in questions]
+        for done, future in enumerate(futures, 1):
+            yield future.result()
+            if progress:
+                progress(done, len(futures))
+
+
+class _Writer:
+    """Escribe los registros a medida que llegan, en JSONL o CSV."""
+
+    def __init__(self, path):
+        self.csv = path.lower().endswith(".csv")
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            row = dict(record)
+            for stage in ("total", "cypher_llm", "neo4j", "qa_llm"):
+                value = record.get("metricas", {}).get(f"{stage}_seg")
+                row[f"{stage}_seg"] = round(value, 4) if value is not None else ""
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    from connections import add_neo4j_arguments, close_all, settings_from_args
+    from startup import ChainLoader, build_pipeline
+
+    parser = argparse.ArgumentParser(description="Preguntas en lote con el pipeline del chat")
+    parser.add_argument("--preguntas", help="Archivo con una pregunta por línea")
+    parser.add_argument("--plantilla", action="append", default=[],
+                        help="Pregunta con {jugador}, {rival} o {jugador_rival} (se puede repetir)")
+    parser.add_argument("--salida", required=True, help="Archivo .jsonl o .csv")
+    parser.add_argument("--concurrencia", type=int, default=DEFAULT_CONCURRENCY, help="Preguntas simultáneas")
+    parser.add_argument("--ollama-concurrency", type=int, default=1, help="Llamadas simultáneas a Ollama")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+    if not args.preguntas and not args.plantilla:
+        parser.error("indicar --preguntas y/o --plantilla")
+
+    loader = ChainLoader(settings=settings_from_args(args)).start()
+    loader.wait_graph()
+    if loader.graph_error is not None:
+        raise SystemExit(f"✗ No se pudo conectar a Neo4j: {loader.graph_error}")
+    print(f"✓ Neo4j listo ({loader.timings.get('neo4j', 0):.1f}s); esperando a Ollama...")
+    loader.wait_llm()
+    if loader.llm_error is not None:
+        print(f"⚠️ Ollama no responde ({loader.llm_error}): solo funcionarán las preguntas de la ruta rápida")
+
+    questions = read_questions(args.preguntas) if args.preguntas else []
+    questions += expand_templates(loader.graph, args.plantilla)
+    pipeline = build_pipeline(
+        loader.chain,
+        pipeline_class=BatchPipeline,
+        ollama_max_concurrency=args.ollama_concurrency,
+        schema_version=loader.schema_version,
+        schema_cache_path=loader.schema_cache_path,
+    )
+    print(f"✓ {len(questions)} preguntas, {args.concurrencia} a la vez")
+
+    def _progress(done, total):
+        print(f"  {done}/{total} preguntas", end="\r", flush=True)
+
+    writer = _Writer(args.salida)
+    errors = 0
+    start = time.perf_counter()
+    try:
+        for record in run_batch(pipeline, questions, args.concurrencia, _progress):
+            errors += "error" in record
+            writer.write(record)
+    finally:
+        writer.close()
+        close_all()
+    seconds = time.perf_counter() - start
+
+    paths = Counter({k.split(":", 1)[1]: v for k, v in pipeline.stats.items() if k.startswith("path:")})
+    print()
+    print(f"✓ {len(questions)} preguntas en {seconds:.1f}s ({errors} con error) -> {args.salida}")
+    print(f"✓ Caminos: {dict(paths)} · consultas repetidas evitadas: {pipeline.stats.get('cypher:repetida', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,662 @@
+"""
+Benchmark de punta a punta sin Ollama ni Neo4j.
+
+Arma el mismo pipeline que app.py (build_chain + startup.build_pipeline: cachés,
+copia del grafo y límite de concurrencia de Ollama) pero con dos reemplazos
+locales:
+
+- FakeChatModel: modelo de chat con latencia configurable que devuelve el
+  Cypher enlatado de cada pregunta y una respuesta de largo fijo.
+- SyntheticGraph / SyntheticDriver: grafo en memoria con N jugadores,
+  rivales y partidos que resuelve las consultas del proyecto (ruta rápida,
+  exportación para la copia, ejemplos few-shot, índice de entidades y
+  escrituras de scouting).
+
+Mide cada etapa (generación de Cypher, ejecución, respuesta, total y
+escritura de scouting) para distintos tamaños de grafo y cantidad de
+usuarios simultáneos, y reporta p50/p95/p99 y throughput en JSON.
+
+Uso:
+    python3 benchmark.py
+    python3 benchmark.py --players 10,1000,100000 --users 1,4,8 --output resultados.json
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# El benchmark no debe invalidar los cachés de una app que esté corriendo
+os.environ.setdefault(
+    "DT_GRAPH_VERSION_FILE",
+    os.path.join(tempfile.gettempdir(), "dt_benchmark_graph_version"),
+)
+os.environ.setdefault(
+    "DT_STATE_VERSION_FILE",
+    os.path.join(tempfile.gettempdir(), "dt_benchmark_state_version"),
+)
+
+from langchain_community.graphs.graph_store import GraphStore
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from answer_cache import normalize_question
+from chain_setup import build_chain
+from cypher_examples import DEFAULT_EXAMPLES
+from graph_snapshot import EXPORT_NODES_QUERY, EXPORT_RELATIONSHIPS_QUERY, SERVER_TIME_QUERY
+from qa_pipeline import QAPipeline
+from result_governor import DEFAULT_MAX_ROWS
+from scouting import WRITE_RIVALS_QUERY, update_graph_with_entities
+from startup import build_pipeline
+
+DEFAULT_PLAYERS = [10, 1000, 10000, 100000]
+DEFAULT_USERS = [1, 4]
+
+SURNAMES = [
+    "Martinez", "Gomez", "Perez", "Lopez", "Sosa", "Romero", "Diaz",
+    "Alvarez", "Torres", "Ruiz", "Benitez", "Acosta", "Medina", "Herrera",
+]
+RIVAL_NAMES = ["Los Primos", "Boca Unidos", "Atletico Parana"]
+KEY_PLAYER_NAMES = ["Rodriguez", "Fernandez", "Castro", "Molina", "Ortiz"]
+ACCIONES = ["Sustitucion inmediata", "Mantener", "Mantener con esfuerzo"]
+
+
+# --- Modelo de chat simulado ---
+
+class FakeChatModel(BaseChatModel):
+    """
+    Responde el prompt Cypher con la consulta enlatada de la pregunta y el
+    prompt de respuesta con un texto de answer_tokens palabras. Cada llamada
+    tarda cypher_latency (o answer_latency) + prefill_latency por palabra del
+    prompt + token_latency por palabra generada.
+    """
+
+    canned: dict = {}
+    default_cypher: str = "MATCH (r:Rival) RETURN r.nombre"
+    cypher_latency: float = 0.05
+    answer_latency: float = 0.05
+    token_latency: float = 0.002
+    prefill_latency: float = 0.0
+    answer_tokens: int = 20
+
+    @property
+    def _llm_type(self):
+        return "dt-fake-chat"
+
+    def _reply(self, prompt):
+        if "Cypher expert" in prompt:
+            questions = re.findall(r"Question: (.*)", prompt)
+            question = questions[-1] if questions else ""
+            return self.canned.get(normalize_question(question), self.default_cypher)
+        match = re.search(r"Pregunta: (.*)", prompt)
+        words = f"Respuesta simulada para {match.group(1) if match else 'la pregunta'}".split()
+        words += ["dato"] * max(0, self.answer_tokens - len(words))
+        return " ".join(words[: self.answer_tokens])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = self._reply(prompt)
+        completion_tokens = len(text.split())
+        latency = self.cypher_latency if "Cypher expert" in prompt else self.answer_latency
+        latency += self.prefill_latency * len(prompt.split())
+        time.sleep(latency + self.token_latency * completion_tokens)
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": len(prompt.split()),
+                "output_tokens": completion_tokens,
+                "total_tokens": len(prompt.split()) + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# --- Grafo simulado ---
+
+_NODE_PATTERN = re.compile(r"\((\w+):(\w+)\)")
+_FILTER_PATTERN = re.compile(r"(\w+)\.(\w+)\s*(CONTAINS|=)\s*('([^']*)'|\$(\w+))", re.I)
+_RETURN_PATTERN = re.compile(r"\bRETURN\b(.*)$", re.I | re.S)
+_LIMIT_PATTERN = re.compile(r"\s*\bLIMIT\s+(\d+)\s*$", re.I)
+
+
+class SyntheticGraph(GraphStore):
+    """
+    Grafo en memoria con la forma del grafo del proyecto. Resuelve las
+    consultas de lectura por sus relaciones, filtros (CONTAINS / =) y
+    columnas del RETURN; recorre todos los nodos de la etiqueta, como un
+    escaneo sin índice. Respeta el LIMIT final y el total de las consultas
+    de resumen de result_governor.py (los valores frecuentes no).
+    query_latency suma un tiempo fijo por consulta.
+    """
+
+    def __init__(self, players, query_latency=0.0):
+        self.query_latency = query_latency
+        self.queries = 0
+        self._lock = threading.Lock()
+        self.jugadores = []
+        for i in range(players):
+            surname = SURNAMES[i % len(SURNAMES)]
+            nombre = surname if i < len(SURNAMES) else f"{surname} {i}"
+            self.jugadores.append({
+                "Jugador": {"id": f"J{i:06d}", "nombre": nombre},
+                "EstadoFisico": {
+                    "id": f"E{i:06d}",
+                    "cansancio": float((i * 37) % 100),
+                    "riesgoLesion": float((i * 53) % 100),
+                    "minuto": 75,
+                },
+                "Recomendacion": {"accion": ACCIONES[i % len(ACCIONES)], "confianza": 0.8},
+            })
+        rival_count = max(len(RIVAL_NAMES), players // 20)
+        self.rivales = {}
+        for i in range(rival_count):
+            nombre = RIVAL_NAMES[i] if i < len(RIVAL_NAMES) else f"Club {i}"
+            clave = KEY_PLAYER_NAMES[i % len(KEY_PLAYER_NAMES)]
+            self.rivales[nombre] = [clave if i < len(KEY_PLAYER_NAMES) else f"{clave} {i}"]
+        self.partidos = [
+            {"id": f"P{i:04d}", "resultado": "Perdiendo 0-1", "rival": nombre}
+            for i, nombre in enumerate(list(self.rivales)[: max(1, rival_count // 10)])
+        ]
+        self.structured_schema = {
+            "node_props": {
+                "Jugador": [{"property": "nombre", "type": "STRING"}, {"property": "id", "type": "STRING"}],
+                "EstadoFisico": [
+                    {"property": "cansancio", "type": "FLOAT"},
+                    {"property": "riesgoLesion", "type": "FLOAT"},
+                    {"property": "minuto", "type": "INTEGER"},
+                ],
+                "Recomendacion": [{"property": "accion", "type": "STRING"}, {"property": "confianza", "type": "FLOAT"}],
+                "Partido": [{"property": "id", "type": "STRING"}, {"property": "resultado", "type": "STRING"}],
+                "Rival": [{"property": "nombre", "type": "STRING"}],
+                "JugadorRival": [{"property": "nombre", "type": "STRING"}],
+            },
+            "rel_props": {},
+            "relationships": [
+                {"start": "Jugador", "type": "TIENE_ESTADO", "end": "EstadoFisico"},
+                {"start": "EstadoFisico", "type": "GENERA_RECOMENDACION", "end": "Recomendacion"},
+                {"start": "Jugador", "type": "JUEGA_EN", "end": "Partido"},
+                {"start": "Partido", "type": "ENFRENTA", "end": "Rival"},
+                {"start": "Rival", "type": "TIENE_JUGADOR_CLAVE", "end": "JugadorRival"},
+            ],
+            "metadata": {"constraint": [], "index": []},
+        }
+        self.schema = "\n".join(
+            f"{label} {{{', '.join(p['property'] + ': ' + p['type'] for p in props)}}}"
+            for label, props in self.structured_schema["node_props"].items()
+        ) + "\n" + "\n".join(
+            f"(:{r['start']})-[:{r['type']}]->(:{r['end']})"
+            for r in self.structured_schema["relationships"]
+        )
+
+    # GraphStore
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    def refresh_schema(self):
+        pass
+
+    def add_graph_documents(self, graph_documents, include_source=False):
+        raise NotImplementedError
+
+    def query(self, query, params={}):
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            self.queries += 1
+            # Exportación de graph_snapshot.py (sin marcas de cambio: se reexporta entera)
+            if query == SERVER_TIME_QUERY:
+                return [{"ahora": None}]
+            if query == EXPORT_NODES_QUERY:
+                return self._export_nodes()
+            if query == EXPORT_RELATIONSHIPS_QUERY:
+                return self._export_relationships()
+            if " UNION ALL " in query:
+                return self._names()
+            if "count(*) AS cantidad" in query:
+                return []
+            if "count(*) AS total" in query:
+                # Resumen: las mismas columnas del WITH como RETURN
+                head, _, columns = query.partition("\nRETURN count(*) AS total")[0].rpartition("WITH ")
+                base = head + "RETURN " + columns
+                return [{"total": len(self._project(base, self._records(base), params or {}))}]
+            limit = _LIMIT_PATTERN.search(query)
+            if limit:
+                query = query[:limit.start()]
+            rows = self._project(query, self._records(query), params or {})
+            return rows[: int(limit.group(1))] if limit else rows
+
+    # --- Resolución de consultas ---
+
+    def _names(self):
+        rows = [{"label": "Jugador", "nombre": j["Jugador"]["nombre"]} for j in self.jugadores]
+        rows += [{"label": "Rival", "nombre": nombre} for nombre in self.rivales]
+        rows += [
+            {"label": "JugadorRival", "nombre": clave}
+            for claves in self.rivales.values() for clave in claves
+        ]
+        return rows
+
+    def _export_nodes(self):
+        rows = []
+        for j in self.jugadores:
+            for prefix, label in (("J", "Jugador"), ("E", "EstadoFisico"), ("R", "Recomendacion")):
+                rows.append({"id": prefix + j["Jugador"]["id"], "labels": [label], "props": dict(j[label])})
+        for p in self.partidos:
+            rows.append({"id": p["id"], "labels": ["Partido"], "props": {"id": p["id"], "resultado": p["resultado"]}})
+        for rival, claves in self.rivales.items():
+            rows.append({"id": "Rival:" + rival, "labels": ["Rival"], "props": {"nombre": rival}})
+            for clave in claves:
+                rows.append({
+                    "id": f"JugadorRival:{rival}:{clave}", "labels": ["JugadorRival"], "props": {"nombre": clave},
+                })
+        return rows
+
+    def _export_relationships(self):
+        rows = []
+        for j in self.jugadores:
+            jugador = j["Jugador"]["id"]
+            rows.append({"start": "J" + jugador, "type": "TIENE_ESTADO", "end": "E" + jugador})
+            rows.append({"start": "E" + jugador, "type": "GENERA_RECOMENDACION", "end": "R" + jugador})
+            rows.append({"start": "J" + jugador, "type": "JUEGA_EN", "end": self.partidos[0]["id"]})
+        for p in self.partidos:
+            rows.append({"start": p["id"], "type": "ENFRENTA", "end": "Rival:" + p["rival"]})
+        for rival, claves in self.rivales.items():
+            for clave in claves:
+                rows.append({
+                    "start": "Rival:" + rival, "type": "TIENE_JUGADOR_CLAVE", "end": f"JugadorRival:{rival}:{clave}",
+                })
+        return rows
+
+    def _records(self, query):
+        # Cada registro: etiqueta -> propiedades del nodo
+        if "TIENE_JUGADOR_CLAVE" in query:
+            return [
+                {"Rival": {"nombre": rival}, "JugadorRival": {"nombre": clave}}
+                for rival, claves in self.rivales.items() for clave in claves
+            ]
+        if "ENFRENTA" in query:
+            return [
+                {"Partido": {"id": p["id"], "resultado": p["resultado"]}, "Rival": {"nombre": p["rival"]}}
+                for p in self.partidos
+            ]
+        if "JUEGA_EN" in query:
+            partido = self.partidos[0]
+            return [
+                {"Jugador": j["Jugador"], "Partido": {"id": partido["id"], "resultado": partido["resultado"]}}
+                for j in self.jugadores
+            ]
+        if "Jugador)" in query or "TIENE_ESTADO" in query:
+            return self.jugadores
+        if "(r:Rival)" in query or ":Rival)" in query:
+            return [{"Rival": {"nombre": rival}} for rival in self.rivales]
+        return []
+
+    def _project(self, query, records, params):
+        variables = {var: label for var, label in _NODE_PATTERN.findall(query)}
+        filters = []
+        for var, prop, op, _, literal, param in _FILTER_PATTERN.findall(query):
+            value = literal if not param else params.get(param, "")
+            filters.append((variables.get(var), prop, op.upper(), str(value)))
+
+        returns = []
+        match = _RETURN_PATTERN.search(query)
+        for item in (match.group(1) if match else "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            expr, _, alias = item.partition(" AS ")
+            var, _, prop = expr.strip().partition(".")
+            returns.append((variables.get(var), prop, alias.strip() or expr.strip()))
+
+        rows = []
+        for record in records:
+            ok = True
+            for label, prop, op, value in filters:
+                actual = str(record.get(label, {}).get(prop, ""))
+                if (op == "CONTAINS" and value not in actual) or (op == "=" and actual != value):
+                    ok = False
+                    break
+            if ok:
+                rows.append({alias: record.get(label, {}).get(prop) for label, prop, alias in returns})
+        return rows
+
+    def write_rivals(self, rows):
+        with self._lock:
+            for row in rows:
+                claves = self.rivales.setdefault(row["rival"], [])
+                for jugador in row["jugadores"]:
+                    if jugador not in claves:
+                        claves.append(jugador)
+
+
+class _Summary:
+    def consume(self):
+        return self
+
+
+class _Session:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **params):
+        params = {**(parameters or {}), **params}
+        if query == WRITE_RIVALS_QUERY:
+            self.graph.write_rivals(params["rows"])
+            return _Summary()
+        return _Summary()
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class SyntheticDriver:
+    """
+    Lo mínimo del driver de neo4j que usa scouting.py, sobre un SyntheticGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self, **kwargs):
+        return _Session(self.graph)
+
+    def close(self):
+        pass
+
+
+# --- Preguntas ---
+
+def few_shot_examples():
+    """
+    (pregunta, cypher) de los ejemplos del prompt Cypher.
+    """
+    return [(e["question"], e["cypher"]) for e in DEFAULT_EXAMPLES]
+
+
+def build_question_set(graph, variants=3):
+    """
+    Preguntas de los ejemplos few-shot más variantes con otros nombres del
+    grafo sintético. Devuelve (preguntas, cypher_enlatado).
+    """
+    jugadores = [j["Jugador"]["nombre"] for j in graph.jugadores[: variants + 1]]
+    rivales = list(graph.rivales)[: variants + 1]
+    claves = [c for claves in list(graph.rivales.values())[: variants + 1] for c in claves]
+    pools = [jugadores, rivales, claves]
+
+    questions = []
+    canned = {}
+    for question, cypher in few_shot_examples():
+        questions.append(question)
+        canned[normalize_question(question)] = cypher
+        literal = re.search(r"'([^']+)'", cypher)
+        if not literal or literal.group(1) not in question:
+            continue
+        name = literal.group(1)
+        pool = next((p for p in pools if name in p), jugadores if "cansancio" in question else claves)
+        for other in [n for n in pool if n != name][:variants]:
+            variant = question.replace(name, other)
+            questions.append(variant)
+            canned[normalize_question(variant)] = cypher.replace(f"'{name}'", f"'{other}'")
+    # Variantes de la ruta rápida
+    questions += ["¿Qué rivales tenemos?", "¿Contra quién jugamos?"]
+    return questions, canned
+
+
+def scouting_reports(count):
+    Entity = namedtuple("Entity", "text label_")
+    reports = []
+    for i in range(count):
+        rival = f"Rival Scouting {i}"
+        text = f"Análisis de '{rival}': cuidado con 'Jugador Clave {chr(65 + i % 26)}'."
+        reports.append((text, [Entity(rival, "ORG")]))
+    return reports
+
+
+# --- Medición ---
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+
+class TimedPipeline(QAPipeline):
+    """
+    QAPipeline que registra el tiempo de cada paso (incluida la espera por
+    el límite de concurrencia de Ollama).
+    """
+
+    def __init__(self, *args, timer, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timer = timer
+        self.cypher_prompt_tokens = []
+        self.context_bytes = []
+        self._tokens_lock = threading.Lock()
+
+    def generate_cypher(self, question, metrics=None, question_template=None, entities=None,
+                        rejected=None):
+        with self.timer.measure("cypher_llm"):
+            return super().generate_cypher(question, metrics, question_template, entities, rejected)
+
+    def execute_cypher(self, cypher, params=None, metrics=None):
+        with self.timer.measure("neo4j"):
+            context = super().execute_cypher(cypher, params, metrics)
+        size = len(json.dumps(context, ensure_ascii=False, default=str))
+        with self._tokens_lock:
+            self.context_bytes.append(size)
+        return context
+
+    def answer(self, question, context, metrics=None):
+        with self.timer.measure("respuesta_llm"):
+            return super().answer(question, context, metrics)
+
+    def run(self, question):
+        with self.timer.measure("total"):
+            response = super().run(question)
+        tokens = response.get("metrics", {}).get("cypher_llm_tokens_entrada")
+        if tokens:
+            with self._tokens_lock:
+                self.cypher_prompt_tokens.append(tokens)
+        return response
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        stage: {
+            "n": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": max(values) * 1000,
+        }
+        for stage, values in sorted(samples.items())
+    }
+
+
+def run_scenario(players, users, rounds=2, reports=10, cypher_latency=0.05,
+                 answer_latency=0.05, token_latency=0.002, query_latency=0.0,
+                 ollama_concurrency=1, variants=3, prefill_latency=0.0, few_shot="dinamico",
+                 max_rows=DEFAULT_MAX_ROWS):
+    """
+    Un escenario: grafo de `players` jugadores, `users` usuarios que hacen
+    todas las preguntas `rounds` veces, y luego `reports` reportes de scouting.
+    few_shot: "dinamico" (ejemplos elegidos por pregunta) o "todos".
+    max_rows: tope de filas de result_governor (0 = sin límite, como antes).
+    """
+    start = time.perf_counter()
+    graph = SyntheticGraph(players, query_latency=query_latency)
+    build_seconds = time.perf_counter() - start
+    questions, canned = build_question_set(graph, variants)
+
+    llm = FakeChatModel(
+        canned=canned,
+        cypher_latency=cypher_latency,
+        answer_latency=answer_latency,
+        token_latency=token_latency,
+        prefill_latency=prefill_latency,
+    )
+    chain = build_chain(llm, graph)
+    timer = StageTimer()
+    # Mismo armado que el chat (copia del grafo incluida)
+    pipeline = build_pipeline(
+        chain,
+        pipeline_class=TimedPipeline,
+        ollama_max_concurrency=ollama_concurrency,
+        cypher_few_shot_k=3 if few_shot == "dinamico" else 0,
+        result_max_rows=max_rows,
+        timer=timer,
+    )
+
+    errors = Counter()
+
+    def _user(_):
+        for _ in range(rounds):
+            for question in questions:
+                try:
+                    pipeline.run(question)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(_user, range(users)))
+    qa_seconds = time.perf_counter() - start
+    answered = users * rounds * len(questions)
+
+    driver = SyntheticDriver(graph)
+    start = time.perf_counter()
+    for text, entities in scouting_reports(reports):
+        with timer.measure("scouting"):
+            update_graph_with_entities(driver, entities, text)
+    scouting_seconds = time.perf_counter() - start
+
+    return {
+        "jugadores": players,
+        "usuarios": users,
+        "preguntas": answered,
+        "armado_grafo_seg": build_seconds,
+        "throughput_preguntas_seg": answered / qa_seconds if qa_seconds else None,
+        "throughput_reportes_seg": reports / scouting_seconds if scouting_seconds else None,
+        "caminos": dict(pipeline.stats),
+        "tokens_prompt_cypher": {
+            "n": len(pipeline.cypher_prompt_tokens),
+            "p50": percentile(pipeline.cypher_prompt_tokens, 50),
+            "max": max(pipeline.cypher_prompt_tokens, default=None),
+        },
+        "bytes_contexto": {
+            "n": len(pipeline.context_bytes),
+            "p50": percentile(pipeline.context_bytes, 50),
+            "max": max(pipeline.context_bytes, default=None),
+        },
+        "errores": dict(errors),
+        "etapas": summarize(timer.samples),
+    }
+
+
+def _int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin Ollama ni Neo4j")
+    parser.add_argument("--players", type=_int_list, default=DEFAULT_PLAYERS, help="Tamaños de grafo, ej. 10,1000,100000")
+    parser.add_argument("--users", type=_int_list, default=DEFAULT_USERS, help="Usuarios simultáneos, ej. 1,4,8")
+    parser.add_argument("--rounds", type=int, default=2, help="Veces que cada usuario hace todas las preguntas")
+    parser.add_argument("--reports", type=int, default=10, help="Reportes de scouting por escenario")
+    parser.add_argument("--variants", type=int, default=3, help="Variantes por pregunta con nombre")
+    parser.add_argument("--cypher-latency", type=float, default=0.05, help="Segundos por generación de Cypher")
+    parser.add_argument("--answer-latency", type=float, default=0.05, help="Segundos por respuesta del LLM")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Segundos por token generado")
+    parser.add_argument("--query-latency", type=float, default=0.0, help="Segundos extra por consulta al grafo")
+    parser.add_argument("--prefill-latency", type=float, default=0.0, help="Segundos por palabra del prompt (prefill)")
+    parser.add_argument("--few-shot", choices=["dinamico", "todos"], default="dinamico",
+                        help="Ejemplos del prompt Cypher: elegidos por pregunta o todos")
+    parser.add_argument("--max-filas", type=int, default=DEFAULT_MAX_ROWS,
+                        help="Tope de filas por consulta generada (0 = sin límite)")
+    parser.add_argument("--ollama-concurrency", type=int, default=1, help="Llamadas simultáneas al LLM")
+    parser.add_argument("--output", help="Guardar el JSON en este archivo")
+    args = parser.parse_args()
+
+    results = []
+    for players in args.players:
+        for users in args.users:
+            result = run_scenario(
+                players, users,
+                rounds=args.rounds,
+                reports=args.reports,
+                cypher_latency=args.cypher_latency,
+                answer_latency=args.answer_latency,
+                token_latency=args.token_latency,
+                query_latency=args.query_latency,
+                ollama_concurrency=args.ollama_concurrency,
+                variants=args.variants,
+                prefill_latency=args.prefill_latency,
+                few_shot=args.few_shot,
+                max_rows=args.max_filas,
+            )
+            total = result["etapas"].get("total", {})
+            cypher = result["etapas"].get("cypher_llm", {})
+            print(
+                f"✓ {players} jugadores · {users} usuarios: "
+                f"{result['throughput_preguntas_seg']:.1f} preguntas/s · "
+                f"total p50 {total.get('p50_ms', 0):.1f} ms, p95 {total.get('p95_ms', 0):.1f} ms · "
+                f"Cypher p50 {cypher.get('p50_ms', 0):.1f} ms, "
+                f"prompt p50 {result['tokens_prompt_cypher']['p50'] or 0} tokens",
+                flush=True,
+            )
+            results.append(result)
+
+    report = {
+        "configuracion": {k: v for k, v in vars(args).items() if k != "output"},
+        "escenarios": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Resultados guardados en {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Carga masiva del grafo desde archivos de datos (CSV o JSON).
+
+Cada archivo se escribe en lotes con UNWIND $rows, un lote por transacción,
+y los nodos se enlazan por ids estables (Jugador.id, EstadoFisico.id,
+Partido.id, Recomendacion.id, Rival.nombre) en lugar de buscar por valores
+como {cansancio: 75}.
+
+Uso:
+    python3 bulk_loader.py --data-dir data --batch-size 5000 [--reset]
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from connections import add_neo4j_arguments, close_all, get_driver, settings_from_args
+from graph_version import bump_graph_version
+from schema_bootstrap import bootstrap_schema
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+# --- Definición de los archivos y sus consultas ---
+# Orden de carga: los nodos referenciados se cargan antes que sus relaciones.
+# "links" son columnas que se usan para enlazar y no se guardan como propiedades.
+
+DATASETS = [
+    {
+        "name": "jugadores",
+        "query": (
+            "UNWIND $rows AS row "
+            "MERGE (j:Jugador {id: row.id}) "
+            "SET j += row.props"
+        ),
+        "links": ["id"],
+        "types": {},
+    },
+    {
+        "name": "rivales",
+        "query": (
+            "UNWIND $rows AS row "
+            "MERGE (r:Rival {nombre: row.nombre}) "
+            "SET r += row.props"
+        ),
+        "links": ["nombre"],
+        "types": {},
+    },
+    {
+        "name": "partidos",
+        "query": (
+            "UNWIND $rows AS row "
+            "MERGE (p:Partido {id: row.id}) "
+            "SET p += row.props "
+            "WITH p, row WHERE row.rival IS NOT NULL "
+            "MATCH (r:Rival {nombre: row.rival}) "
+            "MERGE (p)-[:ENFRENTA]->(r)"
+        ),
+        "links": ["id", "rival"],
+        "types": {"minuto": int},
+    },
+    {
+        "name": "convocatorias",
+        "query": (
+            "UNWIND $rows AS row "
+            "MATCH (j:Jugador {id: row.jugador_id}) "
+            "MATCH (p:Partido {id: row.partido_id}) "
+            "MERGE (j)-[:JUEGA_EN]->(p)"
+        ),
+        "links": ["jugador_id", "partido_id"],
+        "types": {},
+    },
+    {
+        "name": "estados",
+        "query": (
+            "UNWIND $rows AS row "
+            "MATCH (j:Jugador {id: row.jugador_id}) "
+            "MERGE (e:EstadoFisico {id: row.id}) "
+            "SET e += row.props, e.partido_id = row.partido_id, e.cambio = timestamp() "
+            "MERGE (j)-[:TIENE_ESTADO]->(e)"
+        ),
+        "links": ["id", "jugador_id", "partido_id"],
+        "types": {"cansancio": float, "riesgoLesion": float, "minuto": int, "ritmo_cardiaco": float},
+    },
+    {
+        "name": "recomendaciones",
+        "query": (
+            "UNWIND $rows AS row "
+            "MATCH (e:EstadoFisico {id: row.estado_id}) "
+            "MERGE (r:Recomendacion {id: row.id}) "
+            "SET r += row.props, r.cambio = timestamp() "
+            "MERGE (e)-[:GENERA_RECOMENDACION]->(r)"
+        ),
+        "links": ["id", "estado_id"],
+        "types": {"confianza": float},
+    },
+]
+
+
+# --- Lectura de archivos ---
+
+def _convert(value, type_):
+    if value is None or value == "":
+        return None
+    if type_ is str and not isinstance(value, str):
+        # JSON: los valores ya vienen tipados
+        return value
+    if type_ is int and isinstance(value, str):
+        return int(float(value))
+    return type_(value)
+
+
+def _find_file(data_dir, name):
+    for ext in (".csv", ".json", ".jsonl"):
+        path = os.path.join(data_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _raw_rows(path):
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+def read_rows(path, dataset):
+    """
+    Lee el archivo y arma las filas para UNWIND: columnas de enlace al
+    primer nivel y el resto (con tipos convertidos) dentro de row.props.
+    """
+    types = dataset["types"]
+    links = dataset["links"]
+    for raw in _raw_rows(path):
+        row = {key: (raw.get(key) or None) for key in links}
+        props = {}
+        for key, value in raw.items():
+            if key in links:
+                continue
+            value = _convert(value, types.get(key, str))
+            if value is not None:
+                props[key] = value
+        row["props"] = props
+        yield row
+
+
+def batched(rows, size):
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- Escritura ---
+
+def _write_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+
+def clear_graph(driver, batch_size=DEFAULT_BATCH_SIZE, database=None):
+    """
+    Borra todo el grafo en transacciones chicas (no agota la memoria con grafos grandes).
+    Aumenta la versión del grafo aunque la carga que sigue falle.
+    """
+    try:
+        with driver.session(database=database) as session:
+            session.run(
+                "MATCH (n) CALL { WITH n DETACH DELETE n } "
+                f"IN TRANSACTIONS OF {int(batch_size)} ROWS"
+            ).consume()
+    finally:
+        # Cada lote borrado ya se confirmó: las respuestas cacheadas y la copia
+        # del grafo de la app no pueden seguir sirviendo esos nodos
+        bump_graph_version()
+
+
+def load_dataset(driver, dataset, path, batch_size=DEFAULT_BATCH_SIZE, database=None):
+    """
+    Carga un archivo en lotes. Devuelve (filas, segundos).
+    """
+    total = 0
+    start = time.perf_counter()
+    with driver.session(database=database) as session:
+        for batch in batched(read_rows(path, dataset), batch_size):
+            session.execute_write(_write_batch, dataset["query"], batch)
+            total += len(batch)
+    return total, time.perf_counter() - start
+
+
+def load_all(driver, data_dir=DEFAULT_DATA_DIR, batch_size=DEFAULT_BATCH_SIZE, verbose=True,
+             database=None):
+    """
+    Crea constraints e índices y carga todos los archivos presentes en
+    data_dir (en database; None es la base por defecto del servidor).
+    Devuelve una lista de estadísticas por archivo y aumenta la versión del
+    grafo, también si la carga falla a mitad de camino.
+    """
+    # Constraints e índices primero: los MATCH/MERGE por id los necesitan
+    bootstrap_schema(driver, database=database)
+
+    stats = []
+    try:
+        for dataset in DATASETS:
+            path = _find_file(data_dir, dataset["name"])
+            if path is None:
+                continue
+            rows, seconds = load_dataset(driver, dataset, path, batch_size, database)
+            rate = rows / seconds if seconds > 0 else float("inf")
+            stats.append({"archivo": dataset["name"], "filas": rows, "segundos": seconds, "filas_por_seg": rate})
+            if verbose:
+                print(f"✓ {dataset['name']}: {rows} filas en {seconds:.2f}s ({rate:,.0f} filas/s)")
+    finally:
+        # El grafo cambió (aunque sea en parte): invalidar los cachés de la app
+        bump_graph_version()
+
+    if verbose and stats:
+        total_rows = sum(s["filas"] for s in stats)
+        total_seconds = sum(s["segundos"] for s in stats)
+        rate = total_rows / total_seconds if total_seconds > 0 else float("inf")
+        print(f"\nTotal: {total_rows} filas en {total_seconds:.2f}s ({rate:,.0f} filas/s)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga masiva del grafo de DT Virtual Amateur")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Carpeta con los CSV/JSON")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Filas por transacción")
+    parser.add_argument("--reset", action="store_true", help="Borrar el grafo antes de cargar")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    settings = settings_from_args(args)
+    driver = get_driver(settings)
+    try:
+        if args.reset:
+            clear_graph(driver, args.batch_size, database=settings.neo4j_database)
+            print("✓ Base de datos limpiada")
+        load_all(driver, args.data_dir, args.batch_size, database=settings.neo4j_database)
+    finally:
+        close_all()
+
+
+if __name__ == "__main__":
+    main()
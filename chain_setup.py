@@ -0,0 +1,77 @@
+"""
+Prompts y armado de la GraphCypherQAChain.
+
+Vive fuera de app.py para que la cadena se pueda construir sin Streamlit
+(hilo de arranque en segundo plano, scripts por línea de comandos).
+"""
+from langchain_community.chains.graph_qa.cypher import GraphCypherQAChain
+from langchain_core.prompts import PromptTemplate
+
+from cypher_examples import DEFAULT_EXAMPLES, format_examples
+
+# Todos los ejemplos, para cuando no hay selección por pregunta
+ALL_EXAMPLES = format_examples(DEFAULT_EXAMPLES)
+
+# PLANTILLA DE PROMPT CYPHER (La clave de tu PG6)
+# Los ejemplos y el schema los completa QAPipeline por pregunta: solo los
+# ejemplos más parecidos y las etiquetas que usan (ver cypher_examples.py).
+# Llamada como GraphCypherQAChain, van todos los ejemplos
+CYPHER_PROMPT_TEMPLATE = PromptTemplate(
+    input_variables=["schema", "question"],
+    partial_variables={"examples": ALL_EXAMPLES},
+    template="""You are a Neo4j Cypher expert. Generate ONLY valid Cypher syntax.
+
+CRITICAL RULES:
+- NEVER use SQL keywords: SELECT, FROM, JOIN, INSERT, UPDATE, DELETE
+- ALWAYS use Cypher keywords: MATCH, WHERE, RETURN
+- For exact matches use: {{property: 'value'}}
+- For partial matches use: WHERE property CONTAINS 'value'
+- NEVER use CONTAINS inside {{}}
+- Use exact property names from schema
+
+SCHEMA:
+{schema}
+
+EXAMPLES (copy these patterns EXACTLY):
+
+{examples}
+
+Question: {question}
+
+Generate ONLY the Cypher query (no explanations). Use WHERE with CONTAINS for partial matches:
+"""
+)
+
+# PLANTILLA DE PROMPT DE RESPUESTA (La clave de tu PG6)
+QA_PROMPT_TEMPLATE = PromptTemplate(
+    input_variables=["question", "context"],
+    template="""
+Eres un asistente de Director Técnico de fútbol.
+Se te da una pregunta y el resultado de una consulta a la base de datos (Contexto).
+Debes responder la pregunta en español usando UNICAMENTE la información del contexto.
+Sé directo y conciso.
+Si el contexto está vacío, di que no encontraste información.
+
+Pregunta: {question}
+Contexto (Resultado de la consulta): {context}
+Respuesta:
+"""
+)
+
+
+# --- ARMADO DE LA CADENA ---
+
+def build_chain(llm, graph):
+    """
+    Crea la GraphCypherQAChain con los PromptTemplates. El Cypher generado
+    lo valida QAPipeline (cypher_validator.CypherValidator, con el schema).
+    """
+    return GraphCypherQAChain.from_llm(
+        llm,
+        graph=graph,
+        verbose=True, # Para ver la consulta en la terminal
+        cypher_prompt=CYPHER_PROMPT_TEMPLATE, # ¡Tu prompt personalizado!
+        qa_prompt=QA_PROMPT_TEMPLATE,         # ¡Tu prompt personalizado!
+        return_intermediate_steps=True, # Para mostrar el Cypher en la UI
+        allow_dangerous_requests=True,  # Requerido por LangChain para operaciones con bases de datos
+    )
@@ -0,0 +1,214 @@
+"""
+Historial del chat persistido en SQLite y paginado.
+
+Antes cada rerun de Streamlit recorría todos los mensajes de
+st.session_state (con el Cypher y las filas de cada respuesta): en una
+sesión larga de partido cada tecla era más lenta y la memoria crecía.
+
+- ChatStore: un archivo SQLite compartido por todas las sesiones. Cada
+  mensaje es una fila; los pasos intermedios pesados (filas del resultado y
+  parámetros) se guardan comprimidos aparte y solo se leen con context().
+- ChatHistory: la vista de una sesión para la UI. Tiene en memoria solo los
+  últimos `window` mensajes livianos (texto, Cypher, camino, métricas); los
+  anteriores se cargan de a páginas cuando se piden.
+
+La sesión se identifica con un id (en la app, el parámetro ?sesion= de la
+URL), así recargar la página retoma la conversación.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+HISTORY_DB = os.environ.get(
+    "DT_CHAT_HISTORY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chat_history.sqlite"),
+)
+DEFAULT_WINDOW = 20
+DEFAULT_PAGE_SIZE = 20
+
+# Campos livianos de cada mensaje (los que se dibujan)
+MESSAGE_FIELDS = ("role", "content", "query", "path", "intent", "answered_by", "metrics")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mensajes (
+    sesion TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    query TEXT,
+    path TEXT,
+    intent TEXT,
+    answered_by TEXT,
+    metrics TEXT,
+    pasos BLOB,
+    PRIMARY KEY (sesion, seq)
+)
+"""
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:12]
+
+
+def compact_message(message):
+    """
+    (mensaje liviano, pasos pesados) de un mensaje del chat: el Cypher
+    queda en "query"; el contexto y los parámetros van aparte.
+    """
+    steps = dict(message.get("intermediate_steps") or {})
+    light = {key: message.get(key) for key in MESSAGE_FIELDS if key != "query"}
+    light["query"] = steps.pop("query", None)
+    return light, steps
+
+
+def _pack(steps):
+    if not steps:
+        return None
+    return zlib.compress(json.dumps(steps, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _unpack(blob):
+    if blob is None:
+        return {}
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ChatStore:
+    """
+    Mensajes de todas las sesiones en un archivo SQLite. Una conexión
+    compartida entre hilos, serializada con un lock.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def append(self, session_id, message):
+        """Guarda un mensaje al final de la sesión. Devuelve (seq, mensaje liviano)."""
+        light, steps = compact_message(message)
+        with self._lock, self._conn:
+            (last,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM mensajes WHERE sesion = ?", (session_id,)
+            ).fetchone()
+            seq = last + 1
+            self._conn.execute(
+                "INSERT INTO mensajes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session_id, seq, time.time(), light["role"], light["content"] or "",
+                    light["query"], light["path"], light["intent"], light["answered_by"],
+                    json.dumps(light["metrics"]) if light["metrics"] else None,
+                    _pack(steps),
+                ),
+            )
+        light["seq"] = seq
+        return seq, light
+
+    def count(self, session_id):
+        with self._lock:
+            (n,) = self._conn.execute(
+                "SELECT COUNT(*) FROM mensajes WHERE sesion = ?", (session_id,)
+            ).fetchone()
+        return n
+
+    def page(self, session_id, before=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Hasta `limit` mensajes livianos anteriores a seq `before` (o los
+        últimos), en orden cronológico.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, {', '.join(MESSAGE_FIELDS)} FROM mensajes "
+                "WHERE sesion = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before if before is not None else 2 ** 62, limit),
+            ).fetchall()
+        messages = []
+        for seq, *values in reversed(rows):
+            message = dict(zip(MESSAGE_FIELDS, values))
+            message["metrics"] = json.loads(message["metrics"]) if message["metrics"] else None
+            message["seq"] = seq
+            messages.append(message)
+        return messages
+
+    def context(self, session_id, seq):
+        """Pasos intermedios guardados de un mensaje (filas y parámetros)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pasos FROM mensajes WHERE sesion = ? AND seq = ?", (session_id, seq)
+            ).fetchone()
+        return _unpack(row[0]) if row else {}
+
+    def sessions(self, limit=10):
+        """Últimas sesiones: [(id, mensajes, último mensaje)]."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT sesion, COUNT(*), MAX(creado) FROM mensajes "
+                "GROUP BY sesion ORDER BY MAX(creado) DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+
+class ChatHistory:
+    """
+    Ventana de una sesión: los últimos `window` mensajes en memoria y las
+    páginas anteriores que se fueron pidiendo con load_older().
+    """
+
+    def __init__(self, store, session_id, window=DEFAULT_WINDOW, page_size=DEFAULT_PAGE_SIZE):
+        self.store = store
+        self.session_id = session_id
+        self.page_size = page_size
+        self.recent = deque(store.page(session_id, limit=window), maxlen=window)
+        self.older = []
+
+    def append(self, message):
+        _, light = self.store.append(self.session_id, message)
+        self.recent.append(light)
+        return light
+
+    def _first_seq(self):
+        if self.older:
+            return self.older[0]["seq"]
+        return self.recent[0]["seq"] if self.recent else None
+
+    @property
+    def has_older(self):
+        first = self._first_seq()
+        return first is not None and first > 1
+
+    def load_older(self):
+        """Carga la página anterior a lo que ya está en memoria. Devuelve cuántos."""
+        first = self._first_seq()
+        if first is None:
+            return 0
+        page = self.store.page(self.session_id, before=first, limit=self.page_size)
+        self.older = page + self.older
+        return len(page)
+
+    def messages(self):
+        """Mensajes a dibujar, en orden: páginas cargadas y ventana reciente."""
+        if not self.older:
+            return list(self.recent)
+        # Con páginas cargadas, la ventana puede haber dejado huecos: se completan
+        last_older = self.older[-1]["seq"]
+        first_recent = self.recent[0]["seq"] if self.recent else last_older + 1
+        if first_recent > last_older + 1:
+            gap = self.store.page(self.session_id, before=first_recent, limit=first_recent - last_older - 1)
+            self.older.extend(gap)
+        return self.older + list(self.recent)
+
+    def context(self, message):
+        return self.store.context(self.session_id, message["seq"])
@@ -0,0 +1,293 @@
+"""
+Conexiones compartidas a Neo4j y Ollama.
+
+app.py, la página de scouting y recreate_db.py armaban cada uno su driver
+(con credenciales escritas en el código, el pool por defecto, sin timeouts
+ni reintentos). Este módulo es el único lugar que los crea:
+
+- Configuración: valores por defecto, pisados por el archivo JSON
+  DT_CONNECTIONS_FILE (conexiones.json) y luego por variables de entorno
+  (NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, DT_NEO4J_POOL_SIZE, ...).
+- Un driver de Neo4j por proceso y configuración (las páginas de
+  Streamlit comparten proceso) con tamaño de pool, timeout para conseguir
+  una conexión, de conexión y por consulta, y chequeo de conexiones ociosas.
+- SharedNeo4jGraph: el Neo4jGraph de LangChain sobre ese driver, con
+  reintentos con espera exponencial si Neo4j no está disponible un momento.
+- chat_model(): ChatOllama con keep_alive, así Ollama no descarga Mistral
+  entre preguntas (la recarga en frío es la peor latencia del chat).
+- pool_stats(): conexiones abiertas / en uso y contadores de consultas,
+  reintentos y fallas.
+- add_neo4j_arguments()/settings_from_args(): --uri/--user/--password de los
+  scripts de línea de comandos, que solo pisan la configuración si se pasan.
+"""
+import dataclasses
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from langchain_community.graphs import Neo4jGraph
+from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+CONNECTIONS_FILE = os.environ.get(
+    "DT_CONNECTIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "conexiones.json"),
+)
+
+# Errores pasajeros: Neo4j reiniciando, conexión cortada, cambio de líder
+RETRYABLE_ERRORS = (ServiceUnavailable, SessionExpired)
+
+
+@dataclass
+class ConnectionSettings:
+    neo4j_uri: str = "neo4j://127.0.0.1:7687"
+    neo4j_user: str = "neo4j"
+    neo4j_password: str = "neo4j123"
+    neo4j_database: str = "neo4j"
+    # Pool del driver (segundos para los tiempos)
+    pool_size: int = 20
+    acquisition_timeout: float = 10.0
+    connection_timeout: float = 5.0
+    query_timeout: float = 30.0
+    max_connection_lifetime: float = 3600.0
+    liveness_check_timeout: float = 60.0
+    # Reintentos ante RETRYABLE_ERRORS: espera backoff, 2*backoff, ... hasta max_backoff
+    retries: int = 3
+    backoff_seconds: float = 0.2
+    max_backoff_seconds: float = 2.0
+    # Ollama
+    ollama_url: str = "http://localhost:11434"
+    ollama_model: str = "mistral"
+    ollama_keep_alive: str = "30m"
+    ollama_timeout: int = 120
+
+
+# Variable de entorno de cada campo
+ENV_VARS = {
+    "neo4j_uri": "NEO4J_URI",
+    "neo4j_user": "NEO4J_USERNAME",
+    "neo4j_password": "NEO4J_PASSWORD",
+    "neo4j_database": "NEO4J_DATABASE",
+    "pool_size": "DT_NEO4J_POOL_SIZE",
+    "acquisition_timeout": "DT_NEO4J_ACQUISITION_TIMEOUT",
+    "connection_timeout": "DT_NEO4J_CONNECTION_TIMEOUT",
+    "query_timeout": "DT_NEO4J_QUERY_TIMEOUT",
+    "max_connection_lifetime": "DT_NEO4J_MAX_CONNECTION_LIFETIME",
+    "liveness_check_timeout": "DT_NEO4J_LIVENESS_CHECK_TIMEOUT",
+    "retries": "DT_NEO4J_RETRIES",
+    "backoff_seconds": "DT_NEO4J_BACKOFF",
+    "max_backoff_seconds": "DT_NEO4J_MAX_BACKOFF",
+    "ollama_url": "DT_OLLAMA_URL",
+    "ollama_model": "DT_OLLAMA_MODEL",
+    "ollama_keep_alive": "DT_OLLAMA_KEEP_ALIVE",
+    "ollama_timeout": "DT_OLLAMA_TIMEOUT",
+}
+
+
+def load_settings(path=CONNECTIONS_FILE, environ=os.environ):
+    """
+    Configuración de conexiones: por defecto < archivo JSON < entorno.
+    """
+    values = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            values.update(json.load(f))
+    for name, var in ENV_VARS.items():
+        if environ.get(var):
+            values[name] = environ[var]
+    fields = {f.name: f for f in dataclasses.fields(ConnectionSettings)}
+    unknown = set(values) - set(fields)
+    if unknown:
+        raise ValueError(f"Claves desconocidas en la configuración de conexiones: {', '.join(sorted(unknown))}")
+    # Del entorno todo llega como texto: se convierte al tipo del campo
+    typed = {name: fields[name].type(value) if fields[name].type in (int, float) else value
+             for name, value in values.items()}
+    return ConnectionSettings(**typed)
+
+
+_settings = None
+_drivers = {}
+_lock = threading.Lock()
+_counters = {"consultas": 0, "reintentos": 0, "fallas": 0}
+
+
+def get_settings():
+    """Configuración del proceso (se lee una vez)."""
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = load_settings()
+        return _settings
+
+
+def add_neo4j_arguments(parser):
+    """Agrega --uri/--user/--password a un script (por defecto, get_settings())."""
+    parser.add_argument("--uri", help="URI de Neo4j (por defecto, la de connections.py)")
+    parser.add_argument("--user", help="Usuario de Neo4j")
+    parser.add_argument("--password", help="Contraseña de Neo4j")
+
+
+def settings_from_args(args):
+    """get_settings() pisada por los --uri/--user/--password que se pasaron."""
+    overrides = {"neo4j_uri": args.uri, "neo4j_user": args.user, "neo4j_password": args.password}
+    return dataclasses.replace(get_settings(), **{k: v for k, v in overrides.items() if v})
+
+
+def _count(key, n=1):
+    with _lock:
+        _counters[key] += n
+
+
+def _driver_key(settings):
+    """Todo lo que se usa para crear el driver: credenciales, pool y tiempos."""
+    return (
+        settings.neo4j_uri, settings.neo4j_user, settings.neo4j_password,
+        settings.pool_size, settings.acquisition_timeout, settings.connection_timeout,
+        settings.max_connection_lifetime, settings.liveness_check_timeout,
+    )
+
+
+def get_driver(settings=None):
+    """
+    Driver de Neo4j compartido por todo el proceso (uno por cada
+    combinación de URI, credenciales y configuración del pool: otra
+    contraseña u otro tamaño de pool no reutilizan el driver anterior).
+    """
+    settings = settings or get_settings()
+    key = _driver_key(settings)
+    with _lock:
+        driver = _drivers.get(key)
+        if driver is None:
+            driver = GraphDatabase.driver(
+                settings.neo4j_uri,
+                auth=(settings.neo4j_user, settings.neo4j_password),
+                max_connection_pool_size=settings.pool_size,
+                connection_acquisition_timeout=settings.acquisition_timeout,
+                connection_timeout=settings.connection_timeout,
+                max_connection_lifetime=settings.max_connection_lifetime,
+                liveness_check_timeout=settings.liveness_check_timeout,
+                keep_alive=True,
+            )
+            _drivers[key] = driver
+        return driver
+
+
+def with_retry(fn, *args, settings=None, **kwargs):
+    """
+    Llama fn(*args, **kwargs) y la repite con espera exponencial si Neo4j
+    no está disponible. Otros errores (sintaxis, autenticación) no se repiten.
+    """
+    settings = settings or get_settings()
+    delay = settings.backoff_seconds
+    for attempt in range(settings.retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except RETRYABLE_ERRORS:
+            if attempt == settings.retries:
+                _count("fallas")
+                raise
+            _count("reintentos")
+            time.sleep(delay)
+            delay = min(delay * 2, settings.max_backoff_seconds)
+
+
+class SharedNeo4jGraph(Neo4jGraph):
+    """
+    Neo4jGraph sobre el driver compartido, con timeout por consulta y
+    reintentos. No abre un driver propio ni lo cierra.
+    """
+
+    def __init__(self, settings=None, refresh_schema=False, sanitize=False):
+        self.settings = settings or get_settings()
+        self._driver = get_driver(self.settings)
+        self._database = self.settings.neo4j_database
+        self.timeout = self.settings.query_timeout
+        self.sanitize = sanitize
+        self._enhanced_schema = False
+        self.schema = ""
+        self.structured_schema = {}
+        with_retry(self._driver.verify_connectivity, settings=self.settings)
+        if refresh_schema:
+            self.refresh_schema()
+
+    def query(self, query, params={}):
+        _count("consultas")
+        return with_retry(super().query, query, params, settings=self.settings)
+
+    def read(self, query, params=None, fetch_size=None, consume=list):
+        """
+        Como query(), pero devuelve consume(registros) con los registros
+        leídos de a fetch_size a medida que llegan: quien consume puede
+        dejar de leer y al cerrar la sesión Neo4j descarta el resto.
+        """
+        from neo4j import Query
+
+        def _read():
+            with self._driver.session(database=self._database, fetch_size=fetch_size or 1000) as session:
+                result = session.run(Query(query, timeout=self.timeout), params or {})
+                records = (record.data() for record in result)
+                if self.sanitize:
+                    from langchain_community.graphs.neo4j_graph import value_sanitize
+
+                    records = (value_sanitize(record) for record in records)
+                return consume(records)
+
+        _count("consultas")
+        return with_retry(_read, settings=self.settings)
+
+    def close(self):
+        # El driver es del proceso (ver close_all)
+        pass
+
+
+def neo4j_graph(settings=None, refresh_schema=False):
+    return SharedNeo4jGraph(settings, refresh_schema=refresh_schema)
+
+
+def chat_model(settings=None, **kwargs):
+    """ChatOllama con la URL, el modelo y el keep_alive configurados."""
+    from langchain_community.chat_models import ChatOllama
+
+    settings = settings or get_settings()
+    options = {
+        "model": settings.ollama_model,
+        "base_url": settings.ollama_url,
+        "keep_alive": settings.ollama_keep_alive,
+        "timeout": settings.ollama_timeout,
+        "temperature": 0,
+    }
+    options.update(kwargs)
+    return ChatOllama(**options)
+
+
+def pool_stats(settings=None):
+    """
+    Uso del pool del driver compartido y contadores de consultas. Las
+    conexiones se leen del pool interno del driver (si la versión del
+    driver no lo expone, quedan en None).
+    """
+    settings = settings or get_settings()
+    with _lock:
+        stats = dict(_counters)
+        driver = _drivers.get(_driver_key(settings))
+    stats["tamaño_pool"] = settings.pool_size
+    stats["abiertas"] = stats["en_uso"] = None
+    if driver is not None:
+        try:
+            connections = [c for pool in list(driver._pool.connections.values()) for c in list(pool)]
+            stats["abiertas"] = len(connections)
+            stats["en_uso"] = sum(1 for c in connections if c.in_use)
+        except AttributeError:
+            pass
+    return stats
+
+
+def close_all():
+    """Cierra los drivers del proceso (al terminar un script)."""
+    with _lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for driver in drivers:
+        driver.close()
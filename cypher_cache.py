@@ -0,0 +1,79 @@
+"""
+Caché de plantillas Cypher por "forma" de pregunta.
+
+"¿Cuál es el cansancio de Martinez?" y "¿Cuál es el cansancio de Gomez?"
+generan la misma consulta salvo por un literal. Con el índice de entidades
+(entity_index.py) ambas preguntas se convierten en la misma plantilla
+"cual es el cansancio de <Jugador>", y la consulta generada por el LLM se
+guarda con los nombres reemplazados por parámetros ($e0, $e1, ...). Las
+siguientes preguntas con la misma forma reutilizan la consulta sin volver a
+llamar al LLM.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from answer_cache import normalize_question
+
+# Literales de texto en Cypher: 'valor' o "valor"
+_STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+
+
+def parameterize_cypher(cypher, entities):
+    """
+    Reemplaza los literales que corresponden a las entidades detectadas por
+    parámetros Cypher. Devuelve la plantilla, o None si alguna entidad no
+    aparece como literal (en ese caso la consulta no es reutilizable).
+    """
+    by_name = {normalize_question(e["nombre"]): e["param"] for e in entities}
+    used = set()
+
+    def _replace(match):
+        literal = match.group(1) if match.group(1) is not None else match.group(2)
+        param = by_name.get(normalize_question(literal))
+        if param is None:
+            return match.group(0)
+        used.add(param)
+        return f"${param}"
+
+    template = _STRING_LITERAL.sub(_replace, cypher)
+    if used != set(by_name.values()):
+        return None
+    return template
+
+
+class CypherTemplateCache:
+    """
+    Caché LRU: plantilla de pregunta -> plantilla Cypher parametrizada.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, question_template):
+        with self._lock:
+            cypher = self._entries.get(question_template)
+            if cypher is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(question_template)
+            self.hits += 1
+            return cypher
+
+    def put(self, question_template, cypher_template):
+        with self._lock:
+            self._entries[question_template] = cypher_template
+            self._entries.move_to_end(question_template)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,271 @@
+"""
+Ejemplos few-shot del prompt Cypher, elegidos por pregunta.
+
+En lugar de mandar todos los ejemplos y el schema completo en cada llamada,
+ExampleStore elige los k ejemplos más parecidos a la pregunta y arma solo
+el pedazo del schema con las etiquetas que usan esos ejemplos (más las de
+las entidades reconocidas en la pregunta). Menos tokens de prompt es menos
+tiempo de prefill en Ollama.
+
+- El parecido se calcula sobre la pregunta con los nombres reemplazados por
+  su etiqueta ("quien es el jugador clave de <Rival>"), con peso idf por
+  palabra: dos preguntas con la misma forma y distinto nombre son iguales.
+- Los ejemplos con la misma consulta salvo los literales (las variantes
+  "jugador clave" / "jugador estrella") cuentan una sola vez.
+- Se pueden agregar ejemplos sin tocar el prompt: ExampleStore.add() o un
+  archivo JSONL (DT_CYPHER_EXAMPLES_FILE) con {"question", "cypher"} por línea.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from answer_cache import normalize_question
+
+EXAMPLES_FILE = os.environ.get(
+    "DT_CYPHER_EXAMPLES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cypher_examples.jsonl"),
+)
+DEFAULT_K = 3
+# Un ejemplo entra si su parecido es al menos esta fracción del mejor
+MIN_RELATIVE_SCORE = 0.5
+
+DEFAULT_EXAMPLES = [
+    {
+        "question": "¿Qué jugadores deben ser sustituidos?",
+        "cypher": "MATCH (j:Jugador)-[:TIENE_ESTADO]->()-[:GENERA_RECOMENDACION]->(r:Recomendacion)\n"
+                  "WHERE r.accion CONTAINS 'Sustitucion'\n"
+                  "RETURN j.nombre",
+    },
+    {
+        "question": "¿Cuál es el cansancio de Martinez?",
+        "cypher": "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico)\n"
+                  "WHERE j.nombre = 'Martinez'\n"
+                  "RETURN e.cansancio",
+    },
+    {
+        "question": "¿Qué rivales tenemos?",
+        "cypher": "MATCH (r:Rival)\n"
+                  "RETURN r.nombre",
+    },
+    {
+        "question": "¿Quién es el jugador clave de Boca Unidos?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE r.nombre CONTAINS 'Boca Unidos'\n"
+                  "RETURN j.nombre",
+    },
+    {
+        "question": "¿Quién es el jugador estrella de Atletico Parana?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE r.nombre CONTAINS 'Atletico Parana'\n"
+                  "RETURN j.nombre",
+    },
+    {
+        "question": "¿Quién es el jugador clave de Atletico Parana?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE r.nombre CONTAINS 'Atletico Parana'\n"
+                  "RETURN j.nombre",
+    },
+    {
+        "question": "¿Qué información tenemos sobre Rodriguez?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE j.nombre CONTAINS 'Rodriguez'\n"
+                  "RETURN r.nombre AS Equipo, j.nombre AS Jugador",
+    },
+    {
+        "question": "¿Qué información tenemos sobre Fernandez?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE j.nombre CONTAINS 'Fernandez'\n"
+                  "RETURN r.nombre AS Equipo, j.nombre AS Jugador",
+    },
+    {
+        "question": "¿De qué equipo es Rodriguez?",
+        "cypher": "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival)\n"
+                  "WHERE j.nombre CONTAINS 'Rodriguez'\n"
+                  "RETURN r.nombre",
+    },
+    {
+        "question": "¿Contra quién jugamos?",
+        "cypher": "MATCH (p:Partido)-[:ENFRENTA]->(r:Rival)\n"
+                  "RETURN r.nombre",
+    },
+]
+
+# Palabras de la pregunta que ya indican qué etiquetas hacen falta (por prefijo)
+KEYWORD_LABELS = {
+    "cansa": ("Jugador", "EstadoFisico"),
+    "fatiga": ("Jugador", "EstadoFisico"),
+    "ritmo": ("Jugador", "EstadoFisico"),
+    "riesgo": ("Jugador", "EstadoFisico"),
+    "lesion": ("Jugador", "EstadoFisico"),
+    "sustitu": ("Jugador", "EstadoFisico", "Recomendacion"),
+    "cambi": ("Jugador", "EstadoFisico", "Recomendacion"),
+    "recomend": ("Jugador", "EstadoFisico", "Recomendacion"),
+    "partido": ("Partido", "Rival"),
+    "jugamos": ("Partido", "Rival"),
+    "resultado": ("Partido",),
+    "rival": ("Rival",),
+    "equipo": ("Rival",),
+    "clave": ("Rival", "JugadorRival"),
+    "estrella": ("Rival", "JugadorRival"),
+}
+
+_NODE_LABEL = re.compile(r"\(\s*(\w*)\s*:\s*(\w+)")
+_REL_TYPE = re.compile(r"\[\s*\w*\s*:\s*(\w+)")
+_FILTER_LITERAL = re.compile(r"(\w+)\.\w+\s*(?:CONTAINS|=|STARTS WITH|ENDS WITH)\s*'([^']+)'", re.I)
+
+
+def _tokens(text):
+    return normalize_question(text).split()
+
+
+def cypher_shape(cypher):
+    """La consulta sin literales ni espacios de más (para detectar duplicados)."""
+    return " ".join(re.sub(r"'[^']*'", "?", cypher).split())
+
+
+def example_template(question, cypher):
+    """
+    Pregunta de un ejemplo con sus nombres reemplazados por la etiqueta del
+    nodo que filtran en la consulta, igual que EntityIndex.link().
+    """
+    variables = {var: label for var, label in _NODE_LABEL.findall(cypher) if var}
+    template = normalize_question(question)
+    for var, literal in _FILTER_LITERAL.findall(cypher):
+        name = normalize_question(literal)
+        if var in variables and name and name in template:
+            template = template.replace(name, f"<{variables[var].lower()}>")
+    return template
+
+
+def cypher_labels(cypher):
+    """(etiquetas de nodos, tipos de relación) que usa una consulta."""
+    return {label for _, label in _NODE_LABEL.findall(cypher)}, set(_REL_TYPE.findall(cypher))
+
+
+def format_examples(examples):
+    return "\n\n".join(f"Question: {e['question']}\nCypher: {e['cypher']}" for e in examples)
+
+
+def schema_slice(structured_schema, labels, rel_types=()):
+    """
+    Texto del schema con solo las etiquetas pedidas: sus propiedades y las
+    relaciones entre ellas (más las de los tipos pedidos, con sus extremos).
+    """
+    relationships = [
+        r for r in structured_schema.get("relationships", [])
+        if r["type"] in rel_types or (r["start"] in labels and r["end"] in labels)
+    ]
+    labels = set(labels) | {r[end] for r in relationships for end in ("start", "end")}
+    nodes = [
+        f"- {label} (properties: {', '.join(p['property'] for p in props)})"
+        for label, props in structured_schema.get("node_props", {}).items()
+        if label in labels
+    ]
+    rels = [f"- (:{r['start']})-[:{r['type']}]->(:{r['end']})" for r in relationships]
+    return "\n".join(["Nodes:", *nodes, "Relationships:", *rels])
+
+
+class ExampleStore:
+    """
+    Ejemplos (pregunta, cypher) con selección por parecido a la pregunta.
+    """
+
+    def __init__(self, examples=None, k=DEFAULT_K):
+        self.k = k
+        self.examples = []
+        self._df = Counter()
+        for example in examples if examples is not None else DEFAULT_EXAMPLES:
+            self.add(example["question"], example["cypher"])
+
+    @classmethod
+    def from_file(cls, path=EXAMPLES_FILE, k=DEFAULT_K):
+        """Ejemplos por defecto más los del archivo JSONL, si existe."""
+        store = cls(k=k)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        example = json.loads(line)
+                        store.add(example["question"], example["cypher"])
+        return store
+
+    def __len__(self):
+        return len(self.examples)
+
+    def add(self, question, cypher):
+        """Agrega un ejemplo (los repetidos por pregunta se ignoran)."""
+        key = normalize_question(question)
+        if any(e["key"] == key for e in self.examples):
+            return
+        terms = Counter(_tokens(example_template(question, cypher)))
+        labels, rel_types = cypher_labels(cypher)
+        self.examples.append({
+            "question": question,
+            "cypher": cypher,
+            "key": key,
+            "terms": terms,
+            "shape": cypher_shape(cypher),
+            "labels": labels,
+            "rel_types": rel_types,
+        })
+        self._df.update(terms.keys())
+
+    def _idf(self, term):
+        return math.log(1 + len(self.examples) / (1 + self._df.get(term, 0)))
+
+    def select(self, question, question_template=None, k=None):
+        """
+        Hasta k ejemplos parecidos (sin repetir forma de consulta ni sumar
+        los que se parecen mucho menos que el mejor). question_template es
+        la pregunta de EntityIndex.link(), si la hay.
+        """
+        k = k or self.k
+        terms = Counter(_tokens(question_template or question))
+        query_norm = math.sqrt(sum((self._idf(t) * c) ** 2 for t, c in terms.items())) or 1.0
+        scored = []
+        for position, example in enumerate(self.examples):
+            overlap = sum(
+                self._idf(t) ** 2 * min(c, example["terms"][t])
+                for t, c in terms.items() if t in example["terms"]
+            )
+            norm = math.sqrt(sum((self._idf(t) * c) ** 2 for t, c in example["terms"].items())) or 1.0
+            scored.append((-overlap / (query_norm * norm), position, example))
+        scored.sort(key=lambda item: item[:2])
+
+        best = -scored[0][0] if scored else 0.0
+        selected, shapes = [], set()
+        for score, _, example in scored:
+            if example["shape"] in shapes:
+                continue
+            if selected and best > 0 and -score < best * MIN_RELATIVE_SCORE:
+                break
+            shapes.add(example["shape"])
+            selected.append(example)
+            if len(selected) == k:
+                break
+        return selected
+
+    def prompt_inputs(self, question, structured_schema=None, question_template=None,
+                      entities=None, full_schema=""):
+        """
+        {"examples", "schema"} para el prompt Cypher y cuántos ejemplos entraron.
+        Sin schema estructurado se usa full_schema completo.
+        """
+        examples = self.select(question, question_template)
+        labels, rel_types = set(), set()
+        for example in examples:
+            labels |= example["labels"]
+            rel_types |= example["rel_types"]
+        for entity in entities or []:
+            labels.update(entity["labels"].split("|"))
+        for token in _tokens(question):
+            for prefix, keyword_labels in KEYWORD_LABELS.items():
+                if token.startswith(prefix):
+                    labels.update(keyword_labels)
+        if structured_schema and structured_schema.get("node_props"):
+            schema = schema_slice(structured_schema, labels, rel_types)
+        else:
+            schema = full_schema
+        return {"examples": format_examples(examples), "schema": schema}, len(examples)
@@ -0,0 +1,460 @@
+"""
+Validación y reparación local de las consultas Cypher que genera el LLM.
+
+En lugar de buscar palabras en la consulta en mayúsculas (un nombre como
+'Fromento' o el DELETE de DETACH DELETE daban falsos positivos), la
+consulta se separa en tokens: los textos entre comillas, los nombres entre
+backticks y las propiedades nunca cuentan como palabras clave. Sobre los
+tokens se controla:
+
+- que sea Cypher y no SQL (SELECT, FROM, JOIN... como palabras sueltas),
+- que sea de solo lectura (sin CREATE, MERGE, SET, DELETE, CALL, ...),
+- que las etiquetas, tipos de relación y propiedades existan en el schema.
+  Esto último es un aviso y no un error: el schema puede estar atrasado
+  respecto del grafo (scouting agrega JugadorRival, la telemetría
+  ritmo_cardiaco) y la consulta igual se ejecuta. load() lo pone al día.
+
+Antes de ejecutar, repair() corrige los errores comunes del modelo:
+CONTAINS (o STARTS WITH, ENDS WITH, =~) dentro de {} pasa a un WHERE,
+{prop = 'x'} pasa a {prop: 'x'}, se quita el ; final y los nombres del
+schema mal escritos ("jugador", "Jugadores", "TIENE_ESTADOS") se cambian por
+el más parecido. Solo si queda un error el pipeline vuelve a pedir la
+consulta al LLM (con un número acotado de reintentos).
+"""
+import difflib
+import re
+from dataclasses import dataclass, field
+
+TOKEN_PATTERN = re.compile(
+    r"\s+"                                      # espacios
+    r"|//[^\n]*|/\*.*?\*/"                      # comentarios
+    r"|'(?:[^'\\]|\\.)*'" r'|"(?:[^"\\]|\\.)*"'  # textos
+    r"|`[^`]*`"                                 # nombres entre backticks
+    r"|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?"           # números
+    r"|\$\w+"                                   # parámetros
+    r"|[A-Za-z_]\w*"                            # nombres y palabras clave
+    r"|<-|->|<>|<=|>=|=~|\.\.|[-()\[\]{}:,.;=<>+*/%|&^!]",
+    re.S,
+)
+
+SQL_KEYWORDS = {"SELECT", "FROM", "JOIN", "INSERT", "UPDATE", "TABLE", "GROUP", "HAVING", "INTO"}
+WRITE_KEYWORDS = {"CREATE", "MERGE", "DELETE", "DETACH", "SET", "REMOVE", "DROP", "LOAD", "FOREACH", "CALL"}
+READ_START_KEYWORDS = {"MATCH", "OPTIONAL", "WITH", "UNWIND", "RETURN"}
+# Palabras que cierran la cláusula anterior (para saber dónde termina un MATCH o un WHERE)
+CLAUSE_KEYWORDS = {
+    "MATCH", "OPTIONAL", "WHERE", "RETURN", "WITH", "UNWIND", "ORDER", "SKIP",
+    "LIMIT", "UNION", "CALL", "CREATE", "MERGE", "DELETE", "DETACH", "SET", "REMOVE",
+}
+# Palabras que pueden ir antes de un "(" sin que sea una llamada a función
+EXPRESSION_KEYWORDS = CLAUSE_KEYWORDS | {"AND", "OR", "XOR", "NOT", "IN", "EXISTS", "AS", "BY"}
+MAP_OPERATORS = {"CONTAINS", "STARTS", "ENDS", "=~"}
+MAX_REPAIRS = 10
+
+
+class Token:
+    __slots__ = ("kind", "text", "start", "end", "upper")
+
+    def __init__(self, kind, text, start, end):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+        # Solo los nombres sin comillas pueden ser palabras clave
+        self.upper = text.upper() if kind == "name" else None
+
+
+@dataclass
+class CypherCheck:
+    """
+    Resultado de repair(): la consulta (quizás corregida), el primer error
+    que queda (None si es válida), la lista de correcciones aplicadas y los
+    avisos (nombres que no están en el schema conocido).
+    """
+    query: str
+    error: str = None
+    fixes: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+
+    @property
+    def valid(self):
+        return self.error is None
+
+
+class CypherSyntaxError(ValueError):
+    """La consulta tiene caracteres que el tokenizador no reconoce."""
+
+
+def tokenize(query):
+    """
+    Tokens de la consulta (sin espacios ni comentarios).
+    """
+    tokens = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(query):
+        start = match.start()
+        if start != position:
+            break
+        position = match.end()
+        text = match.group()
+        first = text[0]
+        if first.isspace() or text.startswith(("//", "/*")):
+            continue
+        if first == "'" or first == '"':
+            kind = "string"
+        elif first == "`":
+            kind = "quoted"
+        elif first == "$":
+            kind = "param"
+        elif first.isdigit():
+            kind = "number"
+        elif first.isalpha() or first == "_":
+            kind = "name"
+        else:
+            kind = "symbol"
+        tokens.append(Token(kind, text, start, position))
+    if position != len(query):
+        raise CypherSyntaxError(f"carácter inesperado {query[position]!r} en la posición {position}")
+    return tokens
+
+
+def _splice(query, edits):
+    """Aplica [(inicio, fin, texto)] de atrás hacia adelante."""
+    for start, end, text in sorted(edits, reverse=True):
+        query = query[:start] + text + query[end:]
+    return query
+
+
+def _name(token):
+    return token.text.strip("`") if token.kind == "quoted" else token.text
+
+
+class CypherValidator:
+    """
+    Validador con el schema del grafo (structured_schema de Neo4jGraph).
+    Sin schema solo controla sintaxis, SQL y solo lectura.
+    """
+
+    def __init__(self, structured_schema=None):
+        self.load(structured_schema)
+
+    def load(self, structured_schema):
+        """Reemplaza las etiquetas, relaciones y propiedades conocidas."""
+        schema = structured_schema or {}
+        self.properties = {
+            label: {p["property"] for p in props}
+            for label, props in schema.get("node_props", {}).items()
+        }
+        self.labels = set(self.properties)
+        self.rel_types = set()
+        for rel in schema.get("relationships", []):
+            self.labels.update((rel["start"], rel["end"]))
+            self.rel_types.add(rel["type"])
+
+    def __call__(self, query):
+        """(es_valido, mensaje_error), sin reparar."""
+        error = self.check(query)
+        return error is None, error or ""
+
+    # --- Análisis de patrones ---
+
+    def _node_patterns(self, tokens):
+        """
+        Patrones de nodo: dicts con índices de "(" y ")", variable, etiquetas
+        [(índice, nombre)] y el mapa de propiedades ("{" y "}") si lo tiene.
+        """
+        patterns = []
+        for i, token in enumerate(tokens):
+            if token.text != "(":
+                continue
+            previous = tokens[i - 1] if i else None
+            if previous is not None and previous.kind in ("name", "quoted") and previous.upper not in EXPRESSION_KEYWORDS:
+                continue  # llamada a función: count(j), toLower(x)
+            j = i + 1
+            variable = None
+            if j < len(tokens) and tokens[j].kind in ("name", "quoted"):
+                variable = _name(tokens[j])
+                j += 1
+            if j >= len(tokens) or tokens[j].text not in (":", "{", ")"):
+                continue  # expresión entre paréntesis
+            labels = []
+            while j + 1 < len(tokens) and tokens[j].text in (":", "|", "&") and tokens[j + 1].kind in ("name", "quoted"):
+                labels.append((j + 1, _name(tokens[j + 1])))
+                j += 2
+            map_open = map_close = None
+            if j < len(tokens) and tokens[j].text == "{":
+                map_open = j
+                depth = 0
+                for k in range(j, len(tokens)):
+                    depth += tokens[k].text == "{"
+                    depth -= tokens[k].text == "}"
+                    if depth == 0:
+                        map_close = k
+                        break
+                if map_close is None:
+                    continue
+                j = map_close + 1
+            if j < len(tokens) and tokens[j].text == ")":
+                patterns.append({
+                    "open": i, "close": j, "variable": variable, "labels": labels,
+                    "map_open": map_open, "map_close": map_close,
+                })
+        return patterns
+
+    def _rel_types(self, tokens):
+        """[(índice, tipo)] de los tipos de relación en [r:TIPO|OTRO]."""
+        types = []
+        for i, token in enumerate(tokens):
+            if token.text != "[" or i == 0 or tokens[i - 1].text not in ("-", "<-"):
+                continue
+            j = i + 1
+            if j < len(tokens) and tokens[j].kind in ("name", "quoted"):
+                j += 1
+            while j + 1 < len(tokens) and tokens[j].text in (":", "|") and tokens[j + 1].kind in ("name", "quoted"):
+                types.append((j + 1, _name(tokens[j + 1])))
+                j += 2
+                if j < len(tokens) and tokens[j].text == ":":
+                    continue
+        return types
+
+    @staticmethod
+    def _clause_end(tokens, start, stop_keywords):
+        """Índice del primer token de stop_keywords a profundidad 0 desde start."""
+        depth = 0
+        for k in range(start, len(tokens)):
+            text = tokens[k].text
+            if text in ("(", "[", "{"):
+                depth += 1
+            elif text in (")", "]", "}"):
+                depth -= 1
+            elif depth == 0 and tokens[k].upper in stop_keywords:
+                return k
+        return len(tokens)
+
+    @staticmethod
+    def _closest(name, candidates):
+        lowered = {c.lower(): c for c in candidates}
+        if name.lower() in lowered:
+            return lowered[name.lower()]
+        match = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.75)
+        return match[0] if match else None
+
+    # --- Reparaciones (una por vez; repair() vuelve a tokenizar) ---
+
+    def _fix_trailing_semicolon(self, query, tokens):
+        if tokens and tokens[-1].text == ";":
+            return query[:tokens[-1].start].rstrip(), "se quitó el ; final"
+        return None
+
+    def _fix_map_operators(self, query, tokens, patterns):
+        """{prop CONTAINS 'x'} -> WHERE var.prop CONTAINS 'x'; {prop = 'x'} -> {prop: 'x'}."""
+        for number, pattern in enumerate(patterns):
+            if pattern["map_open"] is None:
+                continue
+            entries, current = [], []
+            for k in range(pattern["map_open"] + 1, pattern["map_close"]):
+                if tokens[k].text == ",":
+                    entries.append(current)
+                    current = []
+                else:
+                    current.append(k)
+            entries.append(current)
+            moved, kept, fixed_equals = [], [], False
+            for entry in entries:
+                if len(entry) < 2:
+                    kept.append(entry)
+                    continue
+                operator = tokens[entry[1]]
+                if operator.upper in MAP_OPERATORS or operator.text in MAP_OPERATORS:
+                    moved.append(entry)
+                elif operator.text == "=":
+                    fixed_equals = True
+                    kept.append(entry)
+                else:
+                    kept.append(entry)
+            if fixed_equals and not moved:
+                edits = [
+                    (tokens[e[0]].end, tokens[e[2]].start, ": ")
+                    for e in entries if len(e) >= 3 and tokens[e[1]].text == "="
+                ]
+                return _splice(query, edits), "{prop = valor} se cambió por {prop: valor}"
+            if not moved:
+                continue
+
+            edits = []
+            variable = pattern["variable"]
+            if variable is None:
+                variable = f"n{number}"
+                after_paren = tokens[pattern["open"]].end
+                edits.append((after_paren, after_paren, variable))
+            conditions = []
+            for entry in moved:
+                key = tokens[entry[0]].text
+                expression = query[tokens[entry[1]].start:tokens[entry[-1]].end]
+                conditions.append(f"{variable}.{key} {expression}")
+            remaining = [
+                f"{tokens[e[0]].text}: {query[tokens[e[2]].start:tokens[e[-1]].end]}"
+                if len(e) >= 3 and tokens[e[1]].text == "=" else query[tokens[e[0]].start:tokens[e[-1]].end]
+                for e in kept if e
+            ]
+            map_start = tokens[pattern["map_open"]].start
+            map_end = tokens[pattern["map_close"]].end
+            new_map = "{" + ", ".join(remaining) + "}" if remaining else ""
+            # Si el mapa queda vacío se borra también el espacio anterior
+            if not remaining:
+                while map_start > 0 and query[map_start - 1] == " ":
+                    map_start -= 1
+            edits.append((map_start, map_end, new_map))
+
+            condition = " AND ".join(conditions)
+            clause_end = self._clause_end(tokens, pattern["close"] + 1, CLAUSE_KEYWORDS)
+            if clause_end < len(tokens) and tokens[clause_end].upper == "WHERE":
+                where_end = self._clause_end(tokens, clause_end + 1, CLAUSE_KEYWORDS - {"WHERE"})
+                first = tokens[clause_end + 1].start
+                last = tokens[where_end - 1].end
+                edits.append((first, first, f"{condition} AND ("))
+                edits.append((last, last, ")"))
+            elif clause_end < len(tokens):
+                position = tokens[clause_end].start
+                edits.append((position, position, f"WHERE {condition}\n"))
+            else:
+                edits.append((len(query), len(query), f" WHERE {condition}"))
+            return _splice(query, edits), "CONTAINS dentro de {} se pasó a WHERE"
+        return None
+
+    def _fix_schema_names(self, query, tokens, patterns, rel_types):
+        if not self.labels:
+            return None
+        for pattern in patterns:
+            for index, label in pattern["labels"]:
+                if label not in self.labels:
+                    closest = self._closest(label, self.labels)
+                    if closest:
+                        token = tokens[index]
+                        return _splice(query, [(token.start, token.end, closest)]), f"etiqueta {label} -> {closest}"
+        for index, rel_type in rel_types:
+            if rel_type not in self.rel_types:
+                closest = self._closest(rel_type, self.rel_types)
+                if closest:
+                    token = tokens[index]
+                    return _splice(query, [(token.start, token.end, closest)]), f"relación {rel_type} -> {closest}"
+        for index, variable, prop, labels in self._property_uses(tokens, patterns):
+            known = set().union(*(self.properties.get(label, set()) for label in labels))
+            if known and prop not in known:
+                closest = self._closest(prop, known)
+                if closest:
+                    token = tokens[index]
+                    return _splice(query, [(token.start, token.end, closest)]), f"propiedad {variable}.{prop} -> {variable}.{closest}"
+        return None
+
+    def _property_uses(self, tokens, patterns):
+        """[(índice, variable, propiedad, etiquetas)] de var.prop y {prop: ...}."""
+        bound = {}
+        for pattern in patterns:
+            if pattern["variable"] and pattern["labels"]:
+                bound.setdefault(pattern["variable"], set()).update(label for _, label in pattern["labels"])
+        uses = []
+        for i in range(len(tokens) - 2):
+            if (tokens[i].kind in ("name", "quoted") and tokens[i + 1].text == "."
+                    and tokens[i + 2].kind in ("name", "quoted") and _name(tokens[i]) in bound
+                    and (i == 0 or tokens[i - 1].text != ".")):
+                variable = _name(tokens[i])
+                uses.append((i + 2, variable, _name(tokens[i + 2]), bound[variable]))
+        for pattern in patterns:
+            if pattern["map_open"] is None or not pattern["labels"]:
+                continue
+            labels = {label for _, label in pattern["labels"]}
+            for k in range(pattern["map_open"] + 1, pattern["map_close"] - 1):
+                if tokens[k].kind in ("name", "quoted") and tokens[k + 1].text == ":" \
+                        and tokens[k - 1].text in ("{", ","):
+                    uses.append((k, pattern["variable"] or "", _name(tokens[k]), labels))
+        return uses
+
+    # --- Controles ---
+
+    def _error(self, tokens, patterns, rel_types):
+        keywords = [
+            t.upper for i, t in enumerate(tokens)
+            if t.kind == "name" and (i == 0 or tokens[i - 1].text not in (".", ":", "|", "&"))
+            and not (i + 1 < len(tokens) and tokens[i + 1].text == ":")
+        ]
+        for keyword in keywords:
+            if keyword in SQL_KEYWORDS:
+                return (f"❌ Error: La consulta contiene sintaxis SQL '{keyword}'. "
+                        "Solo se permite sintaxis Cypher (MATCH, WHERE, RETURN).")
+        for keyword in keywords:
+            if keyword in WRITE_KEYWORDS:
+                return f"❌ Error: La consulta usa '{keyword}'. Solo se permiten consultas de lectura."
+        if not keywords or keywords[0] not in READ_START_KEYWORDS:
+            return "❌ Error: La consulta debe empezar con MATCH, OPTIONAL MATCH, WITH, UNWIND o RETURN."
+        if "RETURN" not in keywords:
+            return "❌ Error: La consulta no tiene RETURN."
+        if any(t.text == ";" for t in tokens):
+            return "❌ Error: La consulta tiene más de una sentencia (;)."
+        depth = 0
+        for t in tokens:
+            depth += t.text in ("(", "[", "{")
+            depth -= t.text in (")", "]", "}")
+            if depth < 0:
+                break
+        if depth != 0:
+            return "❌ Error: Paréntesis, corchetes o llaves sin cerrar."
+        for pattern in patterns:
+            if pattern["map_open"] is not None:
+                for k in range(pattern["map_open"], pattern["map_close"]):
+                    if tokens[k].upper in MAP_OPERATORS or tokens[k].text in MAP_OPERATORS:
+                        return "❌ Error: CONTAINS no puede usarse dentro de {}."
+        return None
+
+    def _warnings(self, tokens, patterns, rel_types):
+        """Nombres que no están en el schema conocido (sin corrección parecida)."""
+        if not self.labels:
+            return []
+        warnings = []
+        for pattern in patterns:
+            for _, label in pattern["labels"]:
+                if label not in self.labels:
+                    warnings.append(f"⚠️ La etiqueta '{label}' no está en el schema conocido.")
+        for _, rel_type in rel_types:
+            if rel_type not in self.rel_types:
+                warnings.append(f"⚠️ El tipo de relación '{rel_type}' no está en el schema conocido.")
+        for _, variable, prop, labels in self._property_uses(tokens, patterns):
+            known = set().union(*(self.properties.get(label, set()) for label in labels))
+            if known and prop not in known:
+                warnings.append(f"⚠️ La propiedad '{prop}' no está en {'/'.join(sorted(labels))}.")
+        return warnings
+
+    def check(self, query):
+        """Primer error de la consulta tal como está (None si es válida)."""
+        try:
+            tokens = tokenize(query.strip())
+        except CypherSyntaxError as e:
+            return f"❌ Error: Cypher inválido ({e})."
+        return self._error(tokens, self._node_patterns(tokens), self._rel_types(tokens))
+
+    def repair(self, query):
+        """
+        Corrige lo que se puede corregir y devuelve un CypherCheck con la
+        consulta final y el error que quede.
+        """
+        fixes = []
+        query = query.strip()
+        for _ in range(MAX_REPAIRS):
+            try:
+                tokens = tokenize(query)
+            except CypherSyntaxError as e:
+                return CypherCheck(query, f"❌ Error: Cypher inválido ({e}).", fixes)
+            patterns = self._node_patterns(tokens)
+            rel_types = self._rel_types(tokens)
+            fixed = (
+                self._fix_trailing_semicolon(query, tokens)
+                or self._fix_map_operators(query, tokens, patterns)
+                or self._fix_schema_names(query, tokens, patterns, rel_types)
+            )
+            if fixed is None:
+                return CypherCheck(
+                    query, self._error(tokens, patterns, rel_types), fixes,
+                    self._warnings(tokens, patterns, rel_types),
+                )
+            query, description = fixed
+            fixes.append(description)
+        return CypherCheck(query, "❌ Error: No se pudo reparar la consulta.", fixes)
@@ -0,0 +1,258 @@
+"""
+Acceso escalable al dataset de scouting (explicacion, categoria).
+
+dataset.csv se convierte una vez a Parquet (dataset.parquet, con categoria
+como columna de diccionario) leyendo el CSV por partes, así la conversión
+no necesita tener el CSV entero en memoria. Al cargar, DatasetStore:
+
+- guarda categoria como dtype category (un entero por fila),
+- precalcula la cantidad de reportes por categoría,
+- ordena una sola vez las posiciones de las filas por categoría, así filtrar
+  una categoría es tomar un tramo de ese arreglo (sin copiar el DataFrame).
+
+La página 2 pide solo la página visible (page) y las muestras aleatorias
+(sample) eligen posiciones dentro del tramo, sin materializar el filtrado.
+
+Uso:
+    python3 dataset_store.py --to-parquet              # convertir dataset.csv
+    python3 dataset_store.py --benchmark --rows 2000000
+"""
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DATASET_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset.csv")
+COLUMNS = ["explicacion", "categoria"]
+CSV_CHUNK_ROWS = 500_000
+SEARCH_CACHE_ENTRIES = 32
+
+
+def parquet_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def convert_to_parquet(csv_path=DATASET_CSV, parquet_path=None, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Convierte el CSV a Parquet por partes. Devuelve (ruta, filas).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_path = parquet_path or parquet_path_for(csv_path)
+    schema = pa.schema([
+        ("explicacion", pa.string()),
+        ("categoria", pa.dictionary(pa.int32(), pa.string())),
+    ])
+    tmp_path = parquet_path + ".tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in pd.read_csv(csv_path, usecols=COLUMNS, dtype=str, chunksize=chunk_rows):
+            table = pa.Table.from_pandas(chunk[COLUMNS], preserve_index=False)
+            writer.write_table(table.cast(schema))
+            rows += len(chunk)
+    os.replace(tmp_path, parquet_path)
+    return parquet_path, rows
+
+
+def load_frame(csv_path=DATASET_CSV):
+    """
+    Lee el dataset desde Parquet (convirtiendo el CSV si el Parquet falta o
+    quedó viejo). Sin pyarrow instalado, lee el CSV con categoria como category.
+    """
+    parquet_path = parquet_path_for(csv_path)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.read_csv(csv_path, usecols=COLUMNS, dtype={"categoria": "category"})
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not os.path.exists(parquet_path) or (
+        os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet_path)
+    ):
+        convert_to_parquet(csv_path, parquet_path)
+    table = pq.read_table(parquet_path, columns=COLUMNS)
+    # Un solo bloque contiguo: tomar 50 filas de un arreglo con muchos
+    # bloques cuesta lo mismo que recorrerlos a todos
+    explicacion = table.column("explicacion").cast(pa.large_string()).combine_chunks()
+    return pd.DataFrame({
+        "explicacion": pd.Series(pd.arrays.ArrowExtensionArray(explicacion)),
+        "categoria": table.column("categoria").to_pandas().astype("category"),
+    })
+
+
+class DatasetStore:
+    """
+    DataFrame del dataset con agregados e índices por categoría precalculados.
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        categorias = self.df["categoria"]
+        if not isinstance(categorias.dtype, pd.CategoricalDtype):
+            categorias = categorias.astype("category")
+            self.df["categoria"] = categorias
+        codes = categorias.cat.codes.to_numpy()
+        self.categories = list(categorias.cat.categories)
+
+        # Posiciones de las filas agrupadas por categoría (un único argsort)
+        valid = codes >= 0
+        positions = np.flatnonzero(valid)
+        self._order = positions[np.argsort(codes[valid], kind="stable")]
+        counts = np.bincount(codes[valid], minlength=len(self.categories))
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        self._slices = {
+            categoria: (int(bounds[i]), int(bounds[i + 1]))
+            for i, categoria in enumerate(self.categories)
+        }
+        self.counts = (
+            pd.DataFrame({"Categoría": self.categories, "Cantidad": counts})
+            .query("Cantidad > 0")
+            .sort_values("Cantidad", ascending=False)
+            .reset_index(drop=True)
+        )
+        self._search_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, csv_path=DATASET_CSV):
+        return cls(load_frame(csv_path))
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def category_names(self):
+        return self.counts["Categoría"].tolist()
+
+    def positions(self, categoria=None, search=None):
+        """
+        Posiciones (arreglo de enteros) de las filas que pasan el filtro.
+        Sin búsqueda es una vista del índice por categoría, sin copias.
+        """
+        if categoria is None:
+            base = np.arange(len(self.df))
+        else:
+            start, end = self._slices.get(categoria, (0, 0))
+            base = self._order[start:end]
+        search = (search or "").strip().lower()
+        if not search:
+            return base
+
+        key = (categoria, search)
+        with self._lock:
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                self._search_cache.move_to_end(key)
+                return cached
+        textos = self.df["explicacion"].take(base)
+        mask = textos.str.lower().str.contains(search, regex=False, na=False).to_numpy()
+        found = base[mask]
+        with self._lock:
+            self._search_cache[key] = found
+            while len(self._search_cache) > SEARCH_CACHE_ENTRIES:
+                self._search_cache.popitem(last=False)
+        return found
+
+    def count(self, categoria=None, search=None):
+        if categoria is not None and not search:
+            start, end = self._slices.get(categoria, (0, 0))
+            return end - start
+        return len(self.positions(categoria, search))
+
+    def page(self, categoria=None, page=0, page_size=50, search=None):
+        """
+        Solo las filas de la página pedida (page empieza en 0).
+        """
+        selected = self.positions(categoria, search)
+        start = page * page_size
+        return self.df.take(selected[start:start + page_size])
+
+    def sample(self, categoria=None, k=3, search=None, seed=None):
+        """
+        k filas al azar del filtro, eligiendo posiciones (sin copiar el filtrado).
+        """
+        selected = self.positions(categoria, search)
+        if len(selected) == 0:
+            return self.df.iloc[0:0]
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(selected), size=min(k, len(selected)), replace=False)
+        return self.df.take(selected[picks])
+
+
+# --- Benchmark ---
+
+def benchmark(rows, csv_path=DATASET_CSV, page_size=50, repeat=20):
+    """
+    Replica el dataset hasta `rows` filas y mide carga, página y muestra.
+    """
+    import tempfile
+
+    base = pd.read_csv(csv_path, usecols=COLUMNS)
+    reps = max(1, rows // len(base) + 1)
+    # Se guarda y se vuelve a leer como Parquet, igual que el dataset real
+    with tempfile.TemporaryDirectory() as tmp:
+        replicated_csv = os.path.join(tmp, "dataset.csv")
+        pd.concat([base] * reps, ignore_index=True).iloc[:rows].to_csv(replicated_csv, index=False)
+        start = time.perf_counter()
+        convert_to_parquet(replicated_csv)
+        convert_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        df = load_frame(replicated_csv)
+        load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = DatasetStore(df)
+    index_seconds = time.perf_counter() - start
+    categoria = store.category_names[0]
+
+    def _avg_ms(fn):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    return {
+        "filas": len(store),
+        "conversion_seg": convert_seconds,
+        "carga_seg": load_seconds,
+        "indice_seg": index_seconds,
+        "pagina_ms": _avg_ms(lambda: store.page(categoria, page=3, page_size=page_size)),
+        "pagina_ultima_ms": _avg_ms(lambda: store.page(
+            categoria, page=store.count(categoria) // page_size, page_size=page_size)),
+        "muestra_ms": _avg_ms(lambda: store.sample(categoria, k=3)),
+        "pagina_pandas_ms": _avg_ms(lambda: df[df["categoria"] == categoria].iloc[3 * page_size:4 * page_size]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset de scouting en formato columnar")
+    parser.add_argument("--csv", default=DATASET_CSV, help="CSV de origen")
+    parser.add_argument("--to-parquet", action="store_true", help="Convertir el CSV a Parquet")
+    parser.add_argument("--benchmark", action="store_true", help="Medir página/muestra con un dataset replicado")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas del benchmark")
+    args = parser.parse_args()
+
+    if args.to_parquet:
+        start = time.perf_counter()
+        path, rows = convert_to_parquet(args.csv)
+        print(f"✓ {rows} filas → {path} ({time.perf_counter() - start:.1f}s)")
+    if args.benchmark:
+        for rows in sorted({10_000, args.rows}):
+            result = benchmark(rows, args.csv)
+            print(
+                f"{result['filas']:>10} filas: conversión {result['conversion_seg']:.1f}s · "
+                f"carga {result['carga_seg']:.2f}s · índice {result['indice_seg']:.2f}s · "
+                f"página {result['pagina_ms']:.2f} ms (última {result['pagina_ultima_ms']:.2f} ms) · "
+                f"muestra {result['muestra_ms']:.2f} ms · filtro pandas {result['pagina_pandas_ms']:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Índice en memoria de los nombres de entidades del grafo.
+
+Se carga desde Neo4j (Jugador.nombre, Rival.nombre, JugadorRival.nombre) y
+permite encontrar esos nombres dentro de una pregunta con un trie de tokens
+(búsqueda del match más largo en cada posición, estilo Aho-Corasick). Se usa
+para reemplazar los nombres por marcadores antes de buscar en el caché de
+plantillas Cypher (ver cypher_cache.py).
+"""
+import threading
+
+from answer_cache import normalize_question
+
+# Etiquetas cuyos nombres se indexan
+INDEXED_LABELS = ["Jugador", "Rival", "JugadorRival"]
+
+_TERMINAL = "__entidad__"
+
+
+class EntityIndex:
+    """
+    Trie de nombres normalizados -> (nombre original, etiquetas).
+    """
+
+    def __init__(self):
+        self._trie = {}
+        self._graph_version = None
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def add(self, name, label):
+        tokens = normalize_question(name).split()
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = {"nombre": name, "labels": set()}
+            self.size += 1
+        node[_TERMINAL]["labels"].add(label)
+
+    def load(self, graph, graph_version=None):
+        """
+        Reconstruye el índice con una sola consulta a Neo4j.
+        """
+        query = " UNION ALL ".join(
+            f"MATCH (n:{label}) WHERE n.nombre IS NOT NULL "
+            f"RETURN '{label}' AS label, n.nombre AS nombre"
+            for label in INDEXED_LABELS
+        )
+        rows = graph.query(query)
+        fresh = EntityIndex()
+        for row in rows:
+            fresh.add(row["nombre"], row["label"])
+        with self._lock:
+            self._trie = fresh._trie
+            self.size = fresh.size
+            self._graph_version = graph_version
+
+    def ensure_fresh(self, graph, graph_version):
+        """
+        Recarga el índice si el grafo cambió desde la última carga.
+        """
+        if graph_version != self._graph_version:
+            self.load(graph, graph_version)
+
+    def link(self, question):
+        """
+        Busca nombres conocidos en la pregunta.
+
+        Devuelve (plantilla, entidades) donde la plantilla es la pregunta
+        normalizada con cada nombre reemplazado por un marcador de su
+        etiqueta ("<Jugador>") y entidades es la lista de dicts
+        {"param", "nombre", "labels"} en orden de aparición.
+        """
+        tokens = normalize_question(question).split()
+        trie = self._trie
+        output = []
+        entities = []
+        i = 0
+        while i < len(tokens):
+            node = trie
+            longest = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    longest = (j, node[_TERMINAL])
+            if longest is None:
+                output.append(tokens[i])
+                i += 1
+                continue
+            end, entry = longest
+            labels = "|".join(sorted(entry["labels"]))
+            output.append(f"<{labels}>")
+            entities.append({
+                "param": f"e{len(entities)}",
+                "nombre": entry["nombre"],
+                "labels": labels,
+            })
+            i = end
+        return " ".join(output), entities
@@ -0,0 +1,245 @@
+"""
+Motor de inferencia difusa para las recomendaciones de sustitución.
+
+A partir de cansancio, riesgoLesion y minuto de cada EstadoFisico calcula
+la acción recomendada ('Sustitucion inmediata', 'Mantener con esfuerzo' o
+'Mantener') y su confianza. Las funciones de pertenencia y las reglas se
+evalúan con NumPy sobre todos los jugadores de todos los partidos a la vez
+(sin bucles por jugador en Python), así se puede recalcular en cada tick de
+telemetría.
+
+Uso:
+    python3 fuzzy_engine.py                 # recalcular y escribir todas las recomendaciones
+    python3 fuzzy_engine.py --benchmark     # comparar contra un bucle por jugador
+"""
+import argparse
+import time
+
+import numpy as np
+
+from graph_version import bump_after_state_write
+
+# Acciones en el orden de las columnas de la matriz de activación
+ACTIONS = np.array(["Sustitucion inmediata", "Mantener con esfuerzo", "Mantener"])
+
+# Funciones de pertenencia trapezoidales (a, b, c, d): sube de a a b, plano hasta c, baja hasta d
+MEMBERSHIP = {
+    "cansancio": {
+        "bajo": (0, 0, 30, 50),
+        "medio": (30, 50, 50, 70),
+        "alto": (60, 80, 100, 100),
+    },
+    "riesgoLesion": {
+        "bajo": (0, 0, 15, 35),
+        "medio": (20, 40, 40, 60),
+        "alto": (50, 70, 100, 100),
+    },
+    "minuto": {
+        "temprano": (0, 0, 30, 55),
+        "tarde": (45, 70, 120, 120),
+    },
+}
+
+
+def trapezoid(x, a, b, c, d):
+    """
+    Pertenencia trapezoidal vectorizada (x es un array).
+    """
+    rise = np.ones_like(x) if b == a else (x - a) / (b - a)
+    fall = np.ones_like(x) if d == c else (d - x) / (d - c)
+    return np.clip(np.minimum(rise, fall), 0.0, 1.0)
+
+
+def infer(cansancio, riesgo, minuto):
+    """
+    Evalúa todas las reglas para arrays de jugadores.
+    Devuelve (acciones, confianzas) como arrays del mismo largo.
+    """
+    cansancio = np.asarray(cansancio, dtype=np.float64)
+    riesgo = np.asarray(riesgo, dtype=np.float64)
+    minuto = np.asarray(minuto, dtype=np.float64)
+
+    c = {name: trapezoid(cansancio, *p) for name, p in MEMBERSHIP["cansancio"].items()}
+    r = {name: trapezoid(riesgo, *p) for name, p in MEMBERSHIP["riesgoLesion"].items()}
+    m = {name: trapezoid(minuto, *p) for name, p in MEMBERSHIP["minuto"].items()}
+
+    # Reglas (Y = mínimo, O = máximo); cada acción toma la regla más activada
+    sustituir = np.maximum.reduce([
+        np.minimum(c["alto"], r["alto"]),
+        np.minimum(c["alto"], m["tarde"]),
+        r["alto"] * 0.9,
+    ])
+    esfuerzo = np.maximum.reduce([
+        c["medio"],
+        r["medio"],
+        np.minimum(c["alto"], m["temprano"]),
+    ])
+    mantener = np.minimum(c["bajo"], r["bajo"])
+
+    activation = np.stack([sustituir, esfuerzo, mantener], axis=1)
+    winner = activation.argmax(axis=1)
+    confianza = activation[np.arange(len(winner)), winner]
+    return ACTIONS[winner], np.round(confianza, 2)
+
+
+# --- Versión escalar (solo para el benchmark) ---
+
+def _trapezoid_scalar(x, a, b, c, d):
+    rise = 1.0 if b == a else (x - a) / (b - a)
+    fall = 1.0 if d == c else (d - x) / (d - c)
+    return min(max(min(rise, fall), 0.0), 1.0)
+
+
+def infer_naive(cansancio, riesgo, minuto):
+    """
+    Mismas reglas que infer(), jugador por jugador en Python puro.
+    """
+    acciones, confianzas = [], []
+    for cv, rv, mv in zip(cansancio, riesgo, minuto):
+        c = {n: _trapezoid_scalar(cv, *p) for n, p in MEMBERSHIP["cansancio"].items()}
+        r = {n: _trapezoid_scalar(rv, *p) for n, p in MEMBERSHIP["riesgoLesion"].items()}
+        m = {n: _trapezoid_scalar(mv, *p) for n, p in MEMBERSHIP["minuto"].items()}
+        scores = [
+            max(min(c["alto"], r["alto"]), min(c["alto"], m["tarde"]), r["alto"] * 0.9),
+            max(c["medio"], r["medio"], min(c["alto"], m["temprano"])),
+            min(c["bajo"], r["bajo"]),
+        ]
+        best = max(range(3), key=lambda i: (scores[i], -i))
+        acciones.append(str(ACTIONS[best]))
+        confianzas.append(round(scores[best], 2))
+    return acciones, confianzas
+
+
+# --- Lectura y escritura en Neo4j ---
+
+READ_STATES_QUERY = (
+    "MATCH (:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) "
+    "WHERE e.id IS NOT NULL AND ($ids IS NULL OR e.id IN $ids) "
+    "RETURN e.id AS estado_id, coalesce(e.cansancio, 0.0) AS cansancio, "
+    "coalesce(e.riesgoLesion, 0.0) AS riesgoLesion, coalesce(e.minuto, 0) AS minuto"
+)
+
+# Una recomendación por estado: se actualiza la existente o se crea
+# (cambio: marca del servidor que lee substitution_board.py)
+WRITE_RECOMMENDATIONS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (e:EstadoFisico {id: row.estado_id}) "
+    "MERGE (e)-[:GENERA_RECOMENDACION]->(r:Recomendacion) "
+    "ON CREATE SET r.id = 'R-' + row.estado_id "
+    "SET r.accion = row.accion, r.confianza = row.confianza, r.cambio = timestamp()"
+)
+
+
+def recompute_recommendations(driver, estado_ids=None, database=None):
+    """
+    Lee los estados (todos, o solo estado_ids), infiere las recomendaciones
+    en una pasada vectorizada y las escribe en una sola transacción.
+    Devuelve un dict con cantidad y tiempos por etapa.
+    """
+    start = time.perf_counter()
+    with driver.session(database=database) as session:
+        records = session.run(READ_STATES_QUERY, ids=estado_ids).data()
+    read_seconds = time.perf_counter() - start
+    if not records:
+        return {"estados": 0, "lectura_seg": read_seconds, "inferencia_seg": 0.0, "escritura_seg": 0.0}
+
+    start = time.perf_counter()
+    acciones, confianzas = infer(
+        [r["cansancio"] for r in records],
+        [r["riesgoLesion"] for r in records],
+        [r["minuto"] for r in records],
+    )
+    infer_seconds = time.perf_counter() - start
+
+    rows = [
+        {"estado_id": r["estado_id"], "accion": str(a), "confianza": float(c)}
+        for r, a, c in zip(records, acciones, confianzas)
+    ]
+    start = time.perf_counter()
+    with driver.session(database=database) as session:
+        summary = session.execute_write(lambda tx: tx.run(WRITE_RECOMMENDATIONS_QUERY, rows=rows).consume())
+    write_seconds = time.perf_counter() - start
+    # Recomendaciones existentes actualizadas: versión de estado (ver graph_version.py)
+    bump_after_state_write(getattr(summary, "counters", None))
+
+    return {
+        "estados": len(rows),
+        "lectura_seg": read_seconds,
+        "inferencia_seg": infer_seconds,
+        "escritura_seg": write_seconds,
+    }
+
+
+# --- Benchmark ---
+
+def benchmark(players=25, matches=1, repeat=200, seed=0):
+    """
+    Compara infer() contra infer_naive() con datos aleatorios.
+    Devuelve los tiempos promedio por pasada en milisegundos.
+    """
+    rng = np.random.default_rng(seed)
+    n = players * matches
+    cansancio = rng.uniform(0, 100, n)
+    riesgo = rng.uniform(0, 100, n)
+    minuto = rng.integers(0, 95, n).astype(np.float64)
+    as_lists = (cansancio.tolist(), riesgo.tolist(), minuto.tolist())
+
+    vec_actions, vec_conf = infer(cansancio, riesgo, minuto)
+    naive_actions, naive_conf = infer_naive(*as_lists)
+    same = list(vec_actions) == naive_actions and np.allclose(vec_conf, naive_conf)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        infer(cansancio, riesgo, minuto)
+    vectorized_ms = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        infer_naive(*as_lists)
+    naive_ms = (time.perf_counter() - start) / repeat * 1000
+
+    return {
+        "jugadores": n,
+        "vectorizado_ms": vectorized_ms,
+        "bucle_ms": naive_ms,
+        "aceleracion": naive_ms / vectorized_ms if vectorized_ms else float("inf"),
+        "mismos_resultados": bool(same),
+    }
+
+
+def main():
+    from connections import add_neo4j_arguments
+
+    parser = argparse.ArgumentParser(description="Inferencia difusa de recomendaciones")
+    parser.add_argument("--benchmark", action="store_true", help="Comparar contra un bucle por jugador")
+    parser.add_argument("--players", type=int, default=25, help="Jugadores por partido (benchmark)")
+    parser.add_argument("--matches", type=int, default=1, help="Partidos (benchmark)")
+    parser.add_argument("--repeat", type=int, default=200, help="Repeticiones (benchmark)")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for matches in sorted({1, args.matches}):
+            result = benchmark(args.players, matches, args.repeat)
+            print(
+                f"{result['jugadores']:>7} jugadores: vectorizado {result['vectorizado_ms']:.3f} ms · "
+                f"bucle {result['bucle_ms']:.3f} ms · x{result['aceleracion']:.1f} · "
+                f"mismos resultados: {'sí' if result['mismos_resultados'] else 'NO'}"
+            )
+        return
+
+    from connections import close_all, get_driver, settings_from_args
+
+    try:
+        settings = settings_from_args(args)
+        stats = recompute_recommendations(get_driver(settings), database=settings.neo4j_database)
+    finally:
+        close_all()
+    print(
+        f"✓ {stats['estados']} recomendaciones · lectura {stats['lectura_seg'] * 1000:.1f} ms · "
+        f"inferencia {stats['inferencia_seg'] * 1000:.3f} ms · escritura {stats['escritura_seg'] * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,595 @@
+"""
+Copia en memoria, de solo lectura, del grafo del proyecto.
+
+El grafo (jugadores, estados, recomendaciones, partidos y rivales) entra en
+memoria, pero cada respuesta de la ruta rápida igual hacía un viaje a Neo4j.
+GraphSnapshot se arma con una exportación completa (una consulta de nodos y
+una de relaciones) y guarda:
+
+- un índice denso por nodo (0..N-1) y su elementId de Neo4j,
+- columnas de propiedades por etiqueta (una lista por propiedad),
+- adyacencia por tipo de relación en arrays CSR (indptr + destinos), en los
+  dos sentidos, para recorrer caminos hacia adelante y hacia atrás,
+- para los filtros CONTAINS, cada columna de textos unida en un solo str
+  (separada por \\x00): str.find recorre la columna en C.
+
+Las intenciones de intent_router.py se describen como caminos (PathQuery) y
+se resuelven sobre la copia en microsegundos. La exportación (nodos,
+relaciones y el timestamp() del servidor) corre en una sola transacción de
+lectura; una relación cuyo extremo no se exportó se saltea.
+
+Con cada escritura los cargadores aumentan la versión del grafo
+(graph_version.py): ensure_fresh() vuelve a exportar en un hilo aparte y,
+mientras tanto, run_route() devuelve None (se responde con Cypher), así la
+copia nunca contesta con datos viejos ni hace esperar a una pregunta. La
+telemetría y el motor difuso solo suben la versión de estado: entonces se
+releen solo los EstadoFisico/Recomendacion con cambio posterior a la última
+lectura y se actualizan sus columnas. check() compara la copia contra Neo4j
+(cantidades y una muestra de propiedades).
+
+Uso:
+    python3 graph_snapshot.py check             # consistencia contra Neo4j
+    python3 graph_snapshot.py benchmark         # intenciones: copia vs Neo4j
+"""
+import argparse
+import bisect
+import random
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+
+import numpy as np
+
+EXPORT_NODES_QUERY = "MATCH (n) RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props"
+EXPORT_RELATIONSHIPS_QUERY = (
+    "MATCH (a)-[r]->(b) RETURN elementId(a) AS start, type(r) AS type, elementId(b) AS end"
+)
+COUNT_LABELS_QUERY = "MATCH (n) UNWIND labels(n) AS label RETURN label, count(*) AS total"
+COUNT_RELATIONSHIPS_QUERY = "MATCH ()-[r]->() RETURN type(r) AS type, count(*) AS total"
+SAMPLE_NODES_QUERY = "MATCH (n) WHERE elementId(n) IN $ids RETURN elementId(n) AS id, properties(n) AS props"
+SERVER_TIME_QUERY = "RETURN timestamp() AS ahora"
+# Nodos de estado que cambiaron después de $desde (ver graph_version.STATE_LABELS)
+CHANGED_STATE_QUERY = (
+    "MATCH (n) WHERE (n:EstadoFisico OR n:Recomendacion) AND n.cambio > $desde "
+    "RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props"
+)
+# Margen (ms) al pedir cambios, como en substitution_board.py
+CHANGE_OVERLAP_MS = 5000
+DEFAULT_CHECK_SAMPLE = 50
+
+
+@dataclass
+class PathQuery:
+    """
+    Camino (n0)-[rel_types[0]]->(n1)-... con etiqueta por posición (None =
+    cualquiera), filtros CONTAINS {posición: (propiedad, texto o "$param")}
+    y columnas [(nombre, posición, propiedad)]. Devuelve una fila por
+    camino, como el MATCH equivalente.
+    """
+    labels: list
+    rel_types: list
+    returns: list
+    filters: dict = field(default_factory=dict)
+
+
+# Mismas consultas que las intenciones de intent_router.INTENTS
+INTENT_PATHS = {
+    "sustituciones": PathQuery(
+        labels=["Jugador", None, "Recomendacion"],
+        rel_types=["TIENE_ESTADO", "GENERA_RECOMENDACION"],
+        filters={2: ("accion", "Sustitucion")},
+        returns=[("jugador", 0, "nombre")],
+    ),
+    "cansancio_jugador": PathQuery(
+        labels=["Jugador", "EstadoFisico"],
+        rel_types=["TIENE_ESTADO"],
+        filters={0: ("nombre", "$nombre")},
+        returns=[("jugador", 0, "nombre"), ("cansancio", 1, "cansancio")],
+    ),
+    "lista_rivales": PathQuery(
+        labels=["Rival"],
+        rel_types=[],
+        returns=[("rival", 0, "nombre")],
+    ),
+    "jugador_clave_rival": PathQuery(
+        labels=["Rival", "JugadorRival"],
+        rel_types=["TIENE_JUGADOR_CLAVE"],
+        filters={0: ("nombre", "$rival")},
+        returns=[("equipo", 0, "nombre"), ("jugador", 1, "nombre")],
+    ),
+    "equipo_de_jugador": PathQuery(
+        labels=["Rival", "JugadorRival"],
+        rel_types=["TIENE_JUGADOR_CLAVE"],
+        filters={1: ("nombre", "$nombre")},
+        returns=[("jugador", 1, "nombre"), ("equipo", 0, "nombre")],
+    ),
+    "proximo_rival": PathQuery(
+        labels=["Partido", "Rival"],
+        rel_types=["ENFRENTA"],
+        returns=[("rival", 1, "nombre")],
+    ),
+}
+
+_NO_NEIGHBORS = ()
+
+
+def _int_array(values):
+    """array("i") desde NumPy: compacto y con acceso por índice sin objetos NumPy."""
+    result = array("i")
+    result.frombytes(np.ascontiguousarray(values, dtype=np.int32).tobytes())
+    return result
+
+
+def _csr(sources, targets, size):
+    """(indptr, destinos) con los destinos de cada origen contiguos."""
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int32)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return _int_array(indptr), _int_array(targets[order])
+
+
+class _TextColumn:
+    """Columna de textos unida para buscar CONTAINS con str.find."""
+
+    def __init__(self, values):
+        self.starts = []
+        parts = []
+        offset = 0
+        for value in values:
+            text = value if isinstance(value, str) else ""
+            self.starts.append(offset)
+            parts.append(text)
+            offset += len(text) + 1
+        self.text = "\x00".join(parts)
+
+    def rows_containing(self, needle):
+        rows = []
+        position = self.text.find(needle)
+        while position != -1:
+            row = bisect.bisect_right(self.starts, position) - 1
+            rows.append(row)
+            # Siguiente búsqueda desde el comienzo de la fila que sigue
+            position = self.text.find(needle, self.starts[row + 1]) if row + 1 < len(self.starts) else -1
+        return rows
+
+
+def _export(graph):
+    """
+    (nodos, relaciones, timestamp() del servidor) en una sola transacción de
+    lectura, así ninguna relación apunta a un nodo creado entre consultas.
+    Grafos sin driver (benchmark, tests): tres consultas sueltas.
+    """
+    driver = getattr(graph, "_driver", None)
+    if driver is None:
+        (now,) = graph.query(SERVER_TIME_QUERY) or [{"ahora": None}]
+        return graph.query(EXPORT_NODES_QUERY), graph.query(EXPORT_RELATIONSHIPS_QUERY), now["ahora"]
+
+    def _read(tx):
+        now = tx.run(SERVER_TIME_QUERY).single()["ahora"]
+        return tx.run(EXPORT_NODES_QUERY).data(), tx.run(EXPORT_RELATIONSHIPS_QUERY).data(), now
+
+    with driver.session(database=getattr(graph, "_database", None)) as session:
+        return session.execute_read(_read)
+
+
+class _SnapshotData:
+    """
+    Contenido de una exportación. La estructura (nodos, etiquetas, CSR) no
+    cambia: una versión del grafo nueva la reemplaza entera. Las columnas de
+    los nodos de estado se actualizan en su lugar con update_nodes().
+    """
+
+    def __init__(self, nodes, relationships, graph_version, state_version=None, since=None):
+        self.graph_version = graph_version
+        self.state_version = state_version
+        # Marca (ms del servidor) para pedir los estados que cambiaron
+        self.since = since
+        self.element_ids = [row["id"] for row in nodes]
+        self.index = index = {element_id: i for i, element_id in enumerate(self.element_ids)}
+        size = len(self.element_ids)
+
+        # Columnas por etiqueta; position[label][nodo] = fila en esas columnas (-1 si no la tiene)
+        self.nodes = {}
+        self.columns = {}
+        self.position = {}
+        for i, row in enumerate(nodes):
+            for label in row["labels"]:
+                self.nodes.setdefault(label, []).append(i)
+        for label, members in self.nodes.items():
+            props = sorted({key for i in members for key in nodes[i]["props"]})
+            self.columns[label] = {
+                prop: [nodes[i]["props"].get(prop) for i in members] for prop in props
+            }
+            position = np.full(size, -1, dtype=np.int32)
+            position[members] = np.arange(len(members), dtype=np.int32)
+            self.position[label] = _int_array(position)
+            self.nodes[label] = _int_array(members)
+        # Índices de texto por (etiqueta, propiedad), armados la primera vez que se filtran
+        self._text_columns = {}
+
+        # Adyacencia CSR por tipo, en los dos sentidos
+        by_type = {}
+        self.skipped_relationships = 0
+        for row in relationships:
+            start, end = index.get(row["start"]), index.get(row["end"])
+            if start is None or end is None:
+                self.skipped_relationships += 1
+                continue
+            pair = by_type.setdefault(row["type"], ([], []))
+            pair[0].append(start)
+            pair[1].append(end)
+        self.out = {}
+        self.inc = {}
+        self.relationship_counts = {}
+        for rel_type, (starts, ends) in by_type.items():
+            starts = np.asarray(starts, dtype=np.int32)
+            ends = np.asarray(ends, dtype=np.int32)
+            self.out[rel_type] = _csr(starts, ends, size)
+            self.inc[rel_type] = _csr(ends, starts, size)
+            self.relationship_counts[rel_type] = len(starts)
+
+    def update_nodes(self, rows):
+        """
+        Pisa las propiedades de nodos que ya están en la copia. Devuelve
+        False (sin aplicar nada) si alguno es nuevo o cambió de etiquetas:
+        eso es un cambio de estructura y hay que volver a exportar.
+        """
+        updates = []
+        for row in rows:
+            node = self.index.get(row["id"])
+            if node is None:
+                return False
+            current = [label for label, position in self.position.items() if position[node] >= 0]
+            if sorted(current) != sorted(row["labels"]):
+                return False
+            updates.append((node, row))
+        for node, row in updates:
+            for label in row["labels"]:
+                columns = self.columns[label]
+                k = self.position[label][node]
+                for prop in set(columns) | set(row["props"]):
+                    column = columns.get(prop)
+                    if column is None:
+                        column = columns[prop] = [None] * len(self.nodes[label])
+                    if column[k] != row["props"].get(prop):
+                        column[k] = row["props"].get(prop)
+                        # El índice de texto de esa columna se vuelve a armar al filtrar
+                        self._text_columns.pop((label, prop), None)
+        return True
+
+    def neighbors(self, node, rel_type, direction="out"):
+        adjacency = (self.out if direction == "out" else self.inc).get(rel_type)
+        if adjacency is None:
+            return _NO_NEIGHBORS
+        indptr, targets = adjacency
+        return targets[indptr[node]:indptr[node + 1]]
+
+    def value(self, node, label, prop):
+        if label is None:
+            # Posición sin etiqueta en el camino: la primera etiqueta del nodo que tenga la propiedad
+            for label, position in self.position.items():
+                column = self.columns[label].get(prop)
+                if position[node] >= 0 and column is not None and column[position[node]] is not None:
+                    return column[position[node]]
+            return None
+        position = self.position.get(label)
+        if position is None or position[node] < 0:
+            return None
+        column = self.columns[label].get(prop)
+        return column[position[node]] if column is not None else None
+
+    def _accepts(self, node, label, condition):
+        if label is not None:
+            position = self.position.get(label)
+            if position is None or position[node] < 0:
+                return False
+        if condition is not None:
+            value = self.value(node, label, condition[0])
+            return isinstance(value, str) and condition[1] in value
+        return True
+
+    def _text_column(self, label, prop):
+        key = (label, prop)
+        column = self._text_columns.get(key)
+        if column is None:
+            column = self._text_columns[key] = _TextColumn(self.columns[label].get(prop, ()))
+        return column
+
+    def _candidates(self, label, condition):
+        if label is None:
+            return [i for i in range(len(self.element_ids)) if self._accepts(i, None, condition)]
+        members = self.nodes.get(label)
+        if members is None:
+            return []
+        if condition is None:
+            return list(members)
+        prop, needle = condition
+        if not needle:
+            # '' CONTAINS '' es verdadero, pero null CONTAINS '' no
+            column = self.columns[label].get(prop, ())
+            return [members[k] for k, value in enumerate(column) if isinstance(value, str)]
+        return [members[k] for k in self._text_column(label, prop).rows_containing(needle)]
+
+    def match(self, path, params):
+        """Filas del camino: se empieza por la posición filtrada y se extiende a los dos lados."""
+        conditions = {
+            position: (prop, params.get(value[1:], "") if value.startswith("$") else value)
+            for position, (prop, value) in path.filters.items()
+        }
+        anchor = min(conditions) if conditions else 0
+        paths = [[node] for node in self._candidates(path.labels[anchor], conditions.get(anchor))]
+        for position in range(anchor + 1, len(path.labels)):
+            label, condition = path.labels[position], conditions.get(position)
+            paths = [
+                p + [node]
+                for p in paths
+                for node in self.neighbors(p[-1], path.rel_types[position - 1], "out")
+                if self._accepts(node, label, condition)
+            ]
+        for position in range(anchor - 1, -1, -1):
+            label, condition = path.labels[position], conditions.get(position)
+            paths = [
+                [node] + p
+                for p in paths
+                for node in self.neighbors(p[0], path.rel_types[position], "in")
+                if self._accepts(node, label, condition)
+            ]
+        # Columna y posiciones de cada dato del RETURN, resueltas una vez (en
+        # una posición sin etiqueta no hay columna: se guarda la propiedad)
+        getters = []
+        for name, position, prop in path.returns:
+            label = path.labels[position]
+            if label is None:
+                getters.append((name, position, None, prop))
+                continue
+            column = self.columns.get(label, {}).get(prop)
+            getters.append((name, position, self.position.get(label), column))
+        return [
+            {
+                name: (
+                    self.value(p[position], None, column) if rows is None
+                    else column[rows[p[position]]] if column is not None and rows[p[position]] >= 0
+                    else None
+                )
+                for name, position, rows, column in getters
+            }
+            for p in paths
+        ]
+
+
+class GraphSnapshot:
+    """
+    Copia del grafo con recarga por versión, como EntityIndex: load()
+    exporta y reemplaza el contenido; ensure_fresh() la pone al día. Sin
+    cargar (o vieja) no responde: run_route() devuelve None.
+    """
+
+    def __init__(self, intent_paths=None):
+        self.intent_paths = intent_paths if intent_paths is not None else INTENT_PATHS
+        self._data = None
+        self._lock = threading.Lock()
+        self._loading = None
+        self.load_error = None
+        self.stats_counts = {"exportaciones": 0, "actualizaciones_estado": 0, "nodos_actualizados": 0}
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def graph_version(self):
+        data = self._data
+        return data.graph_version if data is not None else None
+
+    @property
+    def state_version(self):
+        data = self._data
+        return data.state_version if data is not None else None
+
+    def load(self, graph, graph_version=None, state_version=None):
+        """Exporta el grafo completo (una transacción) y reemplaza la copia."""
+        nodes, relationships, now = _export(graph)
+        since = now - CHANGE_OVERLAP_MS if now is not None else None
+        self._data = _SnapshotData(nodes, relationships, graph_version, state_version, since)
+        self.stats_counts["exportaciones"] += 1
+
+    def _load_in_background(self, graph, graph_version, state_version):
+        def _run():
+            try:
+                self.load(graph, graph_version, state_version)
+                self.load_error = None
+            except Exception as e:
+                self.load_error = e
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        with self._lock:
+            if self._loading is not None:
+                return
+            self._loading = threading.Thread(target=_run, name="copia-grafo", daemon=True)
+            self._loading.start()
+
+    def refresh_state(self, graph, state_version):
+        """
+        Relee los nodos de estado que cambiaron y actualiza sus columnas.
+        Devuelve False si hace falta volver a exportar (nodo nuevo, sin marca).
+        """
+        data = self._data
+        if data is None or data.since is None:
+            return False
+        with self._lock:
+            if data is not self._data or data.state_version == state_version:
+                return True
+            (now,) = graph.query(SERVER_TIME_QUERY) or [{"ahora": None}]
+            rows = graph.query(CHANGED_STATE_QUERY, params={"desde": data.since})
+            if not data.update_nodes(rows):
+                return False
+            if now["ahora"] is not None:
+                data.since = max(data.since, now["ahora"] - CHANGE_OVERLAP_MS)
+            data.state_version = state_version
+            self.stats_counts["actualizaciones_estado"] += 1
+            self.stats_counts["nodos_actualizados"] += len(rows)
+        return True
+
+    def ensure_fresh(self, graph, graph_version, state_version=None, wait=False):
+        """
+        Pone la copia al día. Si cambió la versión del grafo (o no está
+        cargada) vuelve a exportar: en un hilo aparte, o en este si wait=True.
+        Si solo cambió la de estado, actualiza las columnas de estado acá.
+        """
+        data = self._data
+        if data is not None and data.graph_version == graph_version:
+            if data.state_version == state_version or self.refresh_state(graph, state_version):
+                return
+        if wait:
+            with self._lock:
+                self.load(graph, graph_version, state_version)
+        else:
+            self._load_in_background(graph, graph_version, state_version)
+
+    def invalidate(self):
+        self._data = None
+
+    def query(self, path, params=None):
+        data = self._data
+        if data is None:
+            raise RuntimeError("La copia del grafo no está cargada")
+        return data.match(path, params or {})
+
+    def run_route(self, route_match, graph_version=None, state_version=None):
+        """
+        Filas de la intención desde la copia, o None si la intención no
+        tiene camino o la copia no corresponde a las versiones pedidas.
+        """
+        data = self._data
+        path = self.intent_paths.get(route_match.intent.name)
+        if data is None or path is None:
+            return None
+        if graph_version is not None and data.graph_version != graph_version:
+            return None
+        if state_version is not None and data.state_version != state_version:
+            return None
+        return data.match(path, route_match.params)
+
+    def stats(self):
+        data = self._data
+        if data is None:
+            return {}
+        return {
+            "nodos": len(data.element_ids),
+            "etiquetas": {label: len(members) for label, members in data.nodes.items()},
+            "relaciones": dict(data.relationship_counts),
+            "relaciones_salteadas": data.skipped_relationships,
+            "version": data.graph_version,
+            "version_estado": data.state_version,
+            **self.stats_counts,
+        }
+
+    def check(self, graph, sample=DEFAULT_CHECK_SAMPLE, seed=None):
+        """
+        Diferencias entre la copia y Neo4j: cantidad de nodos por etiqueta,
+        de relaciones por tipo y propiedades de una muestra de nodos.
+        Lista vacía = consistente.
+        """
+        data = self._data
+        if data is None:
+            return ["la copia no está cargada"]
+        problems = []
+        labels = {row["label"]: row["total"] for row in graph.query(COUNT_LABELS_QUERY)}
+        for label in sorted(set(labels) | set(data.nodes)):
+            ours = len(data.nodes.get(label, ()))
+            if ours != labels.get(label, 0):
+                problems.append(f"{label}: {ours} nodos en la copia, {labels.get(label, 0)} en Neo4j")
+        types = {row["type"]: row["total"] for row in graph.query(COUNT_RELATIONSHIPS_QUERY)}
+        for rel_type in sorted(set(types) | set(data.relationship_counts)):
+            ours = data.relationship_counts.get(rel_type, 0)
+            if ours != types.get(rel_type, 0):
+                problems.append(f"{rel_type}: {ours} relaciones en la copia, {types.get(rel_type, 0)} en Neo4j")
+
+        rng = random.Random(seed)
+        nodes = rng.sample(range(len(data.element_ids)), min(sample, len(data.element_ids)))
+        ids = [data.element_ids[i] for i in nodes]
+        remote = {row["id"]: row["props"] for row in graph.query(SAMPLE_NODES_QUERY, params={"ids": ids})}
+        for node, element_id in zip(nodes, ids):
+            if element_id not in remote:
+                problems.append(f"nodo {element_id}: no existe en Neo4j")
+                continue
+            for label, position in data.position.items():
+                if position[node] < 0:
+                    continue
+                ours = {
+                    prop: column[position[node]]
+                    for prop, column in data.columns[label].items()
+                    if column[position[node]] is not None
+                }
+                if ours != remote[element_id]:
+                    problems.append(f"nodo {element_id} ({label}): propiedades distintas")
+        return problems
+
+
+# --- Línea de comandos ---
+
+def _benchmark(snapshot, graph, repeat):
+    from intent_router import route, run_route
+
+    questions = [
+        "¿Qué jugadores deben ser sustituidos?",
+        "¿Cuál es el cansancio de Martinez?",
+        "¿Qué rivales tenemos?",
+        "¿Quién es el jugador clave de Los Primos?",
+        "¿De qué equipo es Rodriguez?",
+        "¿Contra quién jugamos?",
+    ]
+    for question in questions:
+        route_match = route(question)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            local = snapshot.run_route(route_match)
+        local_seconds = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            _, remote = run_route(graph, route_match)
+        remote_seconds = (time.perf_counter() - start) / repeat
+        same = sorted(map(str, local)) == sorted(map(str, remote))
+        print(
+            f"{route_match.intent.name:22s} copia {local_seconds * 1e6:8.1f} µs · "
+            f"Neo4j {remote_seconds * 1e3:7.2f} ms · {len(local)} filas"
+            + ("" if same else " · ⚠️ distinto de Neo4j")
+        )
+
+
+def main():
+    from connections import add_neo4j_arguments, close_all, neo4j_graph, settings_from_args
+    from graph_version import get_graph_version, get_state_version
+
+    parser = argparse.ArgumentParser(description="Copia en memoria del grafo")
+    parser.add_argument("comando", choices=["check", "benchmark"])
+    parser.add_argument("--muestra", type=int, default=DEFAULT_CHECK_SAMPLE, help="Nodos a comparar en check")
+    parser.add_argument("--repeticiones", type=int, default=100, help="Repeticiones por intención en benchmark")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    graph = neo4j_graph(settings_from_args(args))
+    try:
+        snapshot = GraphSnapshot()
+        start = time.perf_counter()
+        snapshot.load(graph, get_graph_version(), get_state_version())
+        stats = snapshot.stats()
+        print(f"✓ Copia cargada en {time.perf_counter() - start:.2f}s: {stats['nodos']} nodos, "
+              f"{sum(stats['relaciones'].values())} relaciones")
+
+        if args.comando == "check":
+            problems = snapshot.check(graph, sample=args.muestra)
+            for problem in problems:
+                print(f"  ✗ {problem}")
+            print("✓ La copia coincide con Neo4j" if not problems else f"✗ {len(problems)} diferencias")
+        else:
+            _benchmark(snapshot, graph, args.repeticiones)
+    finally:
+        close_all()
+
+
+if __name__ == "__main__":
+    main()
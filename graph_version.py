@@ -0,0 +1,110 @@
+"""
+Versión del grafo compartida entre procesos.
+
+Cada vez que algo escribe en Neo4j (el procesador de scouting de la página 2,
+recreate_db.py, etc.) se incrementa un contador guardado en disco. Los cachés
+de la app comparan contra este número para saber si sus datos quedaron viejos.
+
+Hay dos contadores:
+
+- la versión del grafo (estructura: nodos, relaciones, nombres). La usan el
+  schema persistido, el índice de entidades, el caché de plantillas y la
+  copia del grafo.
+- la versión de estado: escrituras que solo cambian propiedades de
+  EstadoFisico y Recomendacion (telemetría cada segundo, motor difuso).
+  Con ella se descartan solo las respuestas que leen esas propiedades y se
+  refrescan las columnas de estado de la copia, sin invalidar todo lo demás.
+"""
+import os
+import re
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los hilos de este proceso
+    fcntl = None
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Archivos donde se guardan las versiones (configurables por variable de entorno)
+VERSION_FILE = os.environ.get("DT_GRAPH_VERSION_FILE", os.path.join(_BASE_DIR, ".graph_version"))
+STATE_VERSION_FILE = os.environ.get("DT_STATE_VERSION_FILE", os.path.join(_BASE_DIR, ".state_version"))
+
+# Etiquetas cuyas propiedades cambian con la versión de estado, y lo que en
+# una consulta indica que las lee
+STATE_LABELS = ("EstadoFisico", "Recomendacion")
+_READS_STATE = re.compile(
+    r"\b(?:EstadoFisico|Recomendacion|TIENE_ESTADO|GENERA_RECOMENDACION"
+    r"|cansancio|riesgoLesion|ritmo_cardiaco|accion|confianza)\b"
+)
+
+_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _bump(path):
+    directory = os.path.dirname(path) or "."
+    # La app, telemetry.py, bulk_loader.py y fuzzy_engine.py incrementan desde
+    # procesos distintos: leer y escribir bajo un flock para no perder ningún +1
+    with _lock, open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        version = _read(path) + 1
+        # Escritura atómica: otro proceso nunca lee un archivo a medio escribir
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+        return version
+
+
+def get_graph_version():
+    """
+    Devuelve la versión actual del grafo (0 si nunca se escribió).
+    """
+    return _read(VERSION_FILE)
+
+
+def bump_graph_version():
+    """
+    Incrementa la versión del grafo y devuelve el nuevo valor.
+    Se debe llamar después de cualquier escritura en Neo4j.
+    """
+    return _bump(VERSION_FILE)
+
+
+def get_state_version():
+    """Versión de las propiedades de estado (0 si nunca se escribió)."""
+    return _read(STATE_VERSION_FILE)
+
+
+def bump_state_version():
+    """Incrementa la versión de estado y devuelve el nuevo valor."""
+    return _bump(STATE_VERSION_FILE)
+
+
+def bump_after_state_write(counters):
+    """
+    Para escrituras de EstadoFisico/Recomendacion: si solo cambiaron
+    propiedades, sube la versión de estado; si se crearon o borraron nodos o
+    relaciones (el MERGE creó un estado nuevo), la del grafo. `counters` son
+    los de la ResultSummary de la escritura (None = no se sabe: grafo).
+    """
+    structural = counters is None or any(
+        getattr(counters, name, 0)
+        for name in ("nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted")
+    )
+    return bump_graph_version() if structural else bump_state_version()
+
+
+def reads_state(cypher):
+    """Si la consulta puede leer propiedades que cambian con la versión de estado."""
+    return bool(cypher) and _READS_STATE.search(cypher) is not None
@@ -0,0 +1,244 @@
+"""
+Router determinístico de intenciones.
+
+Las preguntas más frecuentes del DT siguen los mismos patrones que los
+ejemplos few-shot del prompt Cypher (cypher_examples.py). Para esas
+preguntas no hace falta pasar por Mistral: se detecta la intención con
+expresiones regulares, se ejecuta la consulta Cypher parametrizada
+equivalente y la respuesta se arma con una plantilla en español.
+
+Si ninguna intención coincide, route() devuelve None y la app usa la
+GraphCypherQAChain como siempre.
+"""
+import re
+from dataclasses import dataclass, field
+
+
+# --- Formateo de respuestas ---
+
+def _join_names(names):
+    """
+    ["A", "B", "C"] -> "A, B y C"
+    """
+    names = [str(n) for n in names]
+    if len(names) <= 1:
+        return "".join(names)
+    return ", ".join(names[:-1]) + " y " + names[-1]
+
+
+def _column(rows, key):
+    """Valores no nulos y sin repetir de una columna, en orden."""
+    values = []
+    seen = set()
+    for row in rows:
+        value = row.get(key)
+        if value is None or value in seen:
+            continue
+        seen.add(value)
+        values.append(value)
+    return values
+
+
+def _format_sustituciones(rows, params):
+    nombres = _column(rows, "jugador")
+    if not nombres:
+        return "No hay jugadores con recomendación de sustitución en este momento."
+    if len(nombres) == 1:
+        return f"El jugador que debe ser sustituido es {nombres[0]}."
+    return f"Los jugadores que deben ser sustituidos son: {_join_names(nombres)}."
+
+
+def _format_cansancio(rows, params):
+    if not rows:
+        return f"No encontré información de cansancio para {params['nombre']}."
+    partes = [f"{row['jugador']}: {row['cansancio']}" for row in rows]
+    if len(rows) == 1:
+        return f"El cansancio de {rows[0]['jugador']} es {rows[0]['cansancio']}."
+    return "Cansancio registrado: " + _join_names(partes) + "."
+
+
+def _format_rivales(rows, params):
+    nombres = _column(rows, "rival")
+    if not nombres:
+        return "No hay rivales cargados en la base de datos."
+    return f"Los rivales registrados son: {_join_names(nombres)}."
+
+
+def _format_jugador_clave(rows, params):
+    if not rows:
+        return f"No encontré jugadores clave para {params['rival']}."
+    equipo = rows[0]["equipo"]
+    nombres = _column(rows, "jugador")
+    if len(nombres) == 1:
+        return f"El jugador clave de {equipo} es {nombres[0]}."
+    return f"Los jugadores clave de {equipo} son: {_join_names(nombres)}."
+
+
+def _format_equipo_de_jugador(rows, params):
+    if not rows:
+        return f"No encontré a qué equipo pertenece {params['nombre']}."
+    equipos = _column(rows, "equipo")
+    return f"{rows[0]['jugador']} juega en {_join_names(equipos)}."
+
+
+def _format_proximo_rival(rows, params):
+    nombres = _column(rows, "rival")
+    if not nombres:
+        return "No hay partidos cargados en la base de datos."
+    return f"Jugamos contra {_join_names(nombres)}."
+
+
+# --- Definición de intenciones ---
+
+@dataclass
+class Intent:
+    name: str
+    patterns: list
+    cypher: str
+    formatter: object
+    params: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in self.patterns]
+
+
+@dataclass
+class RouteMatch:
+    intent: Intent
+    params: dict
+
+    @property
+    def cypher(self):
+        return self.intent.cypher
+
+    def format(self, rows):
+        return self.intent.formatter(rows, self.params)
+
+
+# El nombre capturado se limpia en _clean_entity()
+_NOMBRE = r"(?P<nombre>[\w\s.'-]+?)"
+_RIVAL = r"(?P<rival>[\w\s.'-]+?)"
+
+INTENTS = [
+    Intent(
+        name="sustituciones",
+        patterns=[
+            r"^(?:qu[eé]|cu[aá]les) jugadores (?:deben|debo|debemos|hay que|tengo que|tenemos que) (?:ser )?(?:sustituir|sustituidos|cambiar|cambiados|reemplazar|reemplazados)$",
+            r"^qui[eé]n(?:es)? (?:debe|deben|deber[ií]a|deber[ií]an) (?:ser )?(?:sustituido|sustituidos|salir|cambiado|cambiados)$",
+            r"^(?:a )?qui[eé]n(?:es)? (?:sustituyo|cambio|saco)$",
+        ],
+        cypher=(
+            "MATCH (j:Jugador)-[:TIENE_ESTADO]->()-[:GENERA_RECOMENDACION]->(r:Recomendacion) "
+            "WHERE r.accion CONTAINS 'Sustitucion' "
+            "RETURN j.nombre AS jugador"
+        ),
+        formatter=_format_sustituciones,
+    ),
+    Intent(
+        name="cansancio_jugador",
+        patterns=[
+            rf"^(?:cu[aá]l es |qu[eé] )?(?:el )?(?:nivel de )?cansancio (?:tiene |de |del jugador )+{_NOMBRE}$",
+            rf"^(?:qu[eé] tan|cu[aá]n) cansado est[aá] {_NOMBRE}$",
+        ],
+        cypher=(
+            "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) "
+            "WHERE j.nombre CONTAINS $nombre "
+            "RETURN j.nombre AS jugador, e.cansancio AS cansancio"
+        ),
+        formatter=_format_cansancio,
+        params=["nombre"],
+    ),
+    Intent(
+        name="lista_rivales",
+        patterns=[
+            r"^(?:qu[eé]|cu[aá]les(?: son(?: los)?)?) rivales (?:tenemos|hay)(?: en la base de datos| registrados| cargados)?$",
+            r"^(?:lista(?:r)?|mostrar|muestra) (?:los )?rivales$",
+        ],
+        cypher="MATCH (r:Rival) RETURN r.nombre AS rival",
+        formatter=_format_rivales,
+    ),
+    Intent(
+        name="jugador_clave_rival",
+        patterns=[
+            rf"^qui[eé]n(?:es)? (?:es|son) (?:el |los )?jugador(?:es)? (?:clave|estrella)s? (?:de|del) {_RIVAL}$",
+            rf"^cu[aá]l(?:es)? (?:es|son) (?:el |los )?jugador(?:es)? (?:clave|estrella)s? (?:de|del) {_RIVAL}$",
+        ],
+        cypher=(
+            "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival) "
+            "WHERE r.nombre CONTAINS $rival "
+            "RETURN r.nombre AS equipo, j.nombre AS jugador"
+        ),
+        formatter=_format_jugador_clave,
+        params=["rival"],
+    ),
+    Intent(
+        name="equipo_de_jugador",
+        patterns=[
+            rf"^(?:de|en) qu[eé] equipo (?:es|juega|est[aá]) {_NOMBRE}$",
+            rf"^(?:para )?qu[eé] equipo juega {_NOMBRE}$",
+        ],
+        cypher=(
+            "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival) "
+            "WHERE j.nombre CONTAINS $nombre "
+            "RETURN j.nombre AS jugador, r.nombre AS equipo"
+        ),
+        formatter=_format_equipo_de_jugador,
+        params=["nombre"],
+    ),
+    Intent(
+        name="proximo_rival",
+        patterns=[
+            r"^contra qui[eé]n (?:jugamos|juega el equipo|nos enfrentamos|es el partido)(?: hoy)?$",
+            r"^(?:qui[eé]n|cu[aá]l) es (?:el |nuestro )?(?:pr[oó]ximo )?rival$",
+        ],
+        cypher="MATCH (p:Partido)-[:ENFRENTA]->(r:Rival) RETURN r.nombre AS rival",
+        formatter=_format_proximo_rival,
+    ),
+]
+
+
+def _clean_question(question):
+    """
+    Quita signos de interrogación/exclamación y espacios repetidos.
+    Se conservan mayúsculas y tildes para no alterar los nombres.
+    """
+    text = re.sub(r"[¿?¡!]", " ", question)
+    text = " ".join(text.split())
+    return text.rstrip(". ")
+
+
+def _clean_entity(value):
+    """
+    Limpia un nombre capturado. Si el usuario lo escribió todo en minúsculas
+    ("boca unidos") se capitaliza como están guardados en el grafo.
+    """
+    value = value.strip(" .'\"")
+    if value.islower():
+        value = value.title()
+    return value
+
+
+def route(question):
+    """
+    Devuelve un RouteMatch si la pregunta corresponde a una intención
+    conocida, o None para usar la GraphCypherQAChain.
+    """
+    text = _clean_question(question)
+    for intent in INTENTS:
+        for pattern in intent.patterns:
+            match = pattern.match(text)
+            if not match:
+                continue
+            params = {name: _clean_entity(match.group(name)) for name in intent.params}
+            if all(params.values()):
+                return RouteMatch(intent=intent, params=params)
+    return None
+
+
+def run_route(graph, route_match):
+    """
+    Ejecuta la consulta de la intención contra el grafo.
+    Devuelve (respuesta, filas).
+    """
+    rows = graph.query(route_match.cypher, params=route_match.params)
+    return route_match.format(rows), rows
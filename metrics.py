@@ -0,0 +1,258 @@
+"""
+Métricas por pregunta y por etapa.
+
+Cada pregunta lleva un QuestionMetrics con un callback de LangChain
+(MetricsCallback) que se pasa a las llamadas al LLM del pipeline y mide:
+
+- cypher_llm: tiempo y tokens (entrada/salida) de la generación de Cypher
+- neo4j: tiempo de la consulta y cantidad de filas
+- qa_llm: tiempo y tokens de la redacción de la respuesta
+- cola_llm: espera por el límite de llamadas simultáneas a Ollama
+- total
+
+MetricsRegistry acumula todas las preguntas y las expone en formato de
+texto de Prometheus: en un archivo (para el textfile collector de
+node_exporter) y, opcionalmente, en http://host:puerto/metrics.
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks.base import BaseCallbackHandler
+
+METRICS_FILE = os.environ.get(
+    "DT_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".metrics.prom"),
+)
+
+# Etapas medidas y etiquetas (tags) de LangChain que identifican cada llamada al LLM
+STAGES = ("cola_llm", "cypher_llm", "neo4j", "qa_llm", "total")
+LLM_TAGS = {"dt:cypher": "cypher_llm", "dt:qa": "qa_llm"}
+
+# Límites de los buckets del histograma de latencia (segundos)
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _token_usage(response):
+    """
+    (tokens_entrada, tokens_salida) de un LLMResult, sea cual sea el
+    proveedor: usage_metadata del mensaje, llm_output["token_usage"] o los
+    contadores de Ollama (prompt_eval_count / eval_count).
+    """
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            info = generation.generation_info or {}
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+            elif "eval_count" in info or "prompt_eval_count" in info:
+                prompt_tokens += info.get("prompt_eval_count") or 0
+                completion_tokens += info.get("eval_count") or 0
+    if not (prompt_tokens or completion_tokens):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """
+    Mide las llamadas al LLM de una pregunta. La etapa sale de las tags
+    con que el pipeline invoca cada subcadena ("dt:cypher" / "dt:qa").
+    """
+
+    def __init__(self, question_metrics):
+        self.question_metrics = question_metrics
+        self._runs = {}
+
+    def _start(self, run_id, tags):
+        stage = next((LLM_TAGS[t] for t in tags or [] if t in LLM_TAGS), None)
+        if stage:
+            self._runs[run_id] = (stage, time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        stage, started = run
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self.question_metrics.add(f"{stage}_seg", time.perf_counter() - started)
+        self.question_metrics.add(f"{stage}_tokens_entrada", prompt_tokens)
+        self.question_metrics.add(f"{stage}_tokens_salida", completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+
+class QuestionMetrics:
+    """
+    Métricas de una pregunta. Se arma en QAPipeline.prepare() y se cierra
+    en finish(); values queda en la respuesta como dict plano.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.values = {}
+        self._lock = threading.Lock()
+        self.callback = MetricsCallback(self)
+
+    def add(self, key, value):
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{stage}_seg", time.perf_counter() - start)
+
+    def config(self, tag):
+        """config de LangChain para invocar una subcadena con este callback."""
+        return {"callbacks": [self.callback], "tags": [tag]}
+
+    def fork(self):
+        """
+        Copia independiente con lo medido hasta ahora: la usa cada sesión que
+        comparte una preparación (request_pool.py) para medir su propia respuesta.
+        """
+        fork = QuestionMetrics()
+        with self._lock:
+            fork.started = self.started
+            fork.values = dict(self.values)
+        return fork
+
+    def close(self):
+        with self._lock:
+            self.values["total_seg"] = time.perf_counter() - self.started
+            return dict(self.values)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    Acumulado de todas las preguntas, compartido entre sesiones.
+    """
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._questions = {}
+        self._histograms = {}
+        self._tokens = {}
+        self._rows = 0
+        self._errors = 0
+
+    def observe(self, values, path):
+        """
+        Registra las métricas cerradas de una pregunta y actualiza el archivo.
+        """
+        with self._lock:
+            self._questions[path] = self._questions.get(path, 0) + 1
+            for stage in STAGES:
+                seconds = values.get(f"{stage}_seg")
+                if seconds is not None:
+                    self._histograms.setdefault(stage, _Histogram()).observe(seconds)
+                for direction in ("entrada", "salida"):
+                    count = values.get(f"{stage}_tokens_{direction}")
+                    if count:
+                        key = (stage, direction)
+                        self._tokens[key] = self._tokens.get(key, 0) + count
+            self._rows += values.get("neo4j_filas", 0)
+        if self.path:
+            self.write_textfile()
+
+    def observe_error(self):
+        with self._lock:
+            self._errors += 1
+
+    def render(self):
+        """
+        Texto en formato de exposición de Prometheus.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP dt_preguntas_total Preguntas respondidas por camino.")
+            lines.append("# TYPE dt_preguntas_total counter")
+            for path, count in sorted(self._questions.items()):
+                lines.append(f'dt_preguntas_total{{camino="{path}"}} {count}')
+            lines.append("# HELP dt_errores_total Preguntas que terminaron en error.")
+            lines.append("# TYPE dt_errores_total counter")
+            lines.append(f"dt_errores_total {self._errors}")
+
+            lines.append("# HELP dt_etapa_segundos Latencia por etapa del pipeline.")
+            lines.append("# TYPE dt_etapa_segundos histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    lines.append(f'dt_etapa_segundos_bucket{{etapa="{stage}",le="{bound}"}} {count}')
+                lines.append(f'dt_etapa_segundos_bucket{{etapa="{stage}",le="+Inf"}} {histogram.total}')
+                lines.append(f'dt_etapa_segundos_sum{{etapa="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'dt_etapa_segundos_count{{etapa="{stage}"}} {histogram.total}')
+
+            lines.append("# HELP dt_llm_tokens_total Tokens del LLM por etapa y dirección.")
+            lines.append("# TYPE dt_llm_tokens_total counter")
+            for (stage, direction), count in sorted(self._tokens.items()):
+                lines.append(f'dt_llm_tokens_total{{etapa="{stage}",direccion="{direction}"}} {count}')
+
+            lines.append("# HELP dt_neo4j_filas_total Filas devueltas por las consultas.")
+            lines.append("# TYPE dt_neo4j_filas_total counter")
+            lines.append(f"dt_neo4j_filas_total {self._rows}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        path = path or self.path
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Expone /metrics por HTTP desde un hilo propio. Devuelve el servidor.
+        """
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="metricas", daemon=True).start()
+        return server
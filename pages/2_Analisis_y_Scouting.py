@@ -4,25 +4,29 @@ import spacy
 from spacy import displacy
 import altair as alt
 import os
-from neo4j import GraphDatabase
 from neo4j.exceptions import AuthError, ServiceUnavailable  # <-- ¡AGREGADO!
+import tempfile
+from scouting import update_graph_with_entities, read_reports, ingest_reports
+from dataset_store import DatasetStore
+from report_classifier import load_or_train
+from report_search import open_or_build
+from connections import get_driver, get_settings, with_retry
 
-# --- CONFIGURACIÓN DE CONEXIÓN A NEO4J (¡NUEVO!) ---
-# Copiamos las mismas credenciales que usa app.py
-URI = os.environ.get("NEO4J_URI", "neo4j://127.0.0.1:7687")
-USER = os.environ.get("NEO4J_USERNAME", "neo4j")
-PASSWORD = os.environ.get("NEO4J_PASSWORD", "neo4j123")
+# --- CONFIGURACIÓN DE CONEXIÓN A NEO4J ---
+# La misma configuración y el mismo driver (pool) que app.py: ver connections.py
+CONNECTIONS = get_settings()
 
 # --- FUNCIONES DE LÓGICA (¡NUEVO!) ---
 
 @st.cache_resource
 def get_neo4j_driver():
     """
-    Crea y cachea una instancia del driver de Neo4j.
+    Driver de Neo4j compartido con el chat (connections.get_driver),
+    con reintentos si Neo4j tarda en estar disponible.
     """
     try:
-        driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
-        driver.verify_connectivity()
+        driver = get_driver(CONNECTIONS)
+        with_retry(driver.verify_connectivity, settings=CONNECTIONS)
         return driver
     except AuthError:
         st.error("Error de autenticación con Neo4j. Revisa las credenciales.")
@@ -31,135 +35,6 @@ def get_neo4j_driver():
         st.error("Error: No se pudo conectar a Neo4j. ¿Está la base de datos corriendo?")
         return None
 
-def update_graph_with_entities(driver, entities, text):
-    """
-    Toma las entidades de spaCy y el texto original para extraer información del rival.
-    Estrategia mejorada:
-    1. Buscar nombres de equipos entre comillas
-    2. Buscar nombres de jugadores entre comillas
-    3. Usar entidades de spaCy como respaldo
-    """
-    import re
-    
-    # 1. ESTRATEGIA PRIMARIA: Buscar texto entre comillas
-    quoted_pattern = r"['\"]([^'\"]+)['\"]"
-    quoted_matches = re.findall(quoted_pattern, text)
-    
-    rival_org = None
-    rival_players = []
-    
-    # Palabras comunes que NO son nombres de jugadores
-    palabras_comunes = {
-        'recomendamos', 'debemos', 'tenemos', 'es', 'son', 'tiene', 'tienen',
-        'juega', 'juegan', 'marca', 'marcan', 'cansa', 'cansan', 'evitar',
-        'presionar', 'defender', 'atacar', 'y', 'o', 'pero', 'si', 'no',
-        'muy', 'poco', 'mucho', 'más', 'menos', 'el', 'la', 'los', 'las',
-        'un', 'una', 'unos', 'unas', 'desde', 'hasta', 'para', 'por', 'con'
-    }
-    
-    # El primer texto entre comillas después de "Análisis de" o "rival" suele ser el equipo
-    if "Análisis de" in text or "análisis de" in text.lower():
-        team_pattern = r"[Aa]nálisis de ['\"]?([^'\":\n]+)['\"]?"
-        team_match = re.search(team_pattern, text)
-        if team_match:
-            rival_org = team_match.group(1).strip()
-    elif "rival" in text.lower():
-        # Buscar patrón "rival 'Nombre'"
-        rival_pattern = r"rival ['\"]([^'\"]+)['\"]"
-        rival_match = re.search(rival_pattern, text, re.IGNORECASE)
-        if rival_match:
-            rival_org = rival_match.group(1).strip()
-    
-    # Si no encontramos el equipo con patrones, usar la primera entidad ORG
-    if not rival_org:
-        for ent in entities:
-            if ent.label_ == "ORG":
-                rival_org = ent.text
-                break
-    
-    # 2. BUSCAR JUGADORES: Texto entre comillas que parezca nombre de persona
-    for match in quoted_matches:
-        match_clean = match.strip()
-        match_lower = match_clean.lower()
-        
-        # Filtrar:
-        # - No es el nombre del equipo
-        # - Longitud razonable (3-30 caracteres)
-        # - No contiene números
-        # - Primera letra mayúscula
-        # - No es una palabra común
-        # - Máximo 3 palabras (para evitar frases completas)
-        if (match_clean != rival_org and 
-            2 <= len(match_clean) <= 30 and 
-            not any(char.isdigit() for char in match_clean) and
-            match_clean[0].isupper() and
-            match_lower not in palabras_comunes and
-            len(match_clean.split()) <= 3):
-            
-            # Verificar que no sea una palabra común al inicio
-            primera_palabra = match_clean.split()[0].lower()
-            if primera_palabra not in palabras_comunes:
-                rival_players.append(match_clean)
-    
-    # Agregar también las entidades PER de spaCy (son más confiables)
-    for ent in entities:
-        ent_clean = ent.text.strip()
-        ent_lower = ent_clean.lower()
-        
-        # Filtrar palabras comunes incluso si vienen de spaCy
-        if ent_lower in palabras_comunes:
-            continue
-            
-        if ent.label_ == "PER" and ent_clean not in rival_players:
-            rival_players.append(ent_clean)
-        # IMPORTANTE: A veces spaCy marca jugadores como ORG incorrectamente
-        # Si ya tenemos un equipo, otras ORG cortas podrían ser jugadores
-        elif ent.label_ == "ORG" and ent_clean != rival_org and rival_org:
-            # Solo agregar si es un nombre corto (max 3 palabras) y no es palabra común
-            if (len(ent_clean.split()) <= 3 and 
-                ent_clean not in rival_players and
-                ent_lower not in palabras_comunes):
-                rival_players.append(ent_clean)
-    
-    # 3. Si encontramos equipo y al menos un jugador, escribir en Neo4j
-    if rival_org and rival_players:
-        results = []
-        try:
-            with driver.session() as session:
-                # Crear el nodo Rival
-                session.run(
-                    "MERGE (r:Rival {nombre: $nombre})",
-                    nombre=rival_org
-                )
-                
-                # Crear cada jugador clave y su relación
-                for player in rival_players:
-                    query = (
-                        "MERGE (r:Rival {nombre: $rival_nombre}) "
-                        "MERGE (j:JugadorRival {nombre: $jugador_nombre}) "
-                        "MERGE (r)-[:TIENE_JUGADOR_CLAVE]->(j)"
-                    )
-                    session.run(query, rival_nombre=rival_org, jugador_nombre=player)
-                    results.append(f"  • {player}")
-                
-            result_text = f"✅ **Grafo actualizado exitosamente:**\n"
-            result_text += f"**Equipo:** {rival_org}\n"
-            result_text += f"**Jugadores clave:** ({len(rival_players)})\n"
-            result_text += "\n".join(results)
-            return result_text
-            
-        except Exception as e:
-            return f"❌ Error al escribir en Neo4j: {e}"
-    
-    # 4. Mensajes de ayuda si no se encontró información
-    if not rival_org:
-        return "⚠️ No se detectó el nombre del equipo rival. Intenta incluirlo entre comillas, ej: Análisis de 'Los Primos' o rival 'Boca Unidos'"
-    elif not rival_players:
-        return f"⚠️ Se detectó el equipo '{rival_org}' pero no se encontraron jugadores. Incluye nombres entre comillas, ej: 'Martinez'"
-    
-    return "❌ No se encontraron entidades válidas para actualizar el grafo."
-
-
 # --- CONFIGURACIÓN DE LA PÁGINA (Sin cambios) ---
 st.set_page_config(page_title="Análisis y Scouting", page_icon="📊")
 st.title("📊 Análisis Histórico y Scouting NLP")
@@ -179,19 +54,68 @@ def load_spacy_model():
 
 nlp_model = load_spacy_model()
 
-@st.cache_data
-def load_data(csv_path="dataset.csv"):
+@st.cache_resource
+def load_category_classifier():
+    """
+    Clasificador de categoría (se entrena solo si el modelo guardado no
+    existe o dataset.csv cambió).
+    """
     try:
-        df = pd.read_csv(csv_path)
-        return df
+        return load_or_train()
     except FileNotFoundError:
-        st.error(
-            f"Error: No se encontró el archivo '{csv_path}'. "
-            "Asegúrate de que 'dataset.csv' esté en la carpeta raíz del proyecto."
-        )
-        return pd.DataFrame()
-    
-df = load_data()
+        return None
+
+category_classifier = load_category_classifier()
+
+@st.cache_resource
+def load_dataset_store(csv_path, modified_at):
+    """
+    Dataset en formato columnar con agregados e índices por categoría.
+    modified_at (fecha del CSV) hace que se recargue si el archivo cambia.
+    """
+    return DatasetStore.from_csv(csv_path)
+
+DATASET_PATH = "dataset.csv"
+PAGE_SIZES = [25, 50, 100, 250]
+
+if os.path.exists(DATASET_PATH):
+    store = load_dataset_store(DATASET_PATH, os.path.getmtime(DATASET_PATH))
+else:
+    st.error(
+        f"Error: No se encontró el archivo '{DATASET_PATH}'. "
+        "Asegúrate de que 'dataset.csv' esté en la carpeta raíz del proyecto."
+    )
+    store = None
+
+@st.cache_resource
+def load_report_index(csv_path, modified_at):
+    """
+    Índice BM25 de reportes similares (se reconstruye si el CSV cambia).
+    """
+    return open_or_build(csv_path)
+
+report_index = (
+    load_report_index(DATASET_PATH, os.path.getmtime(DATASET_PATH))
+    if os.path.exists(DATASET_PATH) else None
+)
+
+def show_similar_reports(texto, k=5):
+    """
+    Reportes del archivo más parecidos al texto (antes de agregarlo al índice).
+    """
+    similares = report_index.search(texto, k, exclude_text=texto)
+    st.subheader("🔎 Reportes similares")
+    if not similares:
+        st.caption("No hay reportes parecidos en el archivo.")
+        return
+    st.table(pd.DataFrame([
+        {
+            "Reporte": r["explicacion"],
+            "Categoría": r["categoria"],
+            "Similitud": round(r["puntaje"], 2),
+        }
+        for r in similares
+    ]))
 
 # Obtener el driver de Neo4j al cargar la página
 neo4j_driver = get_neo4j_driver()
@@ -202,21 +126,18 @@ tab1, tab2 = st.tabs(["📈 Análisis del Dataset", "📝 Procesador de Scouting
 with tab1:
     st.header("Análisis del Dataset de Scouting")
     
-    if not df.empty:
+    if store is not None and len(store):
         # Mostrar información general del dataset
         st.subheader("Resumen del Dataset")
         
         col1, col2 = st.columns(2)
-        col1.metric("Total de Reportes", len(df))
-        col2.metric("Categorías", df["categoria"].nunique())
+        col1.metric("Total de Reportes", f"{len(store):,}")
+        col2.metric("Categorías", len(store.counts))
         
-        # Distribución de categorías
+        # Distribución de categorías (precalculada al cargar el dataset)
         st.subheader("Distribución de Categorías")
         
-        categoria_counts = df["categoria"].value_counts().reset_index()
-        categoria_counts.columns = ["Categoría", "Cantidad"]
-        
-        chart = alt.Chart(categoria_counts).mark_bar().encode(
+        chart = alt.Chart(store.counts).mark_bar().encode(
             x=alt.X('Cantidad:Q', title='Cantidad de Reportes'),
             y=alt.Y('Categoría:N', title='Categoría', sort='-x'),
             color=alt.Color('Categoría:N', legend=None),
@@ -225,28 +146,39 @@ with tab1:
         
         st.altair_chart(chart, use_container_width=True)
         
-        # Filtro por categoría
+        # Filtro por categoría y texto; al navegador solo llega la página visible
         st.subheader("Explorar Reportes por Categoría")
-        categorias = ["Todas"] + df["categoria"].unique().tolist()
-        categoria_seleccionada = st.selectbox(
-            "Selecciona una categoría:",
-            options=categorias
-        )
+        col_categoria, col_busqueda = st.columns(2)
+        with col_categoria:
+            categoria_seleccionada = st.selectbox(
+                "Selecciona una categoría:",
+                options=["Todas"] + store.category_names
+            )
+        with col_busqueda:
+            busqueda = st.text_input("Buscar en el texto:")
+        categoria = None if categoria_seleccionada == "Todas" else categoria_seleccionada
         
-        if categoria_seleccionada == "Todas":
-            df_filtrado = df
-        else:
-            df_filtrado = df[df["categoria"] == categoria_seleccionada]
+        total_filtrado = store.count(categoria, busqueda)
+        col_tamano, col_pagina = st.columns(2)
+        with col_tamano:
+            tamano_pagina = st.selectbox("Reportes por página:", PAGE_SIZES, index=1)
+        total_paginas = max(1, -(-total_filtrado // tamano_pagina))
+        with col_pagina:
+            pagina = st.number_input("Página:", min_value=1, max_value=total_paginas, value=1)
         
-        st.write(f"Mostrando {len(df_filtrado)} reportes")
-        st.dataframe(df_filtrado, use_container_width=True)
+        pagina_df = store.page(categoria, int(pagina) - 1, tamano_pagina, busqueda)
+        st.write(
+            f"Mostrando {len(pagina_df)} de {total_filtrado:,} reportes "
+            f"(página {pagina} de {total_paginas})"
+        )
+        st.dataframe(pagina_df, use_container_width=True)
         
         # Mostrar ejemplos aleatorios
         st.subheader("Ejemplos Aleatorios")
         if st.button("🎲 Generar nuevos ejemplos"):
             st.rerun()
         
-        ejemplos = df_filtrado.sample(min(3, len(df_filtrado)))
+        ejemplos = store.sample(categoria, 3, busqueda)
         for idx, row in ejemplos.iterrows():
             with st.expander(f"📝 {row['categoria']}"):
                 st.write(row['explicacion'])
@@ -336,13 +268,29 @@ with tab2:
             with st.spinner("Procesando texto y actualizando grafo..."):
                 # 1. Procesar el texto con spaCy
                 doc = nlp_model(texto_reporte)
+
+                # Categoría del reporte (clasificador entrenado con dataset.csv)
+                categoria_reporte = None
+                if category_classifier is not None:
+                    categoria_reporte, confianza = category_classifier.predict_one(texto_reporte)
+                    st.info(f"🏷️ Categoría del reporte: **{categoria_reporte}** ({confianza:.0%})")
+
+                # Reportes comparables del archivo
+                if report_index is not None:
+                    show_similar_reports(texto_reporte)
                 
                 # 2. ¡NUEVO! Escribir las entidades en Neo4j (pasar texto también)
-                status_message = update_graph_with_entities(neo4j_driver, doc.ents, texto_reporte)
+                status_message = update_graph_with_entities(
+                    neo4j_driver, doc.ents, texto_reporte, database=CONNECTIONS.neo4j_database,
+                )
                 
                 # 3. Mostrar el mensaje de estado (éxito o advertencia)
                 if "✅" in status_message or "Éxito" in status_message:
                     st.success(status_message)
+                    # Solo un reporte escrito en el grafo queda indexado (por
+                    # report_id: analizarlo de nuevo no lo duplica)
+                    if report_index is not None:
+                        report_index.add([texto_reporte], [categoria_reporte])
                     
                     # Mostrar consultas de ejemplo
                     st.info("💡 **Ahora puedes hacer estas consultas en la pestaña principal:**")
@@ -381,4 +329,90 @@ with tab2:
                         "MISC": "Otro"
                     }
                     df_entidades["Tipo"] = df_entidades["Tipo"].map(lambda x: tipo_traduccion.get(x, x))
-                    st.table(df_entidades)
\ No newline at end of file
+                    st.table(df_entidades)
+
+    # --- Carga masiva de reportes ---
+    st.divider()
+    st.subheader("📦 Carga masiva de reportes")
+    st.markdown(
+        "Sube un archivo con muchos reportes (`.csv` con columna `reporte`, "
+        "`.jsonl` o `.txt` separados por una línea en blanco). Se procesan por lotes "
+        "con spaCy y se escriben en el grafo en una transacción por lote."
+    )
+    archivo_reportes = st.file_uploader("Archivo de reportes", type=["csv", "jsonl", "txt"])
+    col_lote, col_procesos = st.columns(2)
+    with col_lote:
+        lote_escritura = st.number_input("Reportes por transacción", min_value=10, max_value=10000, value=500, step=50)
+    with col_procesos:
+        procesos_spacy = st.number_input("Procesos de spaCy", min_value=1, max_value=os.cpu_count() or 1, value=1)
+
+    if st.button("Procesar archivo y actualizar grafo", disabled=archivo_reportes is None):
+        if not neo4j_driver:
+            st.error("No se puede actualizar: falta la conexión con Neo4j.")
+        else:
+            # read_reports() detecta el formato por la extensión
+            sufijo = os.path.splitext(archivo_reportes.name)[1]
+            with tempfile.NamedTemporaryFile(suffix=sufijo, delete=False) as tmp:
+                tmp.write(archivo_reportes.getvalue())
+            textos = read_reports(tmp.name)
+            os.unlink(tmp.name)
+
+            barra = st.progress(0.0, text=f"0/{len(textos)} reportes")
+            escritos = [0]
+
+            def _progreso(hechos, total):
+                # Se llama después de cada lote confirmado en Neo4j
+                escritos[0] = hechos
+                barra.progress(hechos / max(total, 1), text=f"{hechos}/{total} reportes")
+
+            try:
+                stats = ingest_reports(
+                    nlp_model, neo4j_driver, textos,
+                    write_batch_size=int(lote_escritura),
+                    n_process=int(procesos_spacy),
+                    progress=_progreso,
+                    database=CONNECTIONS.neo4j_database,
+                )
+            except Exception as e:
+                # Los lotes ya confirmados quedan en el grafo: solo esos se indexan
+                if report_index is not None and escritos[0]:
+                    report_index.add(textos[:escritos[0]])
+                st.error(f"❌ Error al escribir en Neo4j después de {escritos[0]} reportes: {e}")
+                st.stop()
+            st.success(
+                f"✅ {stats['reportes']} reportes procesados en {stats['segundos']:.1f}s"
+            )
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Reportes/seg", f"{stats['reportes_por_seg']:,.1f}")
+            m2.metric("Rivales", stats["rivales"])
+            m3.metric("Jugadores clave", stats["jugadores"])
+            if stats["reportes_con_datos"] < stats["reportes"]:
+                st.info(
+                    f"{stats['reportes'] - stats['reportes_con_datos']} reportes no tenían "
+                    "rival y jugadores reconocibles."
+                )
+
+            # Categoría de cada reporte, en lotes
+            categorias_reportes = None
+            if category_classifier is not None and textos:
+                categorias_reportes = pd.DataFrame(
+                    category_classifier.predict(textos),
+                    columns=["categoria", "confianza"],
+                )
+                categorias_reportes.insert(0, "reporte", textos)
+                st.subheader("🏷️ Categorías de los reportes")
+                st.bar_chart(categorias_reportes["categoria"].value_counts())
+                st.download_button(
+                    "Descargar reportes con categoría (CSV)",
+                    categorias_reportes.to_csv(index=False).encode("utf-8"),
+                    file_name="reportes_categorizados.csv",
+                    mime="text/csv",
+                )
+
+            # Los reportes escritos quedan disponibles en la búsqueda de similares
+            # (por report_id: subir el mismo archivo otra vez no los duplica)
+            if report_index is not None and textos:
+                report_index.add(
+                    textos,
+                    None if categorias_reportes is None else categorias_reportes["categoria"].tolist(),
+                )
@@ -0,0 +1,434 @@
+"""
+Pipeline de preguntas y respuestas sobre el grafo.
+
+Ejecuta por separado los pasos de la GraphCypherQAChain (generar Cypher,
+ejecutarlo, redactar la respuesta) para poder intercalar los atajos:
+
+1. Ruta rápida de intenciones conocidas (intent_router.py), sin LLM. Con
+   una copia del grafo en memoria (graph_snapshot.py) tampoco va a Neo4j.
+   Si una intención con parámetros no encuentra filas, el nombre capturado
+   no era una entidad y la pregunta sigue por los pasos siguientes.
+2. Caché de respuestas por pregunta normalizada (answer_cache.py).
+3. Caché de plantillas Cypher con entidades como parámetros
+   (entity_index.py + cypher_cache.py): el LLM genera Cypher una sola vez
+   por forma de pregunta.
+4. GraphCypherQAChain paso a paso como último recurso. Si el resultado de
+   la consulta es simple, la respuesta la arma result_formatter.py y se
+   evita la segunda llamada al LLM. El prompt Cypher lleva solo los
+   ejemplos y el pedazo de schema que corresponden a la pregunta
+   (cypher_examples.ExampleStore). El Cypher generado se valida y se
+   repara localmente (cypher_validator.py); solo si sigue inválido se
+   vuelve a pedir al LLM, con un número acotado de reintentos. El schema
+   del prompt y del validador se relee cuando cambia la versión del grafo
+   o aparecen propiedades nuevas (ensure_schema_fresh). La
+   consulta se ejecuta con LIMIT y tope de filas y bytes; si el resultado
+   es grande, el paso de respuesta recibe un resumen agregado en el
+   servidor (result_governor.py).
+
+Cada pregunta lleva sus métricas por etapa (metrics.py): quedan en
+response["metrics"] y se acumulan en el MetricsRegistry si hay uno.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from langchain_community.chains.graph_qa.cypher import extract_cypher
+
+from chain_setup import ALL_EXAMPLES
+from cypher_examples import DEFAULT_EXAMPLES
+from graph_version import get_graph_version, get_state_version
+from intent_router import route, run_route
+from metrics import QuestionMetrics
+from cypher_cache import parameterize_cypher
+from result_formatter import format_result
+from schema_cache import property_keys, save_schema_cache, schema_property_names
+
+
+class InvalidCypherError(ValueError):
+    """El LLM generó una consulta que no es Cypher válido."""
+
+    def __init__(self, message, query):
+        super().__init__(message)
+        self.query = query
+
+
+def _output_text(output):
+    """
+    Las subcadenas devuelven str (LCEL) o {"text": ...} (LLMChain),
+    según la versión de LangChain.
+    """
+    if isinstance(output, dict):
+        return output.get("text", "")
+    return getattr(output, "content", output)
+
+
+class QAPipeline:
+    def __init__(self, chain, answer_cache, entity_index, cypher_cache, validate_cypher,
+                 format_simple_results=True, llm_limiter=None, metrics=None,
+                 example_store=None, cypher_retries=1, result_governor=None,
+                 graph_snapshot=None, schema_version=None, schema_cache_path=None):
+        self.chain = chain
+        self.graph = chain.graph
+        self.answer_cache = answer_cache
+        self.entity_index = entity_index
+        self.cypher_cache = cypher_cache
+        self.validate_cypher = validate_cypher
+        self.format_simple_results = format_simple_results
+        # Limita las llamadas simultáneas a Ollama (ver request_pool.LLMLimiter)
+        self.llm_limiter = llm_limiter
+        # Acumulado de métricas para Prometheus (ver metrics.MetricsRegistry)
+        self.metrics = metrics
+        # Ejemplos few-shot por pregunta; sin store van todos y el schema completo
+        self.example_store = example_store
+        # Nuevos pedidos al LLM si el Cypher sigue inválido después de repararlo
+        self.cypher_retries = cypher_retries
+        # Límite de filas/bytes y resumen de resultados grandes (ver result_governor.py)
+        self.result_governor = result_governor
+        # Copia en memoria para la ruta rápida; se recarga cuando cambia la versión del grafo
+        self.graph_snapshot = graph_snapshot
+        # Versiones (grafo, estado) del schema cargado (startup.ChainLoader.schema_version)
+        # y claves de propiedades vistas; al releerlo se guarda en schema_cache_path
+        self._schema_versions = (schema_version if schema_version is not None else get_graph_version(), None)
+        self._property_keys = None
+        self.schema_cache_path = schema_cache_path
+        self._schema_lock = threading.Lock()
+        # Contadores por camino ("path:router", ...) y por quién redactó ("answer:llm", ...)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, *keys):
+        with self._stats_lock:
+            self.stats.update(keys)
+
+    @contextmanager
+    def _llm_slot(self, metrics=None):
+        if self.llm_limiter is None:
+            yield
+            return
+        start = time.perf_counter()
+        with self.llm_limiter.slot():
+            if metrics is not None:
+                metrics.add("cola_llm_seg", time.perf_counter() - start)
+            yield
+
+    @staticmethod
+    def _config(metrics, tag):
+        return metrics.config(tag) if metrics is not None else None
+
+    def _close_metrics(self, response):
+        """Cierra las métricas de la pregunta y las suma al registro."""
+        live = response.pop("_metrics", None)
+        if live is None:
+            return
+        response["metrics"] = live.close()
+        if self.metrics is not None:
+            self.metrics.observe(response["metrics"], response["path"])
+
+    # --- Pasos individuales ---
+
+    def cypher_prompt_inputs(self, question, question_template=None, entities=None):
+        """
+        Variables del prompt Cypher: ejemplos y schema. Devuelve (inputs, ejemplos).
+        """
+        if self.example_store is None:
+            inputs = {"examples": ALL_EXAMPLES, "schema": self.chain.graph_schema}
+            examples = len(DEFAULT_EXAMPLES)
+        else:
+            inputs, examples = self.example_store.prompt_inputs(
+                question,
+                self.graph.get_structured_schema,
+                question_template,
+                entities,
+                full_schema=self.chain.graph_schema,
+            )
+        inputs["question"] = question
+        return inputs, examples
+
+    def generate_cypher(self, question, metrics=None, question_template=None, entities=None,
+                        rejected=None):
+        """
+        Primera llamada al LLM: pregunta -> Cypher. rejected = (cypher, error)
+        de un intento anterior que no pasó la validación.
+        """
+        inputs, examples = self.cypher_prompt_inputs(question, question_template, entities)
+        if rejected is not None:
+            inputs["question"] += (
+                f"\n(The previous query was rejected: {rejected[1]} Query: {' '.join(rejected[0].split())}. "
+                "Write a corrected query.)"
+            )
+        if metrics is not None:
+            metrics.add("cypher_ejemplos", examples)
+        with self._llm_slot(metrics):
+            output = self.chain.cypher_generation_chain.invoke(
+                inputs,
+                config=self._config(metrics, "dt:cypher"),
+            )
+        return extract_cypher(_output_text(output))
+
+    def execute_cypher(self, cypher, params=None, metrics=None):
+        """
+        Ejecuta la consulta y recorta el contexto como lo hace la cadena.
+        Con result_governor la consulta lleva LIMIT, las filas se leen con
+        tope y un resultado grande llega como resumen agregado.
+        """
+        start = time.perf_counter()
+        if self.result_governor is not None:
+            rows = self.result_governor.run(self.graph, cypher, params, metrics)
+        else:
+            rows = self.graph.query(cypher, params=params or {})
+            if metrics is not None:
+                metrics.add("neo4j_filas", len(rows))
+        if metrics is not None:
+            metrics.add("neo4j_seg", time.perf_counter() - start)
+        return rows[: self.chain.top_k]
+
+    def answer(self, question, context, metrics=None):
+        """Segunda llamada al LLM: resultado de la consulta -> respuesta."""
+        with self._llm_slot(metrics):
+            output = self.chain.qa_chain.invoke(
+                {"question": question, "context": context},
+                config=self._config(metrics, "dt:qa"),
+            )
+        return _output_text(output)
+
+    def route_from_snapshot(self, route_match):
+        """
+        Filas de la intención desde la copia del grafo, o None si no se puede
+        (sin cargar, recargándose o con error): entonces se usa el Cypher.
+        """
+        if self.graph_snapshot is None:
+            return None
+        # La ruta rápida responde cansancio y recomendaciones: también la versión de estado
+        graph_version, state_version = get_graph_version(), get_state_version()
+        try:
+            self.graph_snapshot.ensure_fresh(self.graph, graph_version, state_version)
+            return self.graph_snapshot.run_route(route_match, graph_version, state_version)
+        except Exception:
+            self._count("copia:errores")
+            return None
+
+    def ensure_schema_fresh(self, graph_version, state_version=None):
+        """
+        Relee el schema de Neo4j si cambió la versión del grafo (etiquetas y
+        propiedades nuevas de scouting o de bulk_loader) o si una escritura de
+        estado agregó claves de propiedades (la telemetría con ritmo_cardiaco).
+        Pone al día el schema del prompt Cypher, el validador y el guardado
+        en disco, y descarta las plantillas Cypher generadas con el schema
+        anterior (se sirven sin volver a validarlas).
+        """
+        if (graph_version, state_version) == self._schema_versions:
+            return
+        with self._schema_lock:
+            if (graph_version, state_version) == self._schema_versions:
+                return
+            keys = property_keys(self.graph)
+            stale = graph_version != self._schema_versions[0]
+            if not stale and keys is not None:
+                # Solo escrituras de estado: alcanza con mirar si hay claves nuevas
+                known = self._property_keys
+                if known is None:
+                    known = schema_property_names(self.graph.get_structured_schema)
+                stale = not keys <= known
+            if stale:
+                self.graph.refresh_schema()
+                self.chain.graph_schema = self.graph.get_schema
+                if hasattr(self.validate_cypher, "load"):
+                    self.validate_cypher.load(self.graph.get_structured_schema)
+                if self.cypher_cache is not None:
+                    self.cypher_cache.clear()
+                if self.schema_cache_path:
+                    save_schema_cache(graph_version, self.graph, self.schema_cache_path, keys)
+                self._count("schema:recargas")
+            if keys is not None:
+                self._property_keys = keys
+            self._schema_versions = (graph_version, state_version)
+
+    def check_cypher(self, cypher, metrics=None):
+        """
+        Valida el Cypher generado, reparándolo si el validador sabe hacerlo
+        (cypher_validator.CypherValidator). Devuelve (cypher, error o None).
+        """
+        if hasattr(self.validate_cypher, "repair"):
+            check = self.validate_cypher.repair(cypher)
+            if metrics is not None and check.fixes:
+                metrics.add("cypher_reparaciones", len(check.fixes))
+            if metrics is not None and check.warnings:
+                # Nombres fuera del schema conocido: la consulta se ejecuta igual
+                metrics.add("cypher_avisos", len(check.warnings))
+            return check.query, check.error
+        is_valid, error_msg = self.validate_cypher(cypher)
+        return cypher, None if is_valid else error_msg
+
+    def resolve_cypher(self, question, graph_version, metrics=None):
+        """
+        Obtiene la consulta para la pregunta, reutilizando una plantilla
+        cacheada si ya se generó una para la misma forma de pregunta.
+        Devuelve (cypher, params, desde_plantilla).
+        """
+        self.entity_index.ensure_fresh(self.graph, graph_version)
+        question_template, entities = self.entity_index.link(question)
+        params = {e["param"]: e["nombre"] for e in entities}
+
+        cached = self.cypher_cache.get(question_template)
+        if cached is not None:
+            return cached, params, True
+
+        cypher = self.generate_cypher(question, metrics, question_template, entities)
+        cypher, error_msg = self.check_cypher(cypher, metrics)
+        for _ in range(self.cypher_retries if error_msg else 0):
+            if metrics is not None:
+                metrics.add("cypher_reintentos", 1)
+            cypher = self.generate_cypher(
+                question, metrics, question_template, entities, rejected=(cypher, error_msg),
+            )
+            cypher, error_msg = self.check_cypher(cypher, metrics)
+            if error_msg is None:
+                break
+        if error_msg:
+            raise InvalidCypherError(error_msg, cypher)
+
+        template = parameterize_cypher(cypher, entities) if entities else cypher
+        if template is None:
+            # Algún nombre no aparece literal en la consulta: no es reutilizable
+            return cypher, {}, False
+        self.cypher_cache.put(question_template, template)
+        return template, params, False
+
+    def stream_answer(self, question, context, metrics=None):
+        """
+        Igual que answer(), pero devuelve los tokens a medida que el LLM
+        los genera (para st.write_stream). El turno del LLM se ocupa mientras
+        se lee: quien deja de leer antes del final tiene que llamar a close()
+        para liberarlo (contextlib.closing).
+        """
+        with self._llm_slot(metrics):
+            stream = self.chain.qa_chain.stream(
+                {"question": question, "context": context},
+                config=self._config(metrics, "dt:qa"),
+            )
+            try:
+                for chunk in stream:
+                    text = _output_text(chunk)
+                    if text:
+                        yield text
+            finally:
+                # Cortar también la generación del LLM, no solo la lectura
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+
+    # --- Pipeline completo ---
+
+    def prepare(self, question):
+        """
+        Ejecuta todo menos la redacción de la respuesta con el LLM.
+
+        Devuelve un dict con:
+        result, intermediate_steps ({"query", "context", "params"}),
+        path ("router", "cache", "template" o "llm"), intent, graph_version
+        y answered_by ("router", "formatter", "llm" o None si falta).
+        Si result es None, falta la respuesta: answer()/stream_answer()
+        con el contexto y response["_metrics"], y luego finish().
+        """
+        metrics = QuestionMetrics()
+        try:
+            return self._prepare(question, metrics)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.observe_error()
+            raise
+
+    def _prepare(self, question, metrics):
+        # 1. Ruta rápida
+        route_match = route(question)
+        if route_match:
+            with metrics.measure("neo4j"):
+                rows = self.route_from_snapshot(route_match)
+                if rows is not None:
+                    result_text = route_match.format(rows)
+                    metrics.add("neo4j_copia", 1)
+                else:
+                    result_text, rows = run_route(self.graph, route_match)
+            metrics.add("neo4j_filas", len(rows))
+            if rows or not route_match.params:
+                response = {
+                    "result": result_text,
+                    "intermediate_steps": {
+                        "query": route_match.cypher,
+                        "context": rows,
+                        "params": route_match.params,
+                    },
+                    "path": "router",
+                    "intent": route_match.intent.name,
+                    "graph_version": None,
+                    "answered_by": "router",
+                    "_metrics": metrics,
+                }
+                self._count("path:router", "answer:router")
+                self._close_metrics(response)
+                return response
+            # El patrón capturó algo que no es una entidad del grafo
+            # ("cansancio de todos los jugadores"): sigue por la cadena
+            self._count("router:sin_filas")
+
+        # 2. Caché de respuestas
+        graph_version = get_graph_version()
+        state_version = get_state_version()
+        cached = self.answer_cache.get(question, graph_version, state_version)
+        if cached is not None:
+            self._count("path:cache")
+            response = dict(cached, path="cache", _metrics=metrics)
+            self._close_metrics(response)
+            return response
+
+        # 3/4. Cypher (plantilla cacheada o generada) y ejecución
+        self.ensure_schema_fresh(graph_version, state_version)
+        cypher, params, from_template = self.resolve_cypher(question, graph_version, metrics)
+        context = self.execute_cypher(cypher, params, metrics)
+        response = {
+            "result": None,
+            "intermediate_steps": {"query": cypher, "context": context, "params": params},
+            "path": "template" if from_template else "llm",
+            "intent": None,
+            "graph_version": graph_version,
+            "state_version": state_version,
+            "answered_by": None,
+            "_metrics": metrics,
+        }
+        self._count(f"path:{response['path']}")
+
+        # 5. Resultados simples: respuesta por plantilla, sin segunda llamada al LLM
+        if self.format_simple_results:
+            formatted = format_result(context)
+            if formatted is not None:
+                response["result"] = formatted
+                response["answered_by"] = "formatter"
+                self.finish(question, response)
+        return response
+
+    def finish(self, question, response):
+        """
+        Guarda en el caché una respuesta redactada para una consulta generada
+        y cierra sus métricas.
+        """
+        self._close_metrics(response)
+        if response["path"] in ("llm", "template") and response["result"] is not None:
+            if response["answered_by"] is None:
+                response["answered_by"] = "llm"
+            self._count(f"answer:{response['answered_by']}")
+            self.answer_cache.put(
+                question, response["graph_version"], response, response.get("state_version"),
+            )
+        return response
+
+    def run(self, question):
+        """
+        Responde la pregunta de punta a punta (sin streaming).
+        """
+        response = self.prepare(question)
+        if response["result"] is None:
+            context = response["intermediate_steps"]["context"]
+            response["result"] = self.answer(question, context, response.get("_metrics"))
+            self.finish(question, response)
+        return response
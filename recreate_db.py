@@ -1,85 +1,22 @@
-from neo4j import GraphDatabase
+from bulk_loader import clear_graph, load_all
+from connections import close_all, get_driver, get_settings, with_retry
 
-driver = GraphDatabase.driver('neo4j://127.0.0.1:7687', auth=('neo4j', 'neo4j123'))
+# Misma configuración que la app (conexiones.json o NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD)
+settings = get_settings()
+driver = get_driver(settings)
+with_retry(driver.verify_connectivity)
 
-with driver.session() as session:
-    print("=== LIMPIANDO Y RECREANDO BASE DE DATOS ===\n")
-    
-    # Limpiar todo
-    session.run('MATCH (n) DETACH DELETE n')
-    print("✓ Base de datos limpiada")
-    
-    # Crear jugadores
-    session.run("CREATE (j1:Jugador {nombre: 'Martinez', rol: 'Comun'})")
-    session.run("CREATE (j2:Jugador {nombre: 'Gomez', rol: 'Capitan'})")
-    session.run("CREATE (j3:Jugador {nombre: 'Perez', rol: 'Comun'})")
-    print("✓ Jugadores creados")
-    
-    # Crear estados físicos
-    session.run("CREATE (ef1:EstadoFisico {cansancio: 75, riesgoLesion: 60, minuto: 75})")
-    session.run("CREATE (ef2:EstadoFisico {cansancio: 30, riesgoLesion: 10, minuto: 75})")
-    session.run("CREATE (ef3:EstadoFisico {cansancio: 50, riesgoLesion: 20, minuto: 75})")
-    print("✓ Estados físicos creados")
-    
-    # Crear recomendaciones
-    session.run("CREATE (r1:Recomendacion {accion: 'Sustitucion inmediata', confianza: 0.75})")
-    session.run("CREATE (r2:Recomendacion {accion: 'Mantener', confianza: 0.90})")
-    session.run("CREATE (r3:Recomendacion {accion: 'Mantener con esfuerzo', confianza: 0.60})")
-    print("✓ Recomendaciones creadas")
-    
-    # Crear partido y rival
-    session.run("CREATE (p1:Partido {id: 'P01', resultado: 'Perdiendo 0-1', minuto: 75})")
-    session.run("CREATE (riv1:Rival {nombre: 'Los Primos', intensidad: 'Alta'})")
-    print("✓ Partido y rival creados")
-    
-    # Crear relaciones Jugador -> Estado -> Recomendacion (CON LOS NOMBRES CORRECTOS)
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Martinez'}), (ef:EstadoFisico {cansancio: 75})
-        CREATE (j)-[:TIENE_ESTADO]->(ef)
-    ''')
-    session.run('''
-        MATCH (ef:EstadoFisico {cansancio: 75}), (r:Recomendacion {accion: 'Sustitucion inmediata'})
-        CREATE (ef)-[:GENERA_RECOMENDACION]->(r)
-    ''')
-    
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Gomez'}), (ef:EstadoFisico {cansancio: 30})
-        CREATE (j)-[:TIENE_ESTADO]->(ef)
-    ''')
-    session.run('''
-        MATCH (ef:EstadoFisico {cansancio: 30}), (r:Recomendacion {accion: 'Mantener'})
-        CREATE (ef)-[:GENERA_RECOMENDACION]->(r)
-    ''')
-    
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Perez'}), (ef:EstadoFisico {cansancio: 50})
-        CREATE (j)-[:TIENE_ESTADO]->(ef)
-    ''')
-    session.run('''
-        MATCH (ef:EstadoFisico {cansancio: 50}), (r:Recomendacion {accion: 'Mantener con esfuerzo'})
-        CREATE (ef)-[:GENERA_RECOMENDACION]->(r)
-    ''')
-    print("✓ Relaciones Jugador->Estado->Recomendacion creadas")
-    
-    # Crear relaciones de partido
-    session.run('''
-        MATCH (p:Partido {id: 'P01'}), (riv:Rival {nombre: 'Los Primos'})
-        CREATE (p)-[:ENFRENTA]->(riv)
-    ''')
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Martinez'}), (p:Partido {id: 'P01'})
-        CREATE (j)-[:JUEGA_EN]->(p)
-    ''')
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Gomez'}), (p:Partido {id: 'P01'})
-        CREATE (j)-[:JUEGA_EN]->(p)
-    ''')
-    session.run('''
-        MATCH (j:Jugador {nombre: 'Perez'}), (p:Partido {id: 'P01'})
-        CREATE (j)-[:JUEGA_EN]->(p)
-    ''')
-    print("✓ Relaciones de partido creadas")
-    
+print("=== LIMPIANDO Y RECREANDO BASE DE DATOS ===\n")
+
+# Limpiar todo
+clear_graph(driver, database=settings.neo4j_database)
+print("✓ Base de datos limpiada")
+
+# Cargar jugadores, rivales, partidos, estados físicos y recomendaciones desde data/
+# (carga masiva con UNWIND; también aumenta la versión del grafo para invalidar los cachés de la app)
+load_all(driver, database=settings.neo4j_database)
+
+with driver.session(database=settings.neo4j_database) as session:
     # Verificar Martinez
     print("\n=== VERIFICACIÓN DE MARTINEZ ===")
     result = session.run('''
@@ -93,7 +30,7 @@ with driver.session() as session:
         print(f"Riesgo de lesión: {record['e.riesgoLesion']}")
         print(f"Recomendación: {record['r.accion']}")
 
-driver.close()
+close_all()
 print("\n✅ Base de datos configurada correctamente!")
 print("\nAhora puedes probar tu aplicación preguntando:")
 print("  - ¿Cuál es el cansancio de Martinez?")
@@ -0,0 +1,229 @@
+"""
+Clasificador de categoría de los reportes de scouting.
+
+Se entrena con dataset.csv (explicacion -> categoria): Rendimiento_Positivo,
+Razón_Defensiva, Razón_Ofensiva, Errores_Clave, ...
+
+- Features: n-gramas de palabras (1-2) y de caracteres (3-5) con hashing,
+  así no hay vocabulario que guardar ni que recalcular al crecer el dataset.
+- Modelo: lineal (SGDClassifier con pérdida logística), predice por lotes
+  con una sola multiplicación de matriz rala.
+- El modelo entrenado se guarda en disco (joblib) junto con la firma del
+  dataset; solo se reentrena si dataset.csv cambió.
+
+Uso:
+    python3 report_classifier.py train
+    python3 report_classifier.py eval
+    python3 report_classifier.py predict reportes.csv --output categorias.csv
+"""
+import argparse
+import csv
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import make_pipeline, make_union
+from sklearn.feature_extraction.text import HashingVectorizer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_CSV = os.path.join(BASE_DIR, "dataset.csv")
+MODEL_FILE = os.environ.get(
+    "DT_CLASSIFIER_FILE",
+    os.path.join(BASE_DIR, "clasificador_categoria.joblib"),
+)
+DEFAULT_BATCH_SIZE = 4096
+HASH_FEATURES = 2 ** 16
+
+
+def _dataset_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def build_model(seed=0):
+    """
+    Hashing de n-gramas de palabras y caracteres + modelo lineal.
+    """
+    features = make_union(
+        HashingVectorizer(
+            analyzer="word", ngram_range=(1, 2), n_features=HASH_FEATURES,
+            strip_accents="unicode", alternate_sign=False, norm="l2",
+        ),
+        HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), n_features=HASH_FEATURES,
+            strip_accents="unicode", alternate_sign=False, norm="l2",
+        ),
+    )
+    classifier = SGDClassifier(
+        loss="log_loss", alpha=1e-4, max_iter=50, tol=None, random_state=seed,
+    )
+    return make_pipeline(features, classifier)
+
+
+def read_dataset(path=DATASET_CSV):
+    df = pd.read_csv(path, usecols=["explicacion", "categoria"]).dropna()
+    return df["explicacion"].astype(str).tolist(), df["categoria"].astype(str).tolist()
+
+
+class CategoryClassifier:
+    """
+    Modelo entrenado más la firma del dataset con que se entrenó.
+    """
+
+    def __init__(self, model, signature=None):
+        self.model = model
+        self.signature = signature
+
+    @classmethod
+    def train(cls, texts, labels, signature=None):
+        model = build_model()
+        model.fit(texts, labels)
+        return cls(model, signature)
+
+    @classmethod
+    def train_from_csv(cls, path=DATASET_CSV):
+        texts, labels = read_dataset(path)
+        return cls.train(texts, labels, _dataset_signature(path))
+
+    @property
+    def categories(self):
+        return list(self.model.classes_)
+
+    def predict(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Devuelve [(categoria, confianza), ...] en el orden de los textos.
+        """
+        results = []
+        for start in range(0, len(texts), batch_size):
+            batch = [t or "" for t in texts[start:start + batch_size]]
+            probabilities = self.model.predict_proba(batch)
+            best = probabilities.argmax(axis=1)
+            results.extend(
+                (str(self.model.classes_[i]), float(probabilities[row, i]))
+                for row, i in enumerate(best)
+            )
+        return results
+
+    def predict_one(self, text):
+        return self.predict([text])[0]
+
+    def save(self, path=MODEL_FILE):
+        tmp_path = path + ".tmp"
+        joblib.dump({"model": self.model, "signature": self.signature}, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        data = joblib.load(path)
+        return cls(data["model"], data.get("signature"))
+
+
+def load_or_train(dataset_path=DATASET_CSV, model_path=MODEL_FILE):
+    """
+    Carga el modelo guardado; lo entrena (y guarda) solo si no existe o si
+    dataset.csv cambió desde el último entrenamiento.
+    """
+    signature = _dataset_signature(dataset_path)
+    if os.path.exists(model_path):
+        try:
+            classifier = CategoryClassifier.load(model_path)
+            if classifier.signature == signature:
+                return classifier
+        except Exception:
+            pass
+    classifier = CategoryClassifier.train_from_csv(dataset_path)
+    classifier.save(model_path)
+    return classifier
+
+
+# --- Evaluación ---
+
+def evaluate(dataset_path=DATASET_CSV, folds=5, throughput_texts=20000, seed=0):
+    """
+    Exactitud con validación cruzada estratificada y velocidad de predicción.
+    """
+    texts, labels = read_dataset(dataset_path)
+    texts_arr = np.array(texts, dtype=object)
+    labels_arr = np.array(labels, dtype=object)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+
+    correct = 0
+    per_class = {}
+    for train_idx, test_idx in splitter.split(texts_arr, labels_arr):
+        classifier = CategoryClassifier.train(list(texts_arr[train_idx]), list(labels_arr[train_idx]))
+        predicted = [c for c, _ in classifier.predict(list(texts_arr[test_idx]))]
+        for truth, guess in zip(labels_arr[test_idx], predicted):
+            hits, total = per_class.get(truth, (0, 0))
+            per_class[truth] = (hits + (truth == guess), total + 1)
+            correct += truth == guess
+
+    classifier = CategoryClassifier.train(texts, labels)
+    batch = (texts * (throughput_texts // len(texts) + 1))[:throughput_texts]
+    start = time.perf_counter()
+    classifier.predict(batch)
+    seconds = time.perf_counter() - start
+
+    return {
+        "ejemplos": len(texts),
+        "folds": folds,
+        "exactitud": correct / len(texts),
+        "exactitud_por_categoria": {k: hits / total for k, (hits, total) in sorted(per_class.items())},
+        "textos_prediccion": len(batch),
+        "textos_por_seg": len(batch) / seconds if seconds else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificador de categoría de reportes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Entrenar y guardar el modelo")
+    train.add_argument("--dataset", default=DATASET_CSV)
+    train.add_argument("--model", default=MODEL_FILE)
+    ev = sub.add_parser("eval", help="Exactitud (validación cruzada) y velocidad")
+    ev.add_argument("--dataset", default=DATASET_CSV)
+    ev.add_argument("--folds", type=int, default=5)
+    ev.add_argument("--texts", type=int, default=20000, help="Textos para medir la velocidad")
+    pred = sub.add_parser("predict", help="Clasificar un archivo de reportes")
+    pred.add_argument("path", help="Archivo .csv, .jsonl o .txt (ver scouting.read_reports)")
+    pred.add_argument("--output", help="CSV de salida (por defecto, pantalla)")
+    pred.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        start = time.perf_counter()
+        classifier = CategoryClassifier.train_from_csv(args.dataset)
+        classifier.save(args.model)
+        print(f"✓ Modelo entrenado en {time.perf_counter() - start:.2f}s → {args.model}")
+        print(f"  Categorías: {', '.join(classifier.categories)}")
+    elif args.command == "eval":
+        result = evaluate(args.dataset, args.folds, args.texts)
+        print(f"Exactitud ({result['folds']} folds, {result['ejemplos']} ejemplos): {result['exactitud']:.1%}")
+        for categoria, accuracy in result["exactitud_por_categoria"].items():
+            print(f"  {categoria}: {accuracy:.1%}")
+        print(f"Velocidad: {result['textos_por_seg']:,.0f} textos/seg ({result['textos_prediccion']} textos)")
+    else:
+        from scouting import read_reports
+
+        texts = read_reports(args.path)
+        classifier = load_or_train()
+        start = time.perf_counter()
+        predictions = classifier.predict(texts, args.batch_size)
+        seconds = time.perf_counter() - start
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["reporte", "categoria", "confianza"])
+                for text, (categoria, confianza) in zip(texts, predictions):
+                    writer.writerow([text, categoria, f"{confianza:.3f}"])
+            print(f"✓ {len(texts)} reportes clasificados en {seconds:.2f}s → {args.output}")
+        else:
+            for text, (categoria, confianza) in zip(texts, predictions):
+                print(f"{categoria} ({confianza:.0%}): {text[:80]}")
+
+
+if __name__ == "__main__":
+    main()
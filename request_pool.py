@@ -0,0 +1,211 @@
+"""
+Ejecución compartida de preguntas entre sesiones.
+
+Varias personas usan la misma app a la vez y todas comparten el servidor de
+Ollama. Este módulo agrega:
+
+- LLMLimiter: semáforo FIFO que limita cuántas llamadas a Ollama corren a la
+  vez y sabe en qué posición de la fila está cada una.
+- RequestPool: pool de hilos que ejecuta el pipeline fuera del hilo del
+  script. Si dos sesiones hacen la misma pregunta al mismo tiempo, se
+  ejecuta una sola vez y ambas reciben el resultado. Con stage="prepare" lo
+  compartido es la preparación (ruta rápida, caché, Cypher y consulta): si
+  falta redactar la respuesta, cada sesión hace su propia llamada al LLM.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_cache import normalize_question
+
+_current = threading.local()
+
+
+class LLMLimiter:
+    """
+    Limita las llamadas concurrentes al LLM, atendiendo en orden de llegada.
+    """
+
+    def __init__(self, max_concurrent=1):
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+        # Duración promedio (media móvil) de una llamada, para estimar esperas
+        self.avg_seconds = None
+
+    def acquire(self):
+        ticket = getattr(_current, "job", None) or object()
+        with self._cond:
+            self._waiting.append(ticket)
+            while self._waiting[0] is not ticket or self._active >= self.max_concurrent:
+                self._cond.wait()
+            self._waiting.popleft()
+            self._active += 1
+            # Puede haber lugar para el siguiente de la fila
+            self._cond.notify_all()
+        return time.perf_counter()
+
+    def release(self, started_at):
+        elapsed = time.perf_counter() - started_at
+        with self._cond:
+            self._active -= 1
+            if self.avg_seconds is None:
+                self.avg_seconds = elapsed
+            else:
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+            self._cond.notify_all()
+
+    def slot(self):
+        return _LLMSlot(self)
+
+    def position(self, ticket):
+        """Cuántas llamadas esperan delante (None si no está en la fila)."""
+        with self._cond:
+            for index, waiting in enumerate(self._waiting):
+                if waiting is ticket:
+                    return index
+        return None
+
+    @property
+    def queued(self):
+        return len(self._waiting)
+
+    @property
+    def active(self):
+        return self._active
+
+
+class _LLMSlot:
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def __enter__(self):
+        self._started_at = self.limiter.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.limiter.release(self._started_at)
+        return False
+
+
+class Job:
+    """
+    Una pregunta enviada al pool (posiblemente compartida por varias sesiones).
+    """
+
+    def __init__(self, key, stage):
+        self.key = key
+        self.stage = stage
+        self.future = None
+        self.started = False
+        self.waiters = 1
+
+    def done(self):
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        try:
+            self.future.exception(timeout=timeout)
+        except TimeoutError:
+            pass
+
+    def result(self):
+        # Copia: cada sesión completa/modifica su propia respuesta, y con
+        # stage="prepare" mide y cierra su redacción en sus propias métricas
+        # (si no, finish() sumaría al registro las de todas las sesiones)
+        response = dict(self.future.result())
+        if response.get("_metrics") is not None:
+            response["_metrics"] = response["_metrics"].fork()
+        if response.get("metrics") is not None:
+            response["metrics"] = dict(response["metrics"])
+        return response
+
+
+class RequestPool:
+    """
+    Pool de hilos para el pipeline con fusión de preguntas idénticas en vuelo.
+    """
+
+    def __init__(self, pipeline, max_workers=4):
+        self.pipeline = pipeline
+        self.limiter = pipeline.llm_limiter
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dt-pool")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._pending = []
+        self.merged = 0
+
+    def submit(self, question, stage="run"):
+        """
+        Envía la pregunta. stage="prepare" deja la redacción de la respuesta
+        al llamador (streaming), así que solo se fusiona la preparación;
+        stage="run" la resuelve completa y se fusiona todo.
+        """
+        key = (stage, normalize_question(question))
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                job.waiters += 1
+                self.merged += 1
+                return job
+            job = Job(key, stage)
+            self._in_flight[key] = job
+            self._pending.append(job)
+            job.future = self._executor.submit(self._execute, job, question)
+            job.future.add_done_callback(lambda _f, job=job: self._forget(job))
+        return job
+
+    def _execute(self, job, question):
+        with self._lock:
+            job.started = True
+            self._pending.remove(job)
+        _current.job = job
+        try:
+            if job.stage == "prepare":
+                return self.pipeline.prepare(question)
+            return self.pipeline.run(question)
+        finally:
+            _current.job = None
+
+    def _forget(self, job):
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+
+    def status(self, job):
+        """
+        Devuelve (estado, posición, espera_estimada_seg) para mostrar en la UI.
+        estado: "en cola", "esperando al LLM" o "procesando".
+        """
+        avg = self.limiter.avg_seconds if self.limiter else None
+        slots = self.limiter.max_concurrent if self.limiter else 1
+
+        def _eta(position):
+            if avg is None:
+                return None
+            return (position + 1) * avg / slots
+
+        with self._lock:
+            if not job.started:
+                position = self._pending.index(job) if job in self._pending else 0
+                llm_ahead = self.limiter.queued if self.limiter else 0
+                return "en cola", position + llm_ahead, _eta(position + llm_ahead)
+        position = self.limiter.position(job) if self.limiter else None
+        if position is not None:
+            return "esperando al LLM", position, _eta(position)
+        return "procesando", 0, None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+            in_flight = len(self._in_flight)
+        return {
+            "en_cola": pending,
+            "en_vuelo": in_flight,
+            "llm_activas": self.limiter.active if self.limiter else 0,
+            "llm_en_espera": self.limiter.queued if self.limiter else 0,
+            "fusionadas": self.merged,
+        }
@@ -0,0 +1,132 @@
+"""
+Formateador determinístico de resultados.
+
+La segunda llamada al LLM (QA_PROMPT_TEMPLATE) casi siempre reformula
+resultados triviales: un número, una lista corta de nombres o una tabla
+chica. Para esas formas la respuesta se arma con plantillas en español sin
+llamar a Ollama; format_result() devuelve None cuando el resultado es
+complejo y conviene que lo redacte el LLM.
+
+Los resultados que no entraron en el límite llegan resumidos
+(result_governor.py); una lista resumida se responde con el total y la
+muestra.
+"""
+from result_governor import SUMMARY_KEY
+
+# Límites para considerar "simple" un resultado
+MAX_LIST_ITEMS = 20
+MAX_TABLE_ROWS = 8
+MAX_TABLE_COLUMNS = 4
+
+# Nombres legibles para las propiedades del grafo
+PROPERTY_LABELS = {
+    "nombre": "Nombre",
+    "cansancio": "Cansancio",
+    "ritmo_cardiaco": "Ritmo cardíaco",
+    "riesgoLesion": "Riesgo de lesión",
+    "minuto": "Minuto",
+    "accion": "Acción",
+    "confianza": "Confianza",
+    "resultado": "Resultado",
+    "fecha": "Fecha",
+    "intensidad": "Intensidad",
+    "rol": "Rol",
+    "partido_id": "Partido",
+}
+
+
+def _label(column):
+    """'e.cansancio' -> 'Cansancio'; los alias (AS Equipo) se respetan."""
+    prop = column.split(".")[-1]
+    return PROPERTY_LABELS.get(prop, prop.replace("_", " ").capitalize())
+
+
+def _value(value):
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _join(values):
+    values = [_value(v) for v in values]
+    if len(values) <= 1:
+        return "".join(values)
+    return ", ".join(values[:-1]) + " y " + values[-1]
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def result_shape(rows):
+    """
+    Clasifica el resultado: "empty", "scalar", "list", "table", "summary"
+    (lista de una columna recortada) o "complex".
+    """
+    if not rows:
+        return "empty"
+    if len(rows) == 1 and SUMMARY_KEY in rows[0]:
+        summary = rows[0]
+        if "valores_frecuentes" not in summary and result_shape(summary["muestra"]) in ("list", "scalar"):
+            return "summary"
+        return "complex"
+    columns = list(rows[0].keys())
+    if any(list(row.keys()) != columns for row in rows):
+        return "complex"
+    if not all(_is_scalar(v) for row in rows for v in row.values()):
+        # Nodos, relaciones o listas anidadas: mejor que lo redacte el LLM
+        return "complex"
+    if len(columns) == 1:
+        if len(rows) == 1:
+            return "scalar"
+        if len(rows) <= MAX_LIST_ITEMS:
+            return "list"
+        return "complex"
+    if len(rows) <= MAX_TABLE_ROWS and len(columns) <= MAX_TABLE_COLUMNS:
+        return "table"
+    return "complex"
+
+
+def format_result(rows):
+    """
+    Devuelve la respuesta en español para resultados simples,
+    o None si hay que pasarle el resultado al LLM.
+    """
+    shape = result_shape(rows)
+
+    if shape == "empty":
+        return "No encontré información en el grafo para responder esa pregunta."
+
+    if shape == "scalar":
+        column, value = next(iter(rows[0].items()))
+        if value is None:
+            return "No encontré información en el grafo para responder esa pregunta."
+        return f"{_label(column)}: {_value(value)}."
+
+    if shape == "list":
+        column = next(iter(rows[0]))
+        values = []
+        for row in rows:
+            if row[column] is not None and row[column] not in values:
+                values.append(row[column])
+        if not values:
+            return "No encontré información en el grafo para responder esa pregunta."
+        return f"{_label(column)} ({len(values)}): {_join(values)}."
+
+    if shape == "summary":
+        summary = rows[0]
+        column = next(iter(summary["muestra"][0]))
+        values = [row[column] for row in summary["muestra"] if row[column] is not None]
+        return (
+            f"{_label(column)} ({summary[SUMMARY_KEY]} en total, muestro {len(values)}): "
+            f"{_join(values)}."
+        )
+
+    if shape == "table":
+        lines = []
+        for row in rows:
+            parts = [f"{_label(col)}: {_value(val)}" for col, val in row.items() if val is not None]
+            lines.append("- " + " · ".join(parts))
+        return "\n".join(lines)
+
+    return None
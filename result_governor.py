@@ -0,0 +1,267 @@
+"""
+Límite de tamaño para los resultados de las consultas generadas.
+
+Nada acotaba lo que devuelve el Cypher del LLM: "¿qué jugadores hay?" o un
+MATCH (n) RETURN n traían todas las filas de Neo4j y recién después se
+recortaban a top_k. ResultGovernor:
+
+- agrega LIMIT max_rows + 1 al RETURN final (o baja el que ya tiene), así
+  Neo4j no produce más filas de las que se van a usar,
+- lee las filas de a una desde el driver y corta por cantidad y por bytes
+  (JSON), con los textos y listas largas recortados,
+- si el resultado no entra, le pide a Neo4j un resumen agregado de la misma
+  consulta: el total de filas y los valores más frecuentes de las columnas
+  que son propiedades. El paso de respuesta recibe ese resumen con las
+  primeras filas como muestra, en lugar de filas sueltas.
+"""
+import json
+
+from cypher_validator import CypherSyntaxError, CypherValidator, tokenize
+
+DEFAULT_MAX_ROWS = 10
+DEFAULT_MAX_BYTES = 4000
+# Recorte de cada valor (propiedades con textos largos, listas, nodos completos)
+MAX_VALUE_CHARS = 300
+MAX_LIST_ITEMS = 20
+# Resumen: valores más frecuentes por columna y columnas resumidas como máximo
+TOP_VALUES = 5
+MAX_SUMMARY_COLUMNS = 3
+# Clave que marca un contexto resumido (ver result_formatter.py)
+SUMMARY_KEY = "total_resultados"
+
+AGGREGATE_FUNCTIONS = {
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "COLLECT",
+    "STDEV", "STDEVP", "PERCENTILECONT", "PERCENTILEDISC",
+}
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > MAX_VALUE_CHARS:
+        return value[:MAX_VALUE_CHARS] + "…"
+    if isinstance(value, list):
+        return [_clip(v) for v in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, dict):
+        return {k: _clip(v) for k, v in value.items()}
+    return value
+
+
+def _final_return(tokens):
+    """
+    (índice del RETURN final, índice donde terminan sus columnas), o None si
+    no hay RETURN o la consulta es un UNION (el LIMIT solo tomaría la última parte).
+    """
+    depth = 0
+    position = None
+    for k, token in enumerate(tokens):
+        if token.text in ("(", "[", "{"):
+            depth += 1
+        elif token.text in (")", "]", "}"):
+            depth -= 1
+        elif depth == 0 and token.upper == "UNION":
+            return None
+        elif depth == 0 and token.upper == "RETURN":
+            position = k
+    if position is None:
+        return None
+    return position, CypherValidator._clause_end(tokens, position + 1, {"ORDER", "SKIP", "LIMIT"})
+
+
+def _projection_item(query, tokens):
+    """Una columna del RETURN: expresión, nombre de la columna y tipo."""
+    if len(tokens) >= 3 and tokens[-2].upper == "AS":
+        expression, alias = tokens[:-2], tokens[-1].text.strip("`")
+    else:
+        expression, alias = tokens, query[tokens[0].start:tokens[-1].end]
+    return {
+        "expression": query[expression[0].start:expression[-1].end],
+        "alias": alias,
+        "aggregate": any(
+            t.upper in AGGREGATE_FUNCTIONS and i + 1 < len(expression) and expression[i + 1].text == "("
+            for i, t in enumerate(expression)
+        ),
+        # variable.propiedad: tiene sentido contar sus valores
+        "property": len(expression) == 3 and expression[1].text == "." and expression[2].kind == "name",
+    }
+
+
+def projection(query, tokens=None):
+    """
+    (prefijo antes del RETURN final, DISTINCT, columnas) o None si la
+    consulta no se puede resumir.
+    """
+    tokens = tokens if tokens is not None else tokenize(query)
+    found = _final_return(tokens)
+    if found is None:
+        return None
+    position, end = found
+    start = position + 1
+    distinct = start < end and tokens[start].upper == "DISTINCT"
+    if distinct:
+        start += 1
+    items, depth, item_start = [], 0, start
+    for k in range(start, end + 1):
+        if k == end or (depth == 0 and tokens[k].text == ","):
+            if item_start < k:
+                items.append(_projection_item(query, tokens[item_start:k]))
+            item_start = k + 1
+        elif tokens[k].text in ("(", "[", "{"):
+            depth += 1
+        elif tokens[k].text in (")", "]", "}"):
+            depth -= 1
+    return query[:tokens[position].start], distinct, items
+
+
+def _limit_token(tokens):
+    """
+    (hay LIMIT en el RETURN final, token con su valor si es un número) o
+    None si la consulta no tiene un RETURN final al que agregárselo.
+    """
+    found = _final_return(tokens)
+    if found is None:
+        return None
+    k = CypherValidator._clause_end(tokens, found[1], {"LIMIT"})
+    if k == len(tokens):
+        return False, None
+    value = tokens[k + 1] if k + 1 < len(tokens) else None
+    if value is not None and value.kind == "number" and value.text.isdigit():
+        return True, value
+    return True, None
+
+
+def query_limit(query):
+    """El LIMIT numérico del RETURN final, o None."""
+    try:
+        found = _limit_token(tokenize(query))
+    except CypherSyntaxError:
+        return None
+    return int(found[1].text) if found and found[1] is not None else None
+
+
+def limit_query(query, limit):
+    """
+    La consulta con LIMIT limit en el RETURN final. Un LIMIT mayor se baja;
+    uno menor o con parámetro se respeta.
+    """
+    try:
+        tokens = tokenize(query)
+    except CypherSyntaxError:
+        return query
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    found = _limit_token(tokens)
+    if found is None:
+        return query
+    has_limit, value = found
+    if has_limit:
+        if value is not None and int(value.text) > limit:
+            return query[:value.start] + str(limit) + query[value.end:]
+        return query
+    end = tokens[-1].end
+    return f"{query[:end]}\nLIMIT {limit}{query[end:]}"
+
+
+def aggregate_queries(query):
+    """
+    Consultas de resumen de query: {"total": cypher, "<columna>": cypher de
+    sus valores más frecuentes}. Vacío si no se puede resumir.
+    """
+    try:
+        parsed = projection(query)
+    except CypherSyntaxError:
+        return {}
+    if parsed is None or not parsed[2]:
+        return {}
+    prefix, distinct, items = parsed
+    if len(items) == 1 and items[0]["expression"] == "*":
+        return {"total": f"{prefix}RETURN count(*) AS total"}
+    # Mismas filas que la consulta original (agrupadas si tenía agregaciones)
+    columns = ", ".join(f"{item['expression']} AS c{i}" for i, item in enumerate(items))
+    rows = f"{prefix}WITH {'DISTINCT ' if distinct else ''}{columns}"
+    queries = {"total": f"{rows}\nRETURN count(*) AS total"}
+    summarized = [(i, item) for i, item in enumerate(items) if item["property"] and not item["aggregate"]]
+    for i, item in summarized[:MAX_SUMMARY_COLUMNS]:
+        queries[item["alias"]] = (
+            f"{rows}\nWITH c{i} AS valor WHERE valor IS NOT NULL\n"
+            f"RETURN valor, count(*) AS cantidad ORDER BY cantidad DESC, valor LIMIT {TOP_VALUES}"
+        )
+    return queries
+
+
+class ResultGovernor:
+    """
+    Ejecuta las consultas generadas con límite de filas y de bytes.
+    """
+
+    def __init__(self, max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES, summarize=True):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.summarize = summarize
+
+    def limit(self, query):
+        # Una fila de más para saber si el resultado quedó recortado
+        return limit_query(query, self.max_rows + 1)
+
+    def _cap(self, records):
+        """(filas que entran, si quedaron filas afuera) leyendo de a una."""
+        rows, size = [], 2
+        for record in records:
+            row = _clip(record)
+            row_size = len(json.dumps(row, ensure_ascii=False, default=str)) + 1
+            if len(rows) == self.max_rows or (rows and size + row_size > self.max_bytes):
+                return rows, True
+            rows.append(row)
+            size += row_size
+        return rows, False
+
+    def fetch(self, graph, query, params=None):
+        """
+        Filas de query con el límite aplicado. Con el grafo compartido
+        (connections.SharedNeo4jGraph) se leen del driver en lotes de
+        max_rows + 1, con sus reintentos, y se deja de leer al llegar al tope.
+        """
+        params = params or {}
+        read = getattr(graph, "read", None)
+        if read is None:
+            # Grafos sin lectura por lotes (benchmark.SyntheticGraph): mismo tope sobre la lista
+            return self._cap(graph.query(query, params=params))
+        return read(query, params, fetch_size=self.max_rows + 1, consume=self._cap)
+
+    def summary(self, graph, query, params, rows):
+        """
+        Contexto resumido para el paso de respuesta: total de filas (del
+        servidor), valores más frecuentes y las filas leídas como muestra.
+        Las consultas de resumen que fallan se omiten.
+        """
+        result = {SUMMARY_KEY: f"más de {len(rows)}", "muestra": rows}
+        frequent = {}
+        for column, aggregate in (aggregate_queries(query) if self.summarize else {}).items():
+            try:
+                values = graph.query(aggregate, params=params or {})
+            except Exception:
+                continue
+            if column == "total":
+                if values:
+                    # Las consultas de resumen no llevan el LIMIT que pidió la original
+                    limit = query_limit(query)
+                    total = values[0]["total"]
+                    result[SUMMARY_KEY] = min(total, limit) if limit is not None else total
+            elif any(v["cantidad"] > 1 for v in values):
+                # Si todos aparecen una vez, no aportan nada sobre la muestra
+                frequent[column] = [{"valor": _clip(v["valor"]), "cantidad": v["cantidad"]} for v in values]
+        if frequent:
+            result["valores_frecuentes"] = frequent
+        return result
+
+    def run(self, graph, query, params=None, metrics=None):
+        """
+        Ejecuta query con los límites. Devuelve el contexto para la
+        respuesta: las filas si entran, o [resumen] si no.
+        """
+        rows, truncated = self.fetch(graph, self.limit(query), params)
+        if metrics is not None:
+            metrics.add("neo4j_filas", len(rows))
+        if not truncated:
+            return rows
+        if metrics is not None:
+            metrics.add("neo4j_recortadas", 1)
+        return [self.summary(graph, query, params, rows)]
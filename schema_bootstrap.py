@@ -0,0 +1,174 @@
+"""
+Constraints e índices del grafo.
+
+Todas las consultas del proyecto buscan nodos por propiedad (Jugador.nombre,
+Rival.nombre, Partido.id, ...) y las generadas por el LLM filtran con
+CONTAINS. Sin índices cada MATCH/MERGE es un escaneo por etiqueta.
+bootstrap_schema() crea todo con IF NOT EXISTS, así que se puede correr
+siempre (lo hacen el cargador masivo y el arranque de la app).
+
+Uso:
+    python3 schema_bootstrap.py            # crear constraints e índices
+    python3 schema_bootstrap.py --report   # además, ver qué índices usan las consultas comunes
+"""
+import argparse
+
+from connections import add_neo4j_arguments, close_all, get_driver, settings_from_args
+
+# Claves únicas (cada constraint crea también su índice de rango)
+UNIQUE_CONSTRAINTS = [
+    ("Jugador", "id"),
+    ("EstadoFisico", "id"),
+    ("Recomendacion", "id"),
+    ("Partido", "id"),
+    ("Rival", "nombre"),
+    ("JugadorRival", "nombre"),
+]
+
+# Búsquedas por igualdad que no son únicas
+RANGE_INDEXES = [
+    ("Jugador", "nombre"),
+    ("EstadoFisico", "partido_id"),
+    # Cambios desde la última lectura del tablero de sustituciones
+    ("EstadoFisico", "cambio"),
+    ("Recomendacion", "cambio"),
+]
+
+# Búsquedas con CONTAINS (las que el prompt Cypher le pide usar al modelo)
+TEXT_INDEXES = [
+    ("Jugador", "nombre"),
+    ("Rival", "nombre"),
+    ("JugadorRival", "nombre"),
+    ("Recomendacion", "accion"),
+]
+
+
+def schema_statements():
+    """
+    Sentencias idempotentes para crear constraints e índices.
+    """
+    statements = []
+    for label, prop in UNIQUE_CONSTRAINTS:
+        statements.append(
+            f"CREATE CONSTRAINT {label.lower()}_{prop}_unico IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+        )
+    for label, prop in RANGE_INDEXES:
+        statements.append(
+            f"CREATE INDEX {label.lower()}_{prop}_rango IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.{prop})"
+        )
+    for label, prop in TEXT_INDEXES:
+        statements.append(
+            f"CREATE TEXT INDEX {label.lower()}_{prop}_texto IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.{prop})"
+        )
+    return statements
+
+
+def _driver(target):
+    # Acepta un driver de neo4j o un Neo4jGraph de LangChain
+    return getattr(target, "_driver", target)
+
+
+def _database(target, database):
+    # Con un Neo4jGraph, su base; con un driver, la por defecto del servidor
+    return database or getattr(target, "_database", None)
+
+
+def bootstrap_schema(target, wait=True, database=None):
+    """
+    Crea constraints e índices que falten en database (por defecto, la del
+    grafo). Devuelve la cantidad de sentencias.
+    """
+    driver = _driver(target)
+    statements = schema_statements()
+    with driver.session(database=_database(target, database)) as session:
+        for statement in statements:
+            session.run(statement).consume()
+        if wait:
+            # Que las consultas siguientes ya encuentren los índices en línea
+            session.run("CALL db.awaitIndexes(300)").consume()
+    return len(statements)
+
+
+# --- Reporte de uso de índices ---
+
+def common_queries():
+    """
+    Consultas típicas: las de la ruta rápida y los ejemplos few-shot del prompt.
+    Devuelve una lista de (nombre, cypher, params).
+    """
+    from intent_router import INTENTS
+    from cypher_examples import ExampleStore
+
+    queries = []
+    for intent in INTENTS:
+        params = {name: "x" for name in intent.params}
+        queries.append((f"ruta rápida: {intent.name}", intent.cypher, params))
+
+    for example in ExampleStore.from_file().examples:
+        queries.append((f"few-shot: {example['question']}", example["cypher"], {}))
+    return queries
+
+
+def _walk_plan(plan, operators):
+    operator = plan.get("operatorType", "").split("@")[0]
+    details = plan.get("args", plan.get("arguments", {})).get("Details", "")
+    operators.append((operator, details))
+    for child in plan.get("children", []):
+        _walk_plan(child, operators)
+    return operators
+
+
+def index_usage_report(target, queries=None, database=None):
+    """
+    Corre EXPLAIN sobre cada consulta y devuelve qué índices usa el plan.
+    """
+    driver = _driver(target)
+    report = []
+    with driver.session(database=_database(target, database)) as session:
+        for name, cypher, params in queries or common_queries():
+            summary = session.run("EXPLAIN " + cypher, params).consume()
+            operators = _walk_plan(summary.plan or {}, [])
+            index_ops = [f"{op} ({details})" for op, details in operators if "Index" in op]
+            scans = [op for op, _ in operators if op in ("NodeByLabelScan", "AllNodesScan")]
+            report.append({
+                "consulta": name,
+                "indices": index_ops,
+                "escaneos": scans,
+                "usa_indice": bool(index_ops),
+            })
+    return report
+
+
+def print_report(report):
+    for item in report:
+        status = "✓" if item["usa_indice"] else "⚠️"
+        print(f"{status} {item['consulta']}")
+        for index in item["indices"]:
+            print(f"    índice: {index}")
+        for scan in item["escaneos"]:
+            print(f"    escaneo: {scan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Constraints e índices del grafo")
+    parser.add_argument("--report", action="store_true", help="Mostrar qué índices usan las consultas comunes")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    settings = settings_from_args(args)
+    driver = get_driver(settings)
+    try:
+        count = bootstrap_schema(driver, database=settings.neo4j_database)
+        print(f"✓ {count} constraints/índices verificados")
+        if args.report:
+            print()
+            print_report(index_usage_report(driver, database=settings.neo4j_database))
+    finally:
+        close_all()
+
+
+if __name__ == "__main__":
+    main()
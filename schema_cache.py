@@ -0,0 +1,73 @@
+"""
+Schema del grafo persistido en disco.
+
+Introspeccionar el schema (refresh_schema() de Neo4jGraph) recorre el grafo
+y tarda; el último schema conocido se guarda en .schema_cache.json y se
+reutiliza entre reinicios. Es válido mientras no cambie la versión del grafo
+(graph_version.py) y no aparezcan claves de propiedades nuevas: las
+escrituras de estado (telemetría, motor difuso) solo suben la versión de
+estado, pero pueden agregar una propiedad (ritmo_cardiaco) que el schema
+todavía no tiene. CALL db.propertyKeys() es barato y lo detecta.
+"""
+import json
+import os
+import tempfile
+
+SCHEMA_CACHE_FILE = os.environ.get(
+    "DT_SCHEMA_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".schema_cache.json"),
+)
+
+PROPERTY_KEYS_QUERY = "CALL db.propertyKeys() YIELD propertyKey RETURN propertyKey"
+
+
+def property_keys(graph):
+    """
+    Claves de propiedades que existen en la base, o None si no se pueden leer
+    (entonces el schema se valida solo por la versión del grafo).
+    """
+    try:
+        return {row["propertyKey"] for row in graph.query(PROPERTY_KEYS_QUERY)}
+    except Exception:
+        return None
+
+
+def schema_property_names(structured_schema):
+    """Propiedades de nodos y relaciones que figuran en el schema."""
+    names = set()
+    for key in ("node_props", "rel_props"):
+        for props in (structured_schema or {}).get(key, {}).values():
+            names.update(p["property"] for p in props)
+    return names
+
+
+def load_schema_cache(graph_version, path=SCHEMA_CACHE_FILE, keys=None):
+    """
+    Devuelve el schema guardado si corresponde a esta versión del grafo y,
+    si se pasan las claves de propiedades actuales, si no hay ninguna nueva.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("graph_version") != graph_version:
+        return None
+    if keys is not None and data.get("property_keys") is not None \
+            and not keys <= set(data["property_keys"]):
+        return None
+    return data
+
+
+def save_schema_cache(graph_version, graph, path=SCHEMA_CACHE_FILE, keys=None):
+    data = {
+        "graph_version": graph_version,
+        "property_keys": sorted(keys) if keys is not None else None,
+        "schema": graph.schema,
+        "structured_schema": graph.structured_schema,
+    }
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".schema_cache.")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
@@ -0,0 +1,317 @@
+"""
+Extracción de rivales y jugadores clave de los reportes de scouting y
+escritura en el grafo.
+
+Lo usa el "Procesador de Scouting" de la página 2 (un reporte a la vez o
+carga masiva de archivos) y también se puede correr sin Streamlit:
+
+    python3 scouting.py reportes.csv --batch-size 256 --n-process 2
+
+Los reportes se procesan con nlp.pipe (por lotes y, opcionalmente, en varios
+procesos) y los pares rival/jugador se escriben con UNWIND, una transacción
+por lote.
+"""
+import argparse
+import csv
+import json
+import re
+import time
+from itertools import islice
+
+from graph_version import bump_graph_version
+
+DEFAULT_NLP_BATCH_SIZE = 128
+DEFAULT_WRITE_BATCH_SIZE = 500
+
+# Palabras comunes que NO son nombres de jugadores
+palabras_comunes = {
+    'recomendamos', 'debemos', 'tenemos', 'es', 'son', 'tiene', 'tienen',
+    'juega', 'juegan', 'marca', 'marcan', 'cansa', 'cansan', 'evitar',
+    'presionar', 'defender', 'atacar', 'y', 'o', 'pero', 'si', 'no',
+    'muy', 'poco', 'mucho', 'más', 'menos', 'el', 'la', 'los', 'las',
+    'un', 'una', 'unos', 'unas', 'desde', 'hasta', 'para', 'por', 'con'
+}
+
+# Un rival y sus jugadores clave por fila; todo en una sola consulta
+WRITE_RIVALS_QUERY = (
+    "UNWIND $rows AS row "
+    "MERGE (r:Rival {nombre: row.rival}) "
+    "WITH r, row "
+    "UNWIND row.jugadores AS jugador "
+    "MERGE (j:JugadorRival {nombre: jugador}) "
+    "MERGE (r)-[:TIENE_JUGADOR_CLAVE]->(j)"
+)
+
+
+# --- Extracción ---
+
+def extract_rival_info(entities, text):
+    """
+    Toma las entidades de spaCy y el texto original para extraer información del rival.
+    Estrategia mejorada:
+    1. Buscar nombres de equipos entre comillas
+    2. Buscar nombres de jugadores entre comillas
+    3. Usar entidades de spaCy como respaldo
+
+    Retorna (rival_org, rival_players).
+    """
+    # 1. ESTRATEGIA PRIMARIA: Buscar texto entre comillas
+    quoted_pattern = r"['\"]([^'\"]+)['\"]"
+    quoted_matches = re.findall(quoted_pattern, text)
+    
+    rival_org = None
+    rival_players = []
+    
+    # El primer texto entre comillas después de "Análisis de" o "rival" suele ser el equipo
+    if "Análisis de" in text or "análisis de" in text.lower():
+        team_pattern = r"[Aa]nálisis de ['\"]?([^'\":\n]+)['\"]?"
+        team_match = re.search(team_pattern, text)
+        if team_match:
+            rival_org = team_match.group(1).strip()
+    elif "rival" in text.lower():
+        # Buscar patrón "rival 'Nombre'"
+        rival_pattern = r"rival ['\"]([^'\"]+)['\"]"
+        rival_match = re.search(rival_pattern, text, re.IGNORECASE)
+        if rival_match:
+            rival_org = rival_match.group(1).strip()
+    
+    # Si no encontramos el equipo con patrones, usar la primera entidad ORG
+    if not rival_org:
+        for ent in entities:
+            if ent.label_ == "ORG":
+                rival_org = ent.text
+                break
+    
+    # 2. BUSCAR JUGADORES: Texto entre comillas que parezca nombre de persona
+    for match in quoted_matches:
+        match_clean = match.strip()
+        match_lower = match_clean.lower()
+        
+        # Filtrar:
+        # - No es el nombre del equipo
+        # - Longitud razonable (3-30 caracteres)
+        # - No contiene números
+        # - Primera letra mayúscula
+        # - No es una palabra común
+        # - Máximo 3 palabras (para evitar frases completas)
+        if (match_clean != rival_org and 
+            2 <= len(match_clean) <= 30 and 
+            not any(char.isdigit() for char in match_clean) and
+            match_clean[0].isupper() and
+            match_lower not in palabras_comunes and
+            len(match_clean.split()) <= 3):
+            
+            # Verificar que no sea una palabra común al inicio
+            primera_palabra = match_clean.split()[0].lower()
+            if primera_palabra not in palabras_comunes:
+                rival_players.append(match_clean)
+    
+    # Agregar también las entidades PER de spaCy (son más confiables)
+    for ent in entities:
+        ent_clean = ent.text.strip()
+        ent_lower = ent_clean.lower()
+        
+        # Filtrar palabras comunes incluso si vienen de spaCy
+        if ent_lower in palabras_comunes:
+            continue
+            
+        if ent.label_ == "PER" and ent_clean not in rival_players:
+            rival_players.append(ent_clean)
+        # IMPORTANTE: A veces spaCy marca jugadores como ORG incorrectamente
+        # Si ya tenemos un equipo, otras ORG cortas podrían ser jugadores
+        elif ent.label_ == "ORG" and ent_clean != rival_org and rival_org:
+            # Solo agregar si es un nombre corto (max 3 palabras) y no es palabra común
+            if (len(ent_clean.split()) <= 3 and 
+                ent_clean not in rival_players and
+                ent_lower not in palabras_comunes):
+                rival_players.append(ent_clean)
+
+    return rival_org, rival_players
+
+
+# --- Escritura en Neo4j ---
+
+def _write_rows(tx, rows):
+    tx.run(WRITE_RIVALS_QUERY, rows=rows).consume()
+
+
+def write_rival_players(driver, rows, database=None):
+    """
+    Escribe [{"rival": ..., "jugadores": [...]}, ...] en una sola transacción.
+    No aumenta la versión del grafo: lo hace quien llama, una vez por carga.
+    """
+    with driver.session(database=database) as session:
+        session.execute_write(_write_rows, rows)
+
+
+def update_graph_with_entities(driver, entities, text, database=None):
+    """
+    Extrae el rival y sus jugadores clave de un reporte y los escribe en el grafo.
+    Devuelve un mensaje de estado para mostrar en la página.
+    """
+    rival_org, rival_players = extract_rival_info(entities, text)
+
+    # Si encontramos equipo y al menos un jugador, escribir en Neo4j
+    if rival_org and rival_players:
+        try:
+            write_rival_players(driver, [{"rival": rival_org, "jugadores": rival_players}], database)
+        except Exception as e:
+            return f"❌ Error al escribir en Neo4j: {e}"
+        # El grafo cambió: invalidar respuestas cacheadas en app.py
+        bump_graph_version()
+
+        results = [f"  • {player}" for player in rival_players]
+        result_text = "✅ **Grafo actualizado exitosamente:**\n"
+        result_text += f"**Equipo:** {rival_org}\n"
+        result_text += f"**Jugadores clave:** ({len(rival_players)})\n"
+        result_text += "\n".join(results)
+        return result_text
+    
+    # Mensajes de ayuda si no se encontró información
+    if not rival_org:
+        return "⚠️ No se detectó el nombre del equipo rival. Intenta incluirlo entre comillas, ej: Análisis de 'Los Primos' o rival 'Boca Unidos'"
+    elif not rival_players:
+        return f"⚠️ Se detectó el equipo '{rival_org}' pero no se encontraron jugadores. Incluye nombres entre comillas, ej: 'Martinez'"
+    
+    return "❌ No se encontraron entidades válidas para actualizar el grafo."
+
+
+# --- Carga masiva ---
+
+def read_reports(path):
+    """
+    Lee reportes desde un archivo:
+    - .csv: columna "reporte" (o "texto"/"explicacion"; si no, la primera)
+    - .jsonl: un objeto por línea con "reporte" o "texto"
+    - .txt: reportes separados por una línea en blanco
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            column = next(
+                (c for c in ("reporte", "texto", "explicacion") if c in reader.fieldnames),
+                reader.fieldnames[0],
+            )
+            return [row[column] for row in reader if row.get(column)]
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        return [item.get("reporte") or item.get("texto") for item in items if item.get("reporte") or item.get("texto")]
+    with open(path, encoding="utf-8") as f:
+        blocks = re.split(r"\n\s*\n", f.read())
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def _merge_rows(pairs):
+    """
+    Junta los jugadores de un mismo rival dentro del lote (menos MERGE repetidos).
+    """
+    by_rival = {}
+    for rival, players in pairs:
+        seen = by_rival.setdefault(rival, [])
+        for player in players:
+            if player not in seen:
+                seen.append(player)
+    return [{"rival": rival, "jugadores": players} for rival, players in by_rival.items()]
+
+
+def ingest_reports(nlp, driver, texts, nlp_batch_size=DEFAULT_NLP_BATCH_SIZE,
+                   write_batch_size=DEFAULT_WRITE_BATCH_SIZE, n_process=1, progress=None,
+                   database=None):
+    """
+    Procesa muchos reportes con nlp.pipe y escribe los resultados en lotes.
+
+    progress(procesados, total) se llama después de cada lote escrito.
+    La versión del grafo aumenta una sola vez al final (también si un lote
+    falla después de otros ya escritos), no por lote: cada aumento invalida
+    los cachés de respuestas, las plantillas Cypher y el schema guardado.
+    Devuelve un dict con reportes, reportes_con_datos, rivales, jugadores,
+    segundos y reportes_por_seg.
+    """
+    total = len(texts)
+    # Solo hace falta NER: se apagan los componentes que no se usan
+    disabled = [name for name in nlp.pipe_names if name not in ("tok2vec", "ner")]
+    docs = nlp.pipe(texts, batch_size=nlp_batch_size, n_process=n_process, disable=disabled)
+
+    stats = {"reportes": 0, "reportes_con_datos": 0, "rivales": set(), "jugadores": 0}
+    start = time.perf_counter()
+    try:
+        while True:
+            batch = list(islice(docs, write_batch_size))
+            if not batch:
+                break
+            pairs = []
+            for doc in batch:
+                rival_org, rival_players = extract_rival_info(doc.ents, doc.text)
+                if rival_org and rival_players:
+                    pairs.append((rival_org, rival_players))
+            if pairs:
+                rows = _merge_rows(pairs)
+                write_rival_players(driver, rows, database)
+                stats["reportes_con_datos"] += len(pairs)
+                stats["rivales"].update(row["rival"] for row in rows)
+                stats["jugadores"] += sum(len(row["jugadores"]) for row in rows)
+            stats["reportes"] += len(batch)
+            if progress:
+                progress(stats["reportes"], total)
+    finally:
+        if stats["reportes_con_datos"]:
+            # El grafo cambió: invalidar respuestas cacheadas en app.py
+            bump_graph_version()
+
+    seconds = time.perf_counter() - start
+    stats["rivales"] = len(stats["rivales"])
+    stats["segundos"] = seconds
+    stats["reportes_por_seg"] = stats["reportes"] / seconds if seconds > 0 else float("inf")
+    return stats
+
+
+def main():
+    import spacy
+
+    from connections import add_neo4j_arguments, close_all, get_driver, settings_from_args
+
+    parser = argparse.ArgumentParser(description="Carga masiva de reportes de scouting al grafo")
+    parser.add_argument("archivo", help="Archivo .csv, .jsonl o .txt con los reportes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_NLP_BATCH_SIZE, help="Lote de nlp.pipe")
+    parser.add_argument("--write-batch-size", type=int, default=DEFAULT_WRITE_BATCH_SIZE, help="Reportes por transacción")
+    parser.add_argument("--n-process", type=int, default=1, help="Procesos de spaCy")
+    parser.add_argument("--indexar", action="store_true",
+                        help="Agregar los reportes al índice de reportes similares (report_search.py)")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    texts = read_reports(args.archivo)
+    nlp = spacy.load("es_core_news_md")
+    settings = settings_from_args(args)
+    driver = get_driver(settings)
+
+    def _progress(done, total):
+        print(f"  {done}/{total} reportes", end="\r", flush=True)
+
+    try:
+        stats = ingest_reports(
+            nlp, driver, texts,
+            nlp_batch_size=args.batch_size,
+            write_batch_size=args.write_batch_size,
+            n_process=args.n_process,
+            progress=_progress,
+            database=settings.neo4j_database,
+        )
+    finally:
+        close_all()
+
+    print()
+    print(f"✓ {stats['reportes']} reportes procesados en {stats['segundos']:.2f}s "
+          f"({stats['reportes_por_seg']:,.1f} reportes/s)")
+    print(f"✓ {stats['reportes_con_datos']} con rival y jugadores: "
+          f"{stats['rivales']} rivales, {stats['jugadores']} jugadores clave")
+    if args.indexar:
+        from report_search import open_or_build
+
+        pending = open_or_build().add(texts)
+        print(f"✓ Índice de reportes similares: {pending} reportes nuevos sin compactar")
+
+
+if __name__ == "__main__":
+    main()
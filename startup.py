@@ -0,0 +1,177 @@
+"""
+Arranque en segundo plano de la cadena.
+
+La conexión a Neo4j (con la introspección del schema) y el precalentamiento
+de Ollama corren en hilos separados, así la página se dibuja al instante y
+muestra un estado de "calentando". El último schema conocido se guarda en
+disco (schema_cache.py) y se reutiliza entre reinicios mientras no cambie la
+versión del grafo ni aparezcan propiedades nuevas; con el proceso andando,
+el pipeline lo relee y lo vuelve a guardar.
+El grafo y el modelo salen de connections.py (driver compartido, keep_alive).
+build_pipeline() arma el QAPipeline completo sobre la cadena, igual para el
+chat y para batch_runner.py.
+"""
+import threading
+import time
+
+from answer_cache import AnswerCache
+from chain_setup import build_chain
+from connections import chat_model, get_settings, neo4j_graph
+from cypher_cache import CypherTemplateCache
+from cypher_examples import ExampleStore
+from cypher_validator import CypherValidator
+from entity_index import EntityIndex
+from graph_snapshot import GraphSnapshot
+from graph_version import get_graph_version
+from qa_pipeline import QAPipeline
+from request_pool import LLMLimiter
+from result_governor import ResultGovernor
+from schema_bootstrap import bootstrap_schema
+from schema_cache import SCHEMA_CACHE_FILE, load_schema_cache, property_keys, save_schema_cache
+
+
+# --- Cargador ---
+
+class ChainLoader:
+    """
+    Arma la cadena en segundo plano.
+
+    graph_ready / llm_ready indican qué parte ya está lista; graph_error y
+    llm_error guardan la excepción si algo falló. Las preguntas que no
+    necesitan al LLM (ruta rápida) se pueden responder apenas está el grafo.
+    schema_error guarda un error al crear constraints/índices: no impide
+    usar la app (las consultas funcionan, más lentas sin índices).
+    """
+
+    def __init__(self, ollama_model=None, schema_cache_path=SCHEMA_CACHE_FILE, metrics=None,
+                 settings=None):
+        # Conexiones (connections.ConnectionSettings); ollama_model pisa el modelo configurado
+        self.settings = settings or get_settings()
+        self.ollama_model = ollama_model or self.settings.ollama_model
+        self.schema_cache_path = schema_cache_path
+        # Registro de métricas por etapa (metrics.MetricsRegistry) para el pipeline
+        self.metrics = metrics
+        self.llm = chat_model(self.settings, model=self.ollama_model)
+        self.graph = None
+        self.chain = None
+        self.graph_error = None
+        self.llm_error = None
+        self.schema_error = None
+        self.schema_source = None  # "disco" o "neo4j"
+        # Versión del grafo del schema cargado: el pipeline lo relee si cambia
+        self.schema_version = None
+        self.timings = {}
+        self._graph_done = threading.Event()
+        self._llm_done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._connect_graph, name="arranque-neo4j", daemon=True).start()
+        threading.Thread(target=self._warmup_llm, name="arranque-ollama", daemon=True).start()
+        return self
+
+    def _connect_graph(self):
+        start = time.perf_counter()
+        try:
+            graph = neo4j_graph(self.settings)
+            # Idempotente; sin esperar a que terminen de construirse los índices.
+            # Un error de DDL (permisos, datos duplicados) no bloquea el
+            # arranque: queda en schema_error y app.py lo muestra
+            try:
+                bootstrap_schema(graph, wait=False)
+            except Exception as e:
+                self.schema_error = e
+            graph_version = get_graph_version()
+            keys = property_keys(graph)
+            cached = load_schema_cache(graph_version, self.schema_cache_path, keys)
+            if cached is not None:
+                graph.schema = cached["schema"]
+                graph.structured_schema = cached["structured_schema"]
+                self.schema_source = "disco"
+            else:
+                graph.refresh_schema()
+                save_schema_cache(graph_version, graph, self.schema_cache_path, keys)
+                self.schema_source = "neo4j"
+            self.schema_version = graph_version
+            self.graph = graph
+            self.chain = build_chain(self.llm, graph)
+        except Exception as e:
+            self.graph_error = e
+        finally:
+            self.timings["neo4j"] = time.perf_counter() - start
+            self._graph_done.set()
+
+    def _warmup_llm(self):
+        # La primera llamada obliga a Ollama a cargar el modelo en memoria
+        start = time.perf_counter()
+        try:
+            self.llm.invoke("Hola")
+        except Exception as e:
+            self.llm_error = e
+        finally:
+            self.timings["ollama"] = time.perf_counter() - start
+            self._llm_done.set()
+
+    @property
+    def graph_done(self):
+        return self._graph_done.is_set()
+
+    @property
+    def graph_ready(self):
+        return self._graph_done.is_set() and self.graph_error is None
+
+    @property
+    def llm_done(self):
+        return self._llm_done.is_set()
+
+    @property
+    def llm_ready(self):
+        return self._llm_done.is_set() and self.llm_error is None
+
+    def wait_graph(self, timeout=None):
+        return self._graph_done.wait(timeout)
+
+    def wait_llm(self, timeout=None):
+        return self._llm_done.wait(timeout)
+
+
+# --- Pipeline ---
+
+def build_pipeline(chain, metrics=None, pipeline_class=QAPipeline, answer_cache_max_entries=256,
+                   answer_cache_ttl_seconds=600, cypher_cache_max_entries=512,
+                   format_simple_results=True, ollama_max_concurrency=1, cypher_few_shot_k=3,
+                   cypher_retries=1, result_max_rows=10, result_max_bytes=4000,
+                   use_graph_snapshot=True, schema_version=None, schema_cache_path=None,
+                   **pipeline_kwargs):
+    """
+    QAPipeline con los cachés, la validación, los ejemplos por pregunta, el
+    límite de resultados y la copia del grafo. pipeline_class permite usar
+    una subclase (ver batch_runner.py y benchmark.py); pipeline_kwargs va a
+    su constructor. cypher_few_shot_k=0 manda todos los ejemplos y el schema
+    completo; result_max_rows=0 no limita los resultados. schema_version es
+    la versión del grafo del schema cargado (ChainLoader.schema_version);
+    con schema_cache_path el pipeline guarda ahí el schema que relee.
+    """
+    return pipeline_class(
+        chain,
+        answer_cache=AnswerCache(
+            max_entries=answer_cache_max_entries,
+            ttl_seconds=answer_cache_ttl_seconds,
+        ),
+        entity_index=EntityIndex(),
+        cypher_cache=CypherTemplateCache(max_entries=cypher_cache_max_entries),
+        # Valida contra el schema del grafo y repara los errores comunes
+        validate_cypher=CypherValidator(chain.graph.get_structured_schema),
+        format_simple_results=format_simple_results,
+        llm_limiter=LLMLimiter(max_concurrent=ollama_max_concurrency),
+        metrics=metrics,
+        example_store=ExampleStore.from_file(k=cypher_few_shot_k) if cypher_few_shot_k else None,
+        cypher_retries=cypher_retries,
+        result_governor=(
+            ResultGovernor(max_rows=result_max_rows, max_bytes=result_max_bytes)
+            if result_max_rows else None
+        ),
+        graph_snapshot=GraphSnapshot() if use_graph_snapshot else None,
+        schema_version=schema_version,
+        schema_cache_path=schema_cache_path,
+        **pipeline_kwargs,
+    )
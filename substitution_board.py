@@ -0,0 +1,239 @@
+"""
+Tablero de sustituciones materializado.
+
+"¿Qué jugadores deben ser sustituidos?" es la pregunta que más se hace y
+cada vez recorría TIENE_ESTADO/GENERA_RECOMENDACION para devolver solo los
+nombres. SubstitutionBoard guarda en memoria una fila por jugador con su
+estado actual (cansancio, riesgoLesion, minuto) y su recomendación (acción
+y confianza), ordenada por urgencia:
+
+- se arma con una sola consulta agregada (BOARD_QUERY): el último
+  EstadoFisico de cada jugador con su Recomendacion,
+- los que escriben estados y recomendaciones (telemetry.py, fuzzy_engine.py,
+  bulk_loader.py) marcan cada nodo con cambio = timestamp() del servidor;
+  cuando sube la versión del grafo o la de estado, refresh() relee solo los
+  jugadores con cambios posteriores a la última lectura (índices de rango
+  sobre cambio),
+- si cambia la cantidad de jugadores (borrados, recreate_db.py) o pasan
+  FULL_REFRESH_SECONDS, se rearma completo.
+
+app.py lo muestra en un panel que se refresca solo, sin pasar por el chat.
+
+Uso:
+    python3 substitution_board.py              # tablero actual
+    python3 substitution_board.py --watch 2    # refrescar cada 2 segundos
+"""
+import argparse
+import threading
+import time
+
+# Un jugador sin estados igual aparece (sin datos). El estado actual es el
+# último actualizado por telemetría o, si no tiene, el de minuto más alto.
+_BOARD_RETURN = (
+    "OPTIONAL MATCH (j)-[:TIENE_ESTADO]->(e:EstadoFisico) "
+    "OPTIONAL MATCH (e)-[:GENERA_RECOMENDACION]->(r:Recomendacion) "
+    "WITH j, e, r ORDER BY coalesce(e.actualizado, 0) DESC, coalesce(e.minuto, 0) DESC "
+    "WITH j, collect({e: e, r: r})[0] AS actual "
+    "RETURN j.id AS jugador_id, j.nombre AS jugador, "
+    "actual.e.partido_id AS partido_id, actual.e.minuto AS minuto, "
+    "actual.e.cansancio AS cansancio, actual.e.riesgoLesion AS riesgoLesion, "
+    "actual.r.accion AS accion, actual.r.confianza AS confianza, "
+    "timestamp() AS ahora"
+)
+BOARD_QUERY = "MATCH (j:Jugador) WHERE j.id IS NOT NULL " + _BOARD_RETURN
+# Solo los jugadores con un estado o una recomendación que cambió después de $desde
+CHANGED_BOARD_QUERY = (
+    "CALL { "
+    "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) WHERE e.cambio > $desde RETURN j "
+    "UNION "
+    "MATCH (j:Jugador)-[:TIENE_ESTADO]->(:EstadoFisico)-[:GENERA_RECOMENDACION]->(r:Recomendacion) "
+    "WHERE r.cambio > $desde RETURN j "
+    "} "
+    "WITH j WHERE j.id IS NOT NULL " + _BOARD_RETURN
+)
+COUNT_PLAYERS_QUERY = "MATCH (j:Jugador) WHERE j.id IS NOT NULL RETURN count(j) AS total"
+
+FULL_REFRESH_SECONDS = 300
+# Margen (ms) al pedir cambios: una transacción larga puede confirmar con un
+# timestamp() anterior a la última lectura. Releer filas no cambia nada.
+CHANGE_OVERLAP_MS = 5000
+
+# Orden por urgencia: primero la acción (texto de fuzzy_engine.ACTIONS), después riesgo y cansancio
+ACTION_URGENCY = (("sustitucion", 0), ("esfuerzo", 1))
+NO_ACTION_URGENCY = 3
+
+
+def urgency(row):
+    """Nivel de urgencia de una fila: 0 sustituir, 1 con esfuerzo, 2 mantener, 3 sin datos."""
+    action = (row.get("accion") or "").lower()
+    if not action:
+        return NO_ACTION_URGENCY
+    for text, level in ACTION_URGENCY:
+        if text in action:
+            return level
+    return 2
+
+
+def _sort_key(row):
+    return (
+        urgency(row),
+        -(row.get("riesgoLesion") or 0),
+        -(row.get("cansancio") or 0),
+        -(row.get("confianza") or 0),
+        row.get("jugador") or "",
+    )
+
+
+class SubstitutionBoard:
+    """
+    Una fila por jugador, ordenada por urgencia. Como GraphSnapshot,
+    ensure_fresh() se llama con la versión (del grafo y de estado) y solo
+    consulta Neo4j si cambió; acá además la actualización es por jugador.
+    """
+
+    def __init__(self, full_refresh_seconds=FULL_REFRESH_SECONDS):
+        self.full_refresh_seconds = full_refresh_seconds
+        self._rows = {}
+        self._sorted = None
+        self._since = None
+        self._loaded_at = None
+        self._graph_version = None
+        self._lock = threading.Lock()
+        self.stats = {"completas": 0, "incrementales": 0, "filas_cambiadas": 0}
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    @property
+    def graph_version(self):
+        return self._graph_version
+
+    def _row(self, record):
+        """Fila del tablero; el timestamp() del servidor avanza la marca de cambios."""
+        row = dict(record)
+        now = row.pop("ahora", None)
+        if now is not None:
+            self._since = max(self._since or 0, now - CHANGE_OVERLAP_MS)
+        return row
+
+    def _apply(self, records):
+        """Actualiza las filas leídas. Devuelve los ids de las que cambiaron."""
+        changed = []
+        for record in records:
+            row = self._row(record)
+            if self._rows.get(row["jugador_id"]) != row:
+                self._rows[row["jugador_id"]] = row
+                changed.append(row["jugador_id"])
+        if changed:
+            self._sorted = None
+            self.stats["filas_cambiadas"] += len(changed)
+        return changed
+
+    def load(self, graph, graph_version=None):
+        """Arma el tablero completo (una consulta). Devuelve los ids que cambiaron."""
+        records = graph.query(BOARD_QUERY)
+        with self._lock:
+            previous = self._rows
+            self._rows = {}
+            self._since = None
+            for record in records:
+                row = self._row(record)
+                self._rows[row["jugador_id"]] = row
+            changed = {k for k, row in self._rows.items() if previous.get(k) != row}
+            changed |= set(previous) - set(self._rows)
+            self._sorted = None
+            self.stats["filas_cambiadas"] += len(changed)
+            self._loaded_at = time.monotonic()
+            self._graph_version = graph_version
+            self.stats["completas"] += 1
+        return sorted(changed)
+
+    def refresh(self, graph, graph_version=None):
+        """
+        Relee solo los jugadores con cambios desde la última lectura.
+        Si cambió la cantidad de jugadores, rearma todo.
+        """
+        (count,) = graph.query(COUNT_PLAYERS_QUERY) or [{"total": 0}]
+        if count["total"] != len(self._rows) or self._since is None:
+            return self.load(graph, graph_version)
+        records = graph.query(CHANGED_BOARD_QUERY, params={"desde": self._since})
+        with self._lock:
+            changed = self._apply(records)
+            self._graph_version = graph_version
+            self.stats["incrementales"] += 1
+        return changed
+
+    def ensure_fresh(self, graph, graph_version):
+        """
+        Pone al día el tablero: nada si la versión del grafo no cambió,
+        incremental si cambió, completo al vencer full_refresh_seconds.
+        Devuelve los ids de los jugadores que cambiaron.
+        """
+        expired = self.loaded and time.monotonic() - self._loaded_at > self.full_refresh_seconds
+        if not self.loaded or expired:
+            return self.load(graph, graph_version)
+        if graph_version != self._graph_version:
+            return self.refresh(graph, graph_version)
+        return []
+
+    def rows(self):
+        """Filas ordenadas por urgencia (no modificarlas)."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._rows.values(), key=_sort_key)
+            return self._sorted
+
+    def substitutions(self):
+        """Nombres de los jugadores con recomendación de sustitución."""
+        return [row["jugador"] for row in self.rows() if urgency(row) == 0]
+
+
+def _number(value, digits=1):
+    return f"{value:.{digits}f}" if value is not None else "-"
+
+
+def format_board(rows, changed=()):
+    """Tabla de texto para la consola (* = fila que cambió)."""
+    lines = [f"{'':2} {'Jugador':<20} {'Cansancio':>9} {'Riesgo':>7} {'Min':>4}  {'Recomendación':<24} {'Conf.':>5}"]
+    for row in rows:
+        mark = "*" if row["jugador_id"] in changed else ""
+        lines.append(
+            f"{mark:2} {(row['jugador'] or row['jugador_id'])[:20]:<20} {_number(row['cansancio']):>9} "
+            f"{_number(row['riesgoLesion']):>7} {row['minuto'] if row['minuto'] is not None else '-':>4}  "
+            f"{(row['accion'] or 'sin datos')[:24]:<24} {_number(row['confianza'], 2):>5}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    from connections import add_neo4j_arguments, close_all, neo4j_graph, settings_from_args
+    from graph_version import get_graph_version, get_state_version
+
+    parser = argparse.ArgumentParser(description="Tablero de sustituciones")
+    parser.add_argument("--watch", type=float, help="Refrescar cada N segundos (Ctrl+C para salir)")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    graph = neo4j_graph(settings_from_args(args))
+    board = SubstitutionBoard()
+    try:
+        while True:
+            start = time.perf_counter()
+            changed = board.ensure_fresh(graph, (get_graph_version(), get_state_version()))
+            seconds = time.perf_counter() - start
+            if changed or not args.watch:
+                print(format_board(board.rows(), changed))
+                print(f"✓ {len(board.substitutions())} a sustituir · {len(changed)} filas cambiadas "
+                      f"en {seconds * 1000:.1f} ms · {board.stats}\n")
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Ingesta de telemetría en vivo durante el partido.
+
+Las lecturas por jugador (cansancio, ritmo_cardiaco, riesgoLesion, minuto)
+llegan desde una fuente local (socket TCP, archivo que se va escribiendo o
+repetición de un partido grabado), se agrupan en micro-lotes por tiempo y
+tamaño y se escriben en Neo4j con UNWIND en una transacción por lote. Así
+el chat siempre responde con el último EstadoFisico de cada jugador.
+
+Dentro de un lote solo se conserva la última lectura de cada jugador, así
+que la memoria queda acotada por el tamaño del plantel y no por la
+frecuencia de las lecturas.
+
+Formato de cada lectura (una línea JSON):
+    {"jugador_id": "J01", "partido_id": "P01", "minuto": 76,
+     "cansancio": 77.5, "ritmo_cardiaco": 168, "riesgoLesion": 62, "ts": 1712345678.1}
+
+Uso:
+    python3 telemetry.py --replay data/telemetria_ejemplo.jsonl --speed 5
+    python3 telemetry.py --tail /var/log/gps/lecturas.jsonl
+    python3 telemetry.py --socket 127.0.0.1:9999
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+from graph_version import bump_after_state_write
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_QUEUE = 10000
+
+# Propiedades de EstadoFisico que se actualizan con cada lectura
+READING_FIELDS = {"cansancio": float, "ritmo_cardiaco": float, "riesgoLesion": float, "minuto": int}
+
+# Un EstadoFisico por jugador y partido: se crea la primera vez y luego se actualiza
+# (cambio: marca del servidor que lee substitution_board.py). Devuelve el id de
+# cada estado: los cargados desde data/ tienen el suyo (E01, ...), no el de ON CREATE
+WRITE_READINGS_QUERY = (
+    "UNWIND $rows AS row "
+    "MATCH (j:Jugador {id: row.jugador_id}) "
+    "MERGE (j)-[:TIENE_ESTADO]->(e:EstadoFisico {partido_id: row.partido_id}) "
+    "ON CREATE SET e.id = row.partido_id + '-' + row.jugador_id "
+    "SET e += row.props, e.actualizado = row.ts, e.cambio = timestamp() "
+    "RETURN row.jugador_id AS jugador_id, row.partido_id AS partido_id, e.id AS estado_id"
+)
+
+
+def parse_reading(raw, received_at=None):
+    """
+    Valida y tipa una lectura. Devuelve None si le faltan datos, no es un
+    objeto JSON o algún valor no tiene el tipo esperado ("cansancio": "alto").
+    """
+    if isinstance(raw, (str, bytes)):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None
+    if not isinstance(raw, dict):
+        return None
+    if not raw.get("jugador_id") or not raw.get("partido_id"):
+        return None
+    props = {}
+    try:
+        for field, type_ in READING_FIELDS.items():
+            value = raw.get(field)
+            if value is not None and value != "":
+                props[field] = type_(value)
+        ts = float(raw.get("ts") or received_at or time.time())
+    except (TypeError, ValueError):
+        return None
+    if not props:
+        return None
+    return {
+        "jugador_id": str(raw["jugador_id"]),
+        "partido_id": str(raw["partido_id"]),
+        "props": props,
+        "ts": ts,
+        "recibido": received_at or time.time(),
+    }
+
+
+# --- Fuentes ---
+
+def replay_file(path, speed=1.0, stop_event=None):
+    """
+    Repite un partido grabado respetando los tiempos entre lecturas
+    (speed=10 lo reproduce diez veces más rápido). Las lecturas salen con
+    la hora actual, como si llegaran en vivo. Las líneas que no son un
+    objeto JSON salen tal cual, para que submit() las cuente como descartadas.
+    """
+    previous_ts = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if stop_event is not None and stop_event.is_set():
+                return
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                raw = None
+            if not isinstance(raw, dict):
+                yield line
+                continue
+            try:
+                ts = float(raw["ts"]) if raw.get("ts") is not None else None
+            except (TypeError, ValueError):
+                ts = None
+            if ts is not None and previous_ts is not None and speed > 0:
+                time.sleep(max(0.0, (ts - previous_ts) / speed))
+            if ts is not None:
+                previous_ts = ts
+            raw["ts"] = time.time()
+            yield raw
+
+
+def tail_file(path, poll_interval=0.2, stop_event=None):
+    """
+    Sigue un archivo JSONL a medida que otro proceso le agrega lecturas.
+    """
+    with open(path, encoding="utf-8") as f:
+        f.seek(0, os.SEEK_END)
+        buffer = ""
+        while stop_event is None or not stop_event.is_set():
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll_interval)
+                continue
+            buffer += chunk
+            if buffer.endswith("\n"):
+                yield buffer
+                buffer = ""
+
+
+def read_socket(host, port, stop_event=None):
+    """
+    Servidor TCP: cada cliente envía lecturas JSON, una por línea.
+    """
+    lines = queue.Queue(maxsize=DEFAULT_MAX_QUEUE)
+
+    def _client(conn):
+        with conn, conn.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                lines.put(line)
+
+    def _accept(server):
+        while stop_event is None or not stop_event.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=_client, args=(conn,), daemon=True).start()
+
+    server = socket.create_server((host, port))
+    server.settimeout(0.5)
+    threading.Thread(target=_accept, args=(server,), daemon=True).start()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            try:
+                yield lines.get(timeout=0.5)
+            except queue.Empty:
+                continue
+    finally:
+        server.close()
+
+
+# --- Micro-lotes ---
+
+def _write_readings(tx, rows):
+    result = tx.run(WRITE_READINGS_QUERY, rows=rows)
+    written = result.data()
+    return written, result.consume()
+
+
+class TelemetryIngestor:
+    """
+    Recibe lecturas (submit) y las escribe en Neo4j en micro-lotes desde un
+    hilo propio. Un lote se escribe cuando pasa flush_interval segundos o
+    cuando junta max_batch jugadores distintos. Con recompute=True, después
+    de cada lote se recalculan las recomendaciones de los estados escritos
+    (fuzzy_engine.recompute_recommendations).
+
+    Un lote que no se pudo escribir se descarta: last_error guarda el error
+    y stats["errores"] cuenta los lotes perdidos (el hilo sigue andando).
+    """
+
+    def __init__(self, driver, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_batch=DEFAULT_MAX_BATCH, max_queue=DEFAULT_MAX_QUEUE, on_flush=None,
+                 recompute=False, database=None):
+        self.driver = driver
+        self.database = database
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_flush = on_flush
+        self.recompute = recompute
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self.stats = {
+            "recibidas": 0,
+            "descartadas": 0,
+            "errores": 0,
+            "escritas": 0,
+            "lotes": 0,
+            "lag_ultimo_seg": None,
+            "lag_max_seg": 0.0,
+            "escritura_ultimo_seg": None,
+            "en_cola": 0,
+            "recomendaciones_ultimo": None,
+        }
+
+    def submit(self, raw):
+        """
+        Encola una lectura. Si la fila está llena se descarta (y se cuenta):
+        nunca se bloquea a la fuente.
+        """
+        reading = parse_reading(raw, received_at=time.time())
+        if reading is None:
+            self.stats["descartadas"] += 1
+            return False
+        try:
+            self._queue.put_nowait(reading)
+        except queue.Full:
+            self.stats["descartadas"] += 1
+            return False
+        self.stats["recibidas"] += 1
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="telemetria", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        pending = {}
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                reading = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                # Solo importa la última lectura de cada jugador en el partido
+                key = (reading["jugador_id"], reading["partido_id"])
+                previous = pending.get(key)
+                if previous is not None:
+                    reading["props"] = {**previous["props"], **reading["props"]}
+                    reading["recibido"] = min(previous["recibido"], reading["recibido"])
+                pending[key] = reading
+            except queue.Empty:
+                pass
+            if pending and (len(pending) >= self.max_batch or time.monotonic() >= deadline):
+                self._flush(list(pending.values()))
+                pending = {}
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if pending:
+            self._flush(list(pending.values()))
+
+    def _flush(self, readings):
+        rows = [
+            {"jugador_id": r["jugador_id"], "partido_id": r["partido_id"], "props": r["props"], "ts": r["ts"]}
+            for r in readings
+        ]
+        start = time.perf_counter()
+        try:
+            with self.driver.session(database=self.database) as session:
+                written, summary = session.execute_write(_write_readings, rows)
+        except Exception as e:
+            self.last_error = e
+            self.stats["errores"] += 1
+            self.stats["descartadas"] += len(rows)
+            return
+        # Id real de cada estado escrito (para recalcular sus recomendaciones)
+        estado_ids = {(r["jugador_id"], r["partido_id"]): r["estado_id"] for r in written}
+        for row in rows:
+            row["estado_id"] = estado_ids.get((row["jugador_id"], row["partido_id"]))
+        # El chat tiene que responder con el estado nuevo. Un lote que solo
+        # actualiza propiedades sube la versión de estado, no la del grafo:
+        # así no se invalidan el schema, el índice de entidades ni la copia
+        # del grafo una vez por segundo durante el partido
+        bump_after_state_write(getattr(summary, "counters", None))
+
+        now = time.time()
+        lag = max(now - r["recibido"] for r in readings)
+        self.stats["escritas"] += len(rows)
+        self.stats["lotes"] += 1
+        self.stats["lag_ultimo_seg"] = lag
+        self.stats["lag_max_seg"] = max(self.stats["lag_max_seg"], lag)
+        self.stats["escritura_ultimo_seg"] = time.perf_counter() - start
+        self.stats["en_cola"] = self._queue.qsize()
+        if self.recompute:
+            from fuzzy_engine import recompute_recommendations
+
+            ids = sorted({row["estado_id"] for row in rows if row["estado_id"] is not None})
+            self.stats["recomendaciones_ultimo"] = recompute_recommendations(self.driver, ids, self.database)
+        if self.on_flush:
+            self.on_flush(rows, self.stats)
+
+
+def main():
+    from connections import add_neo4j_arguments, close_all, get_driver, settings_from_args
+
+    parser = argparse.ArgumentParser(description="Ingesta de telemetría en vivo")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", help="Repetir un partido grabado (JSONL)")
+    source.add_argument("--tail", help="Seguir un archivo JSONL")
+    source.add_argument("--socket", help="Escuchar en host:puerto")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidad de la repetición")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL, help="Segundos entre lotes")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Jugadores por lote")
+    parser.add_argument("--recomendaciones", action="store_true",
+                        help="Recalcular las recomendaciones (motor difuso) después de cada lote")
+    add_neo4j_arguments(parser)
+    args = parser.parse_args()
+
+    def _report(rows, stats):
+        print(
+            f"✓ lote {stats['lotes']}: {len(rows)} jugadores · "
+            f"lag {stats['lag_ultimo_seg']:.2f}s (máx {stats['lag_max_seg']:.2f}s) · "
+            f"escritura {stats['escritura_ultimo_seg'] * 1000:.0f}ms · "
+            f"en cola {stats['en_cola']} · descartadas {stats['descartadas']}"
+        )
+        result = stats["recomendaciones_ultimo"]
+        if result is not None:
+            print(f"  ↳ {result['estados']} recomendaciones en "
+                  f"{result['inferencia_seg'] * 1000:.3f}ms de inferencia")
+
+    stop_event = threading.Event()
+    if args.replay:
+        readings = replay_file(args.replay, args.speed, stop_event)
+    elif args.tail:
+        readings = tail_file(args.tail, stop_event=stop_event)
+    else:
+        host, port = args.socket.rsplit(":", 1)
+        readings = read_socket(host, int(port), stop_event)
+
+    settings = settings_from_args(args)
+    driver = get_driver(settings)
+    ingestor = TelemetryIngestor(
+        driver,
+        flush_interval=args.flush_interval,
+        max_batch=args.max_batch,
+        on_flush=_report,
+        recompute=args.recomendaciones,
+        database=settings.neo4j_database,
+    ).start()
+    try:
+        for raw in readings:
+            ingestor.submit(raw)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        ingestor.stop()
+        close_all()
+    print(f"\nLecturas: {ingestor.stats['recibidas']} recibidas, "
+          f"{ingestor.stats['escritas']} escritas en {ingestor.stats['lotes']} lotes")
+    if ingestor.last_error is not None:
+        print(f"❌ {ingestor.stats['errores']} lotes sin escribir (último error: {ingestor.last_error})")
+
+
+if __name__ == "__main__":
+    main()
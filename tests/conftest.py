@@ -0,0 +1,20 @@
+"""
+Configuración común de los tests: los módulos del proyecto están en la raíz
+del repositorio y la versión del grafo se guarda en un archivo temporal.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_version  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def version_files(tmp_path, monkeypatch):
+    """Cada test con sus propios archivos de versión (nunca los del repositorio)."""
+    monkeypatch.setattr(graph_version, "VERSION_FILE", str(tmp_path / ".graph_version"))
+    monkeypatch.setattr(graph_version, "STATE_VERSION_FILE", str(tmp_path / ".state_version"))
+    return tmp_path
@@ -0,0 +1,51 @@
+from answer_cache import AnswerCache, normalize_question
+
+STATE_QUERY = "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) RETURN e.cansancio"
+NAMES_QUERY = "MATCH (j:Jugador) RETURN j.nombre"
+
+
+def _response(query, text="respuesta"):
+    return {"result": text, "intermediate_steps": {"query": query}}
+
+
+def test_normalize_question():
+    assert normalize_question("¿Qué jugadores deben ser SUSTITUIDOS?") == "que jugadores deben ser sustituidos"
+    assert normalize_question("  cansancio   de  Pérez ") == "cansancio de perez"
+
+
+def test_hit_for_equivalent_question():
+    cache = AnswerCache()
+    cache.put("¿Qué jugadores hay?", 1, _response(NAMES_QUERY))
+    assert cache.get("que jugadores hay", 1)["result"] == "respuesta"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_graph_version_change_drops_everything():
+    cache = AnswerCache()
+    cache.put("¿Qué jugadores hay?", 1, _response(NAMES_QUERY))
+    assert cache.get("¿Qué jugadores hay?", 2) is None
+    assert len(cache) == 0
+
+
+def test_state_version_only_drops_answers_that_read_state():
+    cache = AnswerCache()
+    cache.put("¿Qué jugadores hay?", 1, _response(NAMES_QUERY), state_version=5)
+    cache.put("¿Qué tan cansado está Perez?", 1, _response(STATE_QUERY), state_version=5)
+    assert cache.get("¿Qué tan cansado está Perez?", 1, state_version=5) is not None
+    assert cache.get("¿Qué jugadores hay?", 1, state_version=6) is not None
+    assert cache.get("¿Qué tan cansado está Perez?", 1, state_version=6) is None
+
+
+def test_ttl_and_lru(monkeypatch):
+    import answer_cache
+
+    now = [100.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", 1, _response(NAMES_QUERY))
+    cache.put("b", 1, _response(NAMES_QUERY))
+    cache.get("a", 1)
+    cache.put("c", 1, _response(NAMES_QUERY))
+    assert cache.get("b", 1) is None
+    now[0] += 11
+    assert cache.get("a", 1) is None
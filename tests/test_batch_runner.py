@@ -0,0 +1,97 @@
+import csv
+import threading
+import types
+
+import pytest
+
+from answer_cache import AnswerCache
+from batch_runner import BatchPipeline, _Writer, expand_templates, read_questions, run_batch
+
+NAMES = {
+    "Jugador": ["Gomez", "Martinez"],
+    "Rival": ["Boca Unidos"],
+}
+
+
+class Graph:
+    get_structured_schema = {}
+
+    def __init__(self):
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def query(self, query, params=None):
+        with self._lock:
+            self.queries.append((query, params))
+        for label, names in NAMES.items():
+            if f"MATCH (n:{label})" in query:
+                return [{"nombre": name} for name in names]
+        return [{"j.nombre": "Martinez", "e.cansancio": 75.0}]
+
+
+class Pipeline(BatchPipeline):
+    # Todas las preguntas generan la misma consulta (con espacios distintos)
+    def resolve_cypher(self, question, graph_version, metrics=None):
+        if "error" in question:
+            raise ValueError("consulta inválida")
+        spaces = " " * (len(question) % 3 + 1)
+        return f"MATCH (j:Jugador)-[:TIENE_ESTADO]->(e){spaces}RETURN j.nombre, e.cansancio", {}, False
+
+
+def _pipeline(graph):
+    chain = types.SimpleNamespace(graph=graph, top_k=10)
+    return Pipeline(chain, AnswerCache(), None, None, validate_cypher=False)
+
+
+def test_read_questions_skips_comments_and_blank_lines(tmp_path):
+    path = tmp_path / "preguntas.txt"
+    path.write_text("# previa\n¿Qué rival sigue?\n\n  # otra\n¿Cómo llega el equipo?\n", encoding="utf-8")
+    assert read_questions(str(path)) == ["¿Qué rival sigue?", "¿Cómo llega el equipo?"]
+
+
+def test_templates_expand_with_every_name_once():
+    graph = Graph()
+    questions = expand_templates(graph, [
+        "¿Cansancio de {jugador} contra {rival}?",
+        "¿Quién marca a {jugador}?",
+    ])
+    assert questions == [
+        "¿Cansancio de Gomez contra Boca Unidos?",
+        "¿Cansancio de Martinez contra Boca Unidos?",
+        "¿Quién marca a Gomez?",
+        "¿Quién marca a Martinez?",
+    ]
+    # Los nombres de cada etiqueta se consultan una sola vez
+    assert len(graph.queries) == 2
+    with pytest.raises(ValueError, match="equipo"):
+        expand_templates(graph, ["¿Cómo juega {equipo}?"])
+
+
+def test_repeated_queries_run_once_and_records_keep_the_order():
+    graph = Graph()
+    pipeline = _pipeline(graph)
+    questions = ["¿Cómo está Martinez?", "¿Cómo llega Martinez?", "¿Martinez aguanta?", "error"]
+
+    records = list(run_batch(pipeline, questions, concurrency=4))
+
+    assert [r["pregunta"] for r in records] == questions
+    assert [r.get("respuesta") for r in records[:3]] == ["- Nombre: Martinez · Cansancio: 75"] * 3
+    assert records[3]["error"] == "ValueError: consulta inválida"
+    assert len([q for q, _ in graph.queries if q.startswith("MATCH")]) == 1
+    assert pipeline.stats["cypher:repetida"] == 2
+
+
+def test_csv_writer_flattens_the_stage_times(tmp_path):
+    path = str(tmp_path / "informe.csv")
+    writer = _Writer(path)
+    writer.write({"pregunta": "¿Quién sigue?", "respuesta": "Boca Unidos", "camino": "router",
+                  "metricas": {"total_seg": 0.123456, "neo4j_seg": 0.01}})
+    writer.write({"pregunta": "error", "error": "ValueError: x"})
+    writer.close()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["total_seg"] == "0.1235"
+    assert rows[0]["qa_llm_seg"] == ""
+    assert rows[0]["camino"] == "router"
+    assert rows[1]["error"] == "ValueError: x"
@@ -0,0 +1,29 @@
+import benchmark
+from graph_snapshot import GraphSnapshot
+from graph_version import get_graph_version, get_state_version
+from intent_router import route, run_route
+
+
+def test_scenario_runs_without_errors():
+    result = benchmark.run_scenario(
+        10, 2, rounds=1, reports=2, cypher_latency=0, answer_latency=0, token_latency=0,
+    )
+    assert result["errores"] == {}
+    assert result["preguntas"] > 0
+    assert result["caminos"]["path:router"] > 0
+    assert result["etapas"]["total"]["n"] == result["preguntas"]
+
+
+def test_snapshot_of_the_synthetic_graph_answers_like_the_graph():
+    graph = benchmark.SyntheticGraph(30)
+    snapshot = GraphSnapshot()
+    snapshot.ensure_fresh(graph, get_graph_version(), get_state_version(), wait=True)
+    nombre = graph.jugadores[3]["Jugador"]["nombre"]
+    for question in (
+        "¿Qué rivales tenemos?",
+        f"¿Cuál es el cansancio de {nombre}?",
+        "¿Qué jugadores deben ser sustituidos?",
+        "¿Contra quién jugamos?",
+    ):
+        match = route(question)
+        assert snapshot.run_route(match) == run_route(graph, match)[1]
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+import bulk_loader
+from bulk_loader import DATASETS, DEFAULT_DATA_DIR, _find_file, batched, read_rows
+from graph_version import get_graph_version
+
+ESTADOS = next(d for d in DATASETS if d["name"] == "estados")
+
+
+def test_read_rows_splits_links_and_typed_props():
+    rows = list(read_rows(_find_file(DEFAULT_DATA_DIR, "estados"), ESTADOS))
+    assert rows[0] == {
+        "id": "E01", "jugador_id": "J01", "partido_id": "P01",
+        "props": {"cansancio": 75.0, "riesgoLesion": 60.0, "minuto": 75},
+    }
+    assert all(isinstance(row["props"]["minuto"], int) for row in rows)
+
+
+def test_read_rows_from_json_and_jsonl(tmp_path):
+    records = [
+        {"id": "E9", "jugador_id": "J9", "partido_id": "P9", "cansancio": "40.5", "minuto": "12.0"},
+        {"id": "E10", "jugador_id": "J10", "partido_id": "", "cansancio": None, "riesgoLesion": 3},
+    ]
+    json_path = tmp_path / "estados.json"
+    json_path.write_text(json.dumps(records), encoding="utf-8")
+    jsonl_path = tmp_path / "estados.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(r) for r in records) + "\n\n", encoding="utf-8")
+
+    for path in (json_path, jsonl_path):
+        rows = list(read_rows(str(path), ESTADOS))
+        assert rows[0]["props"] == {"cansancio": 40.5, "minuto": 12}
+        # Vacíos: enlace None y propiedad omitida
+        assert rows[1]["partido_id"] is None
+        assert rows[1]["props"] == {"riesgoLesion": 3.0}
+
+
+def test_find_file_and_batched(tmp_path):
+    assert _find_file(str(tmp_path), "estados") is None
+    (tmp_path / "estados.jsonl").write_text("", encoding="utf-8")
+    assert _find_file(str(tmp_path), "estados").endswith("estados.jsonl")
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return self
+
+    def consume(self):
+        return None
+
+    def execute_write(self, work, *args):
+        if self.driver.fail_writes:
+            raise RuntimeError("Neo4j se cayó a mitad de la carga")
+        return work(self, *args)
+
+
+class FakeDriver:
+    """Guarda la base de cada sesión; con fail_writes, las escrituras fallan."""
+
+    def __init__(self, fail_writes=False):
+        self.fail_writes = fail_writes
+        self.databases = []
+
+    def session(self, database=None):
+        self.databases.append(database)
+        return FakeSession(self)
+
+
+@pytest.fixture
+def jugadores_dir(tmp_path, monkeypatch):
+    (tmp_path / "jugadores.csv").write_text("id,nombre\nJ01,Martinez\n", encoding="utf-8")
+    monkeypatch.setattr(bulk_loader, "DATASETS", [d for d in DATASETS if d["name"] == "jugadores"])
+    return str(tmp_path)
+
+
+def test_load_all_creates_the_schema_and_loads_into_the_given_database(jugadores_dir):
+    driver = FakeDriver()
+    bulk_loader.load_all(driver, jugadores_dir, verbose=False, database="dt")
+    # Constraints/índices y datos en la misma base
+    assert driver.databases == ["dt", "dt"]
+    assert get_graph_version() == 1
+
+
+def test_a_failed_reload_still_invalidates_the_app_caches(jugadores_dir):
+    driver = FakeDriver(fail_writes=True)
+    bulk_loader.clear_graph(driver)
+    # El grafo ya quedó vacío aunque la carga no llegue a terminar
+    assert get_graph_version() == 1
+    with pytest.raises(RuntimeError):
+        bulk_loader.load_all(driver, jugadores_dir, verbose=False)
+    assert get_graph_version() == 2
@@ -0,0 +1,14 @@
+from benchmark import FakeChatModel, SyntheticGraph
+from chain_setup import build_chain
+
+
+def test_chain_runs_without_selected_examples():
+    cypher = "MATCH (r:Rival) RETURN r.nombre"
+    llm = FakeChatModel(cypher_latency=0, answer_latency=0, token_latency=0, default_cypher=cypher)
+    graph = SyntheticGraph(players=5)
+
+    result = build_chain(llm, graph).invoke({"query": "¿Qué rivales tenemos?"})
+
+    assert result["intermediate_steps"][0]["query"] == cypher
+    assert result["intermediate_steps"][1]["context"]
+    assert result["result"].startswith("Respuesta simulada")
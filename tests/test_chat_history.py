@@ -0,0 +1,54 @@
+import pytest
+
+from chat_history import ChatHistory, ChatStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatStore(str(tmp_path / "chat.sqlite"))
+    yield store
+    store.close()
+
+
+def _fill(store, session, count):
+    for n in range(1, count + 1):
+        store.append(session, {
+            "role": "user" if n % 2 else "assistant",
+            "content": f"mensaje {n}",
+            "intermediate_steps": {"query": "MATCH (j) RETURN j", "context": [{"n": n}]},
+        })
+
+
+def test_window_keeps_only_the_latest_messages(store):
+    _fill(store, "s1", 25)
+    history = ChatHistory(store, "s1", window=10, page_size=5)
+    assert [m["seq"] for m in history.messages()] == list(range(16, 26))
+    assert history.has_older
+    # El Cypher queda en el mensaje liviano; las filas solo con context()
+    message = history.messages()[0]
+    assert message["query"] == "MATCH (j) RETURN j"
+    assert "intermediate_steps" not in message
+    assert history.context(message) == {"context": [{"n": 16}]}
+
+
+def test_load_older_pages_and_fills_gaps(store):
+    _fill(store, "s1", 25)
+    _fill(store, "otra", 3)
+    history = ChatHistory(store, "s1", window=10, page_size=5)
+    assert history.load_older() == 5
+    assert [m["seq"] for m in history.messages()] == list(range(11, 26))
+
+    # Mensajes nuevos corren la ventana: los que salen se leen de nuevo del disco
+    for n in range(3):
+        history.append({"role": "user", "content": f"nuevo {n}"})
+    assert [m["seq"] for m in history.messages()] == list(range(11, 29))
+    while history.has_older:
+        history.load_older()
+    assert [m["seq"] for m in history.messages()] == list(range(1, 29))
+
+
+def test_sessions_are_independent(store):
+    _fill(store, "s1", 4)
+    assert ChatHistory(store, "s2").messages() == []
+    assert not ChatHistory(store, "s2").has_older
+    assert store.count("s1") == 4
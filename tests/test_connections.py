@@ -0,0 +1,108 @@
+import pytest
+from langchain_community.graphs.neo4j_graph import node_properties_query
+from neo4j.exceptions import ServiceUnavailable
+
+import connections
+from connections import ConnectionSettings, SharedNeo4jGraph, pool_stats
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeSession:
+    def __init__(self, driver, kwargs):
+        self.driver = driver
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params):
+        self.driver.sessions.append((query.text, self.kwargs))
+        if self.driver.failures:
+            self.driver.failures -= 1
+            raise ServiceUnavailable("Neo4j reiniciando")
+        return iter(FakeRecord(n=i) for i in range(5))
+
+
+class FakeDriver:
+    """Driver de neo4j mínimo: verify_connectivity, execute_query y session."""
+
+    def __init__(self):
+        self.queries = []
+        self.sessions = []
+        self.failures = 0
+
+    def verify_connectivity(self):
+        pass
+
+    def execute_query(self, query, database_=None, parameters_=None):
+        self.queries.append((query.text, database_))
+        if query.text == node_properties_query:
+            output = {"labels": "Jugador", "properties": [{"property": "nombre", "type": "STRING"}]}
+            return [FakeRecord(output=output)], None, None
+        if query.text.startswith("MATCH (j:Jugador)"):
+            return [FakeRecord(nombre="Pérez")], None, None
+        return [], None, None
+
+    def session(self, **kwargs):
+        return FakeSession(self, kwargs)
+
+
+@pytest.fixture
+def driver(monkeypatch):
+    driver = FakeDriver()
+    monkeypatch.setattr(connections, "get_driver", lambda settings: driver)
+    return driver
+
+
+SETTINGS = ConnectionSettings(neo4j_database="dt", retries=2, backoff_seconds=0)
+
+
+def test_shared_graph_queries_and_reads_the_schema_on_the_shared_driver(driver):
+    graph = SharedNeo4jGraph(SETTINGS, refresh_schema=True)
+    assert graph.structured_schema["node_props"] == {"Jugador": [{"property": "nombre", "type": "STRING"}]}
+    assert "Jugador" in graph.get_schema
+
+    before = pool_stats(SETTINGS)["consultas"]
+    assert graph.query("MATCH (j:Jugador) RETURN j.nombre AS nombre") == [{"nombre": "Pérez"}]
+    assert pool_stats(SETTINGS)["consultas"] == before + 1
+    assert {database for _, database in driver.queries} == {"dt"}
+
+
+def test_batched_reads_are_retried_and_counted(driver):
+    graph = SharedNeo4jGraph(SETTINGS)
+    driver.failures = 1
+    before = pool_stats(SETTINGS)
+
+    rows = graph.read("MATCH (n) RETURN n", fetch_size=3, consume=lambda records: list(records)[:2])
+
+    assert rows == [{"n": 0}, {"n": 1}]
+    assert [kwargs for _, kwargs in driver.sessions] == [{"database": "dt", "fetch_size": 3}] * 2
+    after = pool_stats(SETTINGS)
+    assert after["consultas"] == before["consultas"] + 1
+    assert after["reintentos"] == before["reintentos"] + 1
+
+
+def test_drivers_are_not_shared_across_credentials_or_pool_settings(monkeypatch):
+    created = []
+
+    def _driver(uri, auth, **kwargs):
+        created.append((uri, auth, kwargs["max_connection_pool_size"]))
+        return FakeDriver()
+
+    monkeypatch.setattr(connections.GraphDatabase, "driver", _driver)
+    monkeypatch.setattr(connections, "_drivers", {})
+    settings = ConnectionSettings()
+
+    first = connections.get_driver(settings)
+    assert connections.get_driver(ConnectionSettings()) is first
+    assert connections.get_driver(ConnectionSettings(neo4j_password="otra")) is not first
+    assert connections.get_driver(ConnectionSettings(pool_size=5)) is not first
+    assert [auth[1] for _, auth, _ in created] == ["neo4j123", "otra", "neo4j123"]
+    assert created[-1][2] == 5
@@ -0,0 +1,51 @@
+from cypher_cache import CypherTemplateCache, parameterize_cypher
+from entity_index import EntityIndex
+
+
+def _index():
+    index = EntityIndex()
+    index.add("Martinez", "Jugador")
+    index.add("Martinez", "JugadorRival")
+    index.add("Los Primos", "Rival")
+    return index
+
+
+def test_link_replaces_known_names_by_label_markers():
+    template, entities = _index().link("¿Cuál es el cansancio de MARTÍNEZ?")
+    assert template == "cual es el cansancio de <Jugador|JugadorRival>"
+    assert entities == [{"param": "e0", "nombre": "Martinez", "labels": "Jugador|JugadorRival"}]
+    # Match más largo: "los primos" es una sola entidad; "gomez" no está indexado
+    template, entities = _index().link("jugador clave de los primos y gomez")
+    assert template == "jugador clave de <Rival> y gomez"
+    assert [e["nombre"] for e in entities] == ["Los Primos"]
+
+
+def test_same_shape_questions_share_a_template():
+    index = _index()
+    index.add("Gomez", "Jugador")
+    first, _ = index.link("¿Cuál es el cansancio de Gomez?")
+    assert index.link("cual es el cansancio de gomez")[0] == first
+    assert index.link("¿Cuál es el riesgo de Gomez?")[0] != first
+
+
+def test_parameterize_cypher():
+    entities = [{"param": "e0", "nombre": "Martinez"}]
+    assert parameterize_cypher(
+        "MATCH (j:Jugador {nombre: 'Martinez'}) RETURN j", entities,
+    ) == "MATCH (j:Jugador {nombre: $e0}) RETURN j"
+    assert parameterize_cypher(
+        'MATCH (j:Jugador) WHERE j.nombre CONTAINS "martinez" RETURN j', entities,
+    ) == "MATCH (j:Jugador) WHERE j.nombre CONTAINS $e0 RETURN j"
+    # Si la entidad no aparece como literal, la consulta no es reutilizable
+    assert parameterize_cypher("MATCH (j:Jugador) RETURN j", entities) is None
+
+
+def test_template_cache_is_lru():
+    cache = CypherTemplateCache(max_entries=2)
+    cache.put("a", "MATCH (a) RETURN a")
+    cache.put("b", "MATCH (b) RETURN b")
+    assert cache.get("a") == "MATCH (a) RETURN a"
+    cache.put("c", "MATCH (c) RETURN c")
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
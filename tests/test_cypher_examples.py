@@ -0,0 +1,58 @@
+from cypher_examples import ExampleStore, cypher_shape, example_template
+
+STRUCTURED_SCHEMA = {
+    "node_props": {
+        "Jugador": [{"property": "nombre", "type": "STRING"}],
+        "EstadoFisico": [{"property": "cansancio", "type": "FLOAT"}],
+        "Rival": [{"property": "nombre", "type": "STRING"}],
+    },
+    "rel_props": {},
+    "relationships": [
+        {"start": "Jugador", "type": "TIENE_ESTADO", "end": "EstadoFisico"},
+    ],
+}
+
+
+def test_templates_and_shapes_ignore_the_literal_values():
+    cypher = (
+        "MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(j:JugadorRival) "
+        "WHERE r.nombre CONTAINS 'Boca Unidos' RETURN j.nombre"
+    )
+    assert example_template("¿Quién es el jugador clave de Boca Unidos?", cypher) == (
+        "quien es el jugador clave de <rival>"
+    )
+    assert cypher_shape(cypher) == cypher_shape(cypher.replace("Boca Unidos", "Los Primos"))
+
+
+def test_select_skips_repeated_shapes_and_respects_k():
+    store = ExampleStore()
+    selected = store.select(
+        "¿Quién es el jugador clave de River?", "quien es el jugador clave de <rival>",
+    )
+    # Los ejemplos de jugador clave/estrella comparten forma: entra uno solo
+    assert [e["question"] for e in selected] == ["¿Quién es el jugador clave de Boca Unidos?"]
+    assert len({e["shape"] for e in store.select("¿Cuál es el riesgo de lesión?", k=2)}) <= 2
+
+
+def test_add_ignores_repeated_questions():
+    store = ExampleStore(examples=[])
+    store.add("¿Cuál es el cansancio de Martinez?", "MATCH (j:Jugador) RETURN j")
+    store.add("cual es el cansancio de martinez", "MATCH (x) RETURN x")
+    assert len(store) == 1
+    assert store.select("cansancio de Lopez")[0]["cypher"] == "MATCH (j:Jugador) RETURN j"
+
+
+def test_prompt_inputs_slice_the_schema_to_the_relevant_labels():
+    store = ExampleStore()
+    inputs, n = store.prompt_inputs(
+        "¿Cuál es el cansancio de Lopez?", STRUCTURED_SCHEMA, "cual es el cansancio de <jugador>",
+    )
+    assert n == 1
+    assert "EstadoFisico" in inputs["schema"]
+    assert "(:Jugador)-[:TIENE_ESTADO]->(:EstadoFisico)" in inputs["schema"]
+    assert "Rival" not in inputs["schema"]
+    assert "cansancio" in inputs["examples"]
+
+    # Sin schema estructurado se manda el schema completo
+    inputs, _ = store.prompt_inputs("¿Cuál es el cansancio de Lopez?", None, full_schema="TODO")
+    assert inputs["schema"] == "TODO"
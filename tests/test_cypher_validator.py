@@ -0,0 +1,108 @@
+import types
+
+import pytest
+
+from cypher_validator import CypherValidator
+from qa_pipeline import QAPipeline
+
+SCHEMA = {
+    "node_props": {
+        "Jugador": [{"property": "nombre", "type": "STRING"}, {"property": "id", "type": "STRING"}],
+        "EstadoFisico": [{"property": "cansancio", "type": "FLOAT"}],
+        "Rival": [{"property": "nombre", "type": "STRING"}],
+    },
+    "relationships": [{"start": "Jugador", "type": "TIENE_ESTADO", "end": "EstadoFisico"}],
+}
+
+
+@pytest.fixture
+def validator():
+    return CypherValidator(SCHEMA)
+
+
+def test_contains_inside_map_moves_to_where(validator):
+    check = validator.repair("MATCH (j:Jugador {nombre CONTAINS 'Mar'}) RETURN j.nombre;")
+    assert check.valid
+    assert check.query == "MATCH (j:Jugador) WHERE j.nombre CONTAINS 'Mar'\nRETURN j.nombre"
+    assert check.fixes == ["se quitó el ; final", "CONTAINS dentro de {} se pasó a WHERE"]
+
+
+def test_equals_inside_map_becomes_colon(validator):
+    check = validator.repair("MATCH (j:Jugador {nombre = 'Martinez'}) RETURN j")
+    assert check.valid
+    assert check.query == "MATCH (j:Jugador {nombre: 'Martinez'}) RETURN j"
+
+
+def test_misspelled_schema_names_are_replaced(validator):
+    check = validator.repair("MATCH (j:jugadores)-[:TIENE_ESTADOS]->(e:EstadoFisico) RETURN e.cansancio")
+    assert check.valid
+    assert check.query == "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) RETURN e.cansancio"
+    assert check.fixes == ["etiqueta jugadores -> Jugador", "relación TIENE_ESTADOS -> TIENE_ESTADO"]
+
+
+@pytest.mark.parametrize("query, error", [
+    ("MATCH (j:Jugador) DETACH DELETE j", "Solo se permiten consultas de lectura"),
+    ("SELECT * FROM Jugador", "sintaxis SQL"),
+])
+def test_unrepairable_queries_keep_an_error(validator, query, error):
+    check = validator.repair(query)
+    assert not check.valid
+    assert error in check.error
+    assert check.fixes == []
+
+
+def test_keywords_inside_strings_are_not_writes(validator):
+    assert validator.repair("MATCH (j:Jugador) WHERE j.nombre = 'DELETE' RETURN j").valid
+
+
+def test_call_interface_does_not_repair(validator):
+    valid, error = validator("MATCH (j:Jugador) RETURN j.nombre;")
+    assert not valid
+    assert "más de una sentencia" in error
+
+
+def test_names_outside_the_known_schema_are_warnings(validator):
+    check = validator.repair("MATCH (r:Rival)-[:TIENE_JUGADOR_CLAVE]->(x:JugadorRival) RETURN x.nombre")
+    assert check.valid
+    assert check.warnings == [
+        "⚠️ La etiqueta 'JugadorRival' no está en el schema conocido.",
+        "⚠️ El tipo de relación 'TIENE_JUGADOR_CLAVE' no está en el schema conocido.",
+    ]
+    check = validator.repair("MATCH (j:Jugador) RETURN j.altura")
+    assert check.valid
+    assert check.warnings == ["⚠️ La propiedad 'altura' no está en Jugador."]
+
+
+def test_pipeline_reloads_the_schema_when_the_graph_version_changes():
+    class Graph:
+        get_schema = "Jugador {nombre}"
+        get_structured_schema = SCHEMA
+
+        def refresh_schema(self):
+            # Scouting agregó los rivales y la telemetría ritmo_cardiaco
+            self.get_schema = "Jugador {nombre} ... JugadorRival {nombre}"
+            self.get_structured_schema = {
+                "node_props": {
+                    **SCHEMA["node_props"],
+                    "EstadoFisico": [{"property": "cansancio"}, {"property": "ritmo_cardiaco"}],
+                    "JugadorRival": [{"property": "nombre"}],
+                },
+                "relationships": SCHEMA["relationships"] + [
+                    {"start": "Rival", "type": "TIENE_JUGADOR_CLAVE", "end": "JugadorRival"},
+                ],
+            }
+
+    graph = Graph()
+    chain = types.SimpleNamespace(graph=graph, graph_schema=graph.get_schema)
+    validator = CypherValidator(graph.get_structured_schema)
+    pipeline = QAPipeline(chain, None, None, None, validator, schema_version=3)
+    query = "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e:EstadoFisico) RETURN e.ritmo_cardiaco"
+    assert validator.repair(query).warnings
+
+    pipeline.ensure_schema_fresh(3)
+    assert pipeline.stats["schema:recargas"] == 0
+    pipeline.ensure_schema_fresh(4)
+    assert pipeline.stats["schema:recargas"] == 1
+    assert chain.graph_schema.endswith("JugadorRival {nombre}")
+    assert validator.repair(query).warnings == []
+    assert "JugadorRival" in validator.labels
@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dataset_store import DatasetStore, load_frame, parquet_path_for
+
+ROWS = [
+    ("Presiona alto", "Táctica"),
+    ("Lesión leve en el tobillo", "Física"),
+    ("Buen pase largo", "Técnica"),
+    ("Presiona tras pérdida", "Táctica"),
+    ("Cansancio al final", "Física"),
+    ("Presiona poco", "Táctica"),
+]
+
+
+@pytest.fixture
+def store():
+    return DatasetStore(pd.DataFrame(ROWS, columns=["explicacion", "categoria"]))
+
+
+def test_counts_and_category_slices(store):
+    assert store.counts.to_dict("records") == [
+        {"Categoría": "Táctica", "Cantidad": 3},
+        {"Categoría": "Física", "Cantidad": 2},
+        {"Categoría": "Técnica", "Cantidad": 1},
+    ]
+    assert store.count("Física") == 2
+    assert store.count("Inexistente") == 0
+    assert store.page("Táctica", page=1, page_size=2)["explicacion"].tolist() == ["Presiona poco"]
+    assert store.page(page=0, page_size=2)["explicacion"].tolist() == [ROWS[0][0], ROWS[1][0]]
+
+
+def test_search_filters_within_the_category_and_is_cached(store):
+    assert store.page("Táctica", search="TRAS")["explicacion"].tolist() == ["Presiona tras pérdida"]
+    assert store.count(search="presiona") == 3
+    assert store.positions("Táctica", "tras") is store.positions("Táctica", "tras")
+
+
+def test_sample_is_taken_from_the_filter(store):
+    sample = store.sample("Física", k=5, seed=1)
+    assert sorted(sample["explicacion"]) == ["Cansancio al final", "Lesión leve en el tobillo"]
+    assert store.sample("Física", search="nada").empty
+
+
+def test_load_frame_converts_the_csv_once(tmp_path):
+    csv_path = str(tmp_path / "dataset.csv")
+    pd.DataFrame(ROWS, columns=["explicacion", "categoria"]).to_csv(csv_path, index=False)
+
+    df = load_frame(csv_path)
+    parquet_path = parquet_path_for(csv_path)
+    assert os.path.exists(parquet_path)
+    assert isinstance(df["categoria"].dtype, pd.CategoricalDtype)
+    assert df["explicacion"].tolist() == [text for text, _ in ROWS]
+
+    # Con el Parquet al día no se vuelve a convertir
+    mtime = os.path.getmtime(parquet_path)
+    load_frame(csv_path)
+    assert os.path.getmtime(parquet_path) == mtime
@@ -0,0 +1,26 @@
+import numpy as np
+
+from fuzzy_engine import ACTIONS, benchmark, infer, infer_naive
+
+
+def test_vectorized_matches_the_scalar_rules():
+    rng = np.random.default_rng(7)
+    cansancio = rng.uniform(0, 100, 500)
+    riesgo = rng.uniform(0, 100, 500)
+    minuto = rng.integers(0, 95, 500).astype(np.float64)
+
+    acciones, confianzas = infer(cansancio, riesgo, minuto)
+    naive_acciones, naive_confianzas = infer_naive(cansancio.tolist(), riesgo.tolist(), minuto.tolist())
+    assert list(acciones) == naive_acciones
+    assert np.allclose(confianzas, naive_confianzas, atol=0.01)
+    assert set(acciones) <= set(ACTIONS)
+
+
+def test_extreme_states():
+    acciones, confianzas = infer([90, 10, 50], [85, 5, 20], [80, 10, 75])
+    assert list(acciones) == ["Sustitucion inmediata", "Mantener", "Mantener con esfuerzo"]
+    assert all(0.0 <= c <= 1.0 for c in confianzas)
+
+
+def test_benchmark_reports_same_results():
+    assert benchmark(players=10, repeat=2)["mismos_resultados"]
@@ -0,0 +1,154 @@
+import time
+import types
+
+import pytest
+
+import graph_snapshot
+from graph_snapshot import GraphSnapshot
+from intent_router import route
+from qa_pipeline import QAPipeline
+
+
+class FakeGraph:
+    """Responde las consultas de exportación de graph_snapshot sobre dicts."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = []
+        self.clock = 1_000_000
+        self.queries = []
+
+    def node(self, element_id, label, **props):
+        props.setdefault("cambio", self.clock)
+        self.nodes[element_id] = {"id": element_id, "labels": [label], "props": props}
+
+    def touch(self, element_id, **props):
+        self.clock += 10_000
+        self.nodes[element_id]["props"].update(props, cambio=self.clock)
+
+    def query(self, query, params=None):
+        self.queries.append(query)
+        if query == graph_snapshot.SERVER_TIME_QUERY:
+            return [{"ahora": self.clock}]
+        if query == graph_snapshot.EXPORT_NODES_QUERY:
+            return [dict(n, props=dict(n["props"])) for n in self.nodes.values()]
+        if query == graph_snapshot.EXPORT_RELATIONSHIPS_QUERY:
+            return [{"start": a, "type": t, "end": b} for a, t, b in self.relationships]
+        if query == graph_snapshot.CHANGED_STATE_QUERY:
+            return [
+                dict(n, props=dict(n["props"])) for n in self.nodes.values()
+                if set(n["labels"]) & {"EstadoFisico", "Recomendacion"} and n["props"]["cambio"] > params["desde"]
+            ]
+        raise AssertionError(f"consulta inesperada: {query}")
+
+
+@pytest.fixture
+def graph():
+    graph = FakeGraph()
+    graph.node("j1", "Jugador", id="J01", nombre="Martinez")
+    graph.node("j2", "Jugador", id="J02", nombre="Gomez")
+    graph.node("e1", "EstadoFisico", id="E01", cansancio=75.0)
+    graph.node("e2", "EstadoFisico", id="E02", cansancio=30.0)
+    graph.node("r1", "Recomendacion", id="R01", accion="Sustitucion inmediata")
+    graph.node("r2", "Recomendacion", id="R02", accion="Mantener")
+    graph.relationships = [
+        ("j1", "TIENE_ESTADO", "e1"), ("j2", "TIENE_ESTADO", "e2"),
+        ("e1", "GENERA_RECOMENDACION", "r1"), ("e2", "GENERA_RECOMENDACION", "r2"),
+    ]
+    return graph
+
+
+def _names(rows):
+    return sorted(row["jugador"] for row in rows)
+
+
+def test_routes_from_the_copy(graph):
+    snapshot = GraphSnapshot()
+    snapshot.ensure_fresh(graph, 1, 1, wait=True)
+    assert _names(snapshot.run_route(route("¿Qué jugadores deben ser sustituidos?"), 1, 1)) == ["Martinez"]
+    assert snapshot.run_route(route("¿Cuál es el cansancio de Gomez?"), 1, 1) == [
+        {"jugador": "Gomez", "cansancio": 30.0}
+    ]
+    # Otra versión: no responde con la copia vieja
+    assert snapshot.run_route(route("¿Qué jugadores deben ser sustituidos?"), 2, 1) is None
+
+
+def test_relationships_to_unknown_nodes_are_skipped(graph):
+    graph.relationships.append(("j1", "TIENE_ESTADO", "creado-entre-consultas"))
+    snapshot = GraphSnapshot()
+    snapshot.load(graph, 1)
+    assert snapshot.stats()["relaciones_salteadas"] == 1
+    assert snapshot.stats()["relaciones"]["TIENE_ESTADO"] == 2
+
+
+def test_state_version_updates_columns_without_export(graph):
+    snapshot = GraphSnapshot()
+    snapshot.ensure_fresh(graph, 1, 1, wait=True)
+    graph.touch("e2", cansancio=88.0)
+    graph.touch("r2", accion="Sustitucion inmediata")
+    graph.queries.clear()
+
+    snapshot.ensure_fresh(graph, 1, 2)
+    assert graph_snapshot.EXPORT_NODES_QUERY not in graph.queries
+    assert snapshot.stats()["exportaciones"] == 1
+    assert snapshot.run_route(route("¿Cuál es el cansancio de Gomez?"), 1, 2) == [
+        {"jugador": "Gomez", "cansancio": 88.0}
+    ]
+    # El índice de texto de accion se vuelve a armar con el valor nuevo
+    assert _names(snapshot.run_route(route("¿Qué jugadores deben ser sustituidos?"), 1, 2)) == [
+        "Gomez", "Martinez",
+    ]
+
+
+def test_new_state_node_triggers_export(graph):
+    snapshot = GraphSnapshot()
+    snapshot.ensure_fresh(graph, 1, 1, wait=True)
+    graph.clock += 10_000
+    graph.node("e3", "EstadoFisico", id="E03", cansancio=10.0)
+    background = []
+    snapshot._load_in_background = lambda *args: background.append(args)
+    snapshot.ensure_fresh(graph, 1, 2)
+    # La exportación corre en segundo plano; mientras tanto no responde
+    assert background == [(graph, 1, 2)]
+    assert snapshot.run_route(route("¿Cuál es el cansancio de Gomez?"), 1, 2) is None
+    GraphSnapshot._load_in_background(snapshot, *background[0])
+    while snapshot._loading is not None:
+        time.sleep(0.01)
+    assert snapshot.stats()["exportaciones"] == 2
+    assert snapshot.run_route(route("¿Cuál es el cansancio de Gomez?"), 1, 2) == [
+        {"jugador": "Gomez", "cansancio": 30.0}
+    ]
+
+
+def test_pipeline_falls_back_to_cypher_when_the_copy_fails(graph):
+    class BrokenSnapshot(GraphSnapshot):
+        def ensure_fresh(self, *args, **kwargs):
+            raise KeyError("nodo desconocido")
+
+    counted = []
+    pipeline = types.SimpleNamespace(graph_snapshot=BrokenSnapshot(), graph=graph, _count=counted.append)
+    assert QAPipeline.route_from_snapshot(pipeline, route("¿Qué rivales tenemos?")) is None
+    assert counted == ["copia:errores"]
+
+
+def test_match_walks_both_directions_from_the_filtered_position(graph):
+    graph.node("b", "Rival", nombre="Boca Unidos")
+    graph.node("k1", "JugadorRival", nombre="Fromento")
+    graph.node("k2", "JugadorRival", nombre="Romero")
+    graph.relationships += [("b", "TIENE_JUGADOR_CLAVE", "k1"), ("b", "TIENE_JUGADOR_CLAVE", "k2")]
+    snapshot = GraphSnapshot()
+    snapshot.ensure_fresh(graph, 1, 1, wait=True)
+
+    # Filtro en la posición 1: se recorre la relación hacia atrás hasta el rival
+    path = graph_snapshot.INTENT_PATHS["equipo_de_jugador"]
+    assert snapshot.query(path, {"nombre": "omer"}) == [{"jugador": "Romero", "equipo": "Boca Unidos"}]
+    assert snapshot.query(path, {"nombre": "Messi"}) == []
+
+    # Sin etiqueta en el medio y con una propiedad que el nodo no tiene
+    path = graph_snapshot.PathQuery(
+        labels=["Jugador", None, "Recomendacion"],
+        rel_types=["TIENE_ESTADO", "GENERA_RECOMENDACION"],
+        filters={0: ("nombre", "Mart")},
+        returns=[("jugador", 0, "nombre"), ("cansancio", 1, "cansancio"), ("confianza", 2, "confianza")],
+    )
+    assert snapshot.query(path) == [{"jugador": "Martinez", "cansancio": 75.0, "confianza": None}]
@@ -0,0 +1,55 @@
+import multiprocessing
+
+import graph_version
+
+
+def test_starts_at_zero_and_increments():
+    assert graph_version.get_graph_version() == 0
+    assert graph_version.bump_graph_version() == 1
+    assert graph_version.bump_graph_version() == 2
+    assert graph_version.get_graph_version() == 2
+
+
+def _bump_many(path, times):
+    graph_version.VERSION_FILE = path
+    for _ in range(times):
+        graph_version.bump_graph_version()
+
+
+def test_concurrent_processes_do_not_lose_bumps():
+    processes = [
+        multiprocessing.Process(target=_bump_many, args=(graph_version.VERSION_FILE, 50))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert graph_version.get_graph_version() == 200
+
+
+class _Counters:
+    def __init__(self, **values):
+        self.nodes_created = self.nodes_deleted = 0
+        self.relationships_created = self.relationships_deleted = 0
+        self.__dict__.update(values)
+
+
+def test_property_only_writes_bump_the_state_version():
+    graph_version.bump_after_state_write(_Counters(properties_set=40))
+    assert graph_version.get_graph_version() == 0
+    assert graph_version.get_state_version() == 1
+
+
+def test_created_states_bump_the_graph_version():
+    graph_version.bump_after_state_write(_Counters(nodes_created=1, relationships_created=1))
+    graph_version.bump_after_state_write(None)
+    assert graph_version.get_graph_version() == 2
+    assert graph_version.get_state_version() == 0
+
+
+def test_reads_state():
+    assert graph_version.reads_state("MATCH (j:Jugador)-[:TIENE_ESTADO]->(e) RETURN e.cansancio")
+    assert graph_version.reads_state("MATCH (r:Recomendacion) RETURN r.accion")
+    assert not graph_version.reads_state("MATCH (j:Jugador) RETURN j.nombre, j.rol")
+    assert not graph_version.reads_state(None)
@@ -0,0 +1,65 @@
+import types
+
+import pytest
+
+from answer_cache import AnswerCache
+from intent_router import route, run_route
+from qa_pipeline import QAPipeline
+
+
+@pytest.mark.parametrize("question, intent, params", [
+    ("¿Qué jugadores deben ser sustituidos?", "sustituciones", {}),
+    ("cual es el cansancio de martinez", "cansancio_jugador", {"nombre": "Martinez"}),
+    ("¿Quién es el jugador clave de Boca Unidos?", "jugador_clave_rival", {"rival": "Boca Unidos"}),
+    ("¿Qué rivales tenemos?", "lista_rivales", {}),
+    ("Contra quién jugamos hoy?", "proximo_rival", {}),
+])
+def test_known_questions_are_routed(question, intent, params):
+    match = route(question)
+    assert match is not None
+    assert match.intent.name == intent
+    assert match.params == params
+
+
+def test_other_questions_go_to_the_chain():
+    assert route("¿Cómo juega el rival por las bandas?") is None
+
+
+def test_run_route_formats_the_rows():
+    class Graph:
+        def query(self, query, params=None):
+            self.call = (query, params)
+            return [{"jugador": "Martinez", "cansancio": 75.0}]
+
+    graph = Graph()
+    match = route("¿Cuál es el cansancio de Martinez?")
+    answer, rows = run_route(graph, match)
+    assert graph.call == (match.cypher, {"nombre": "Martinez"})
+    assert answer == "El cansancio de Martinez es 75.0."
+    assert rows == [{"jugador": "Martinez", "cansancio": 75.0}]
+    assert match.format([]) == "No encontré información de cansancio para Martinez."
+
+
+def test_unknown_captured_names_fall_back_to_the_chain():
+    class Graph:
+        get_structured_schema = {}
+
+        def query(self, query, params=None):
+            return []
+
+    class Pipeline(QAPipeline):
+        def resolve_cypher(self, question, graph_version, metrics=None):
+            return "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e) RETURN j.nombre, e.cansancio", {}, False
+
+        def execute_cypher(self, cypher, params, metrics=None):
+            return [{"j.nombre": "Martinez", "e.cansancio": 75.0}]
+
+    question = "¿Cuál es el cansancio de todos los jugadores?"
+    assert route(question).params == {"nombre": "Todos Los Jugadores"}
+    pipeline = Pipeline(
+        types.SimpleNamespace(graph=Graph()), AnswerCache(), None, None, validate_cypher=False,
+    )
+    response = pipeline.prepare(question)
+    assert response["path"] == "llm"
+    assert response["result"] == "- Nombre: Martinez · Cansancio: 75"
+    assert pipeline.stats["router:sin_filas"] == 1
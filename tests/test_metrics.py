@@ -0,0 +1,81 @@
+import urllib.request
+import uuid
+
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage
+
+from metrics import MetricsRegistry, QuestionMetrics
+
+
+def _llm_result(**generation_info):
+    generation = ChatGeneration(message=AIMessage(content="MATCH (n) RETURN n"),
+                                generation_info=generation_info)
+    return LLMResult(generations=[[generation]])
+
+
+def test_callback_measures_tagged_llm_calls_only():
+    metrics = QuestionMetrics()
+    callback = metrics.callback
+
+    run_id = uuid.uuid4()
+    callback.on_chat_model_start({}, [], run_id=run_id, tags=["dt:cypher"])
+    # Contadores de Ollama en generation_info
+    callback.on_llm_end(_llm_result(prompt_eval_count=120, eval_count=15), run_id=run_id)
+
+    # Una llamada sin tag del pipeline no se mide
+    other = uuid.uuid4()
+    callback.on_llm_start({}, [], run_id=other, tags=["otra"])
+    callback.on_llm_end(_llm_result(prompt_eval_count=999, eval_count=999), run_id=other)
+
+    with metrics.measure("neo4j"):
+        metrics.add("neo4j_filas", 3)
+    values = metrics.close()
+
+    assert values["cypher_llm_tokens_entrada"] == 120
+    assert values["cypher_llm_tokens_salida"] == 15
+    assert values["neo4j_filas"] == 3
+    assert {"cypher_llm_seg", "neo4j_seg", "total_seg"} <= set(values)
+    assert "qa_llm_seg" not in values
+    assert metrics.config("dt:qa") == {"callbacks": [callback], "tags": ["dt:qa"]}
+
+
+def test_fork_keeps_what_was_measured_so_far():
+    metrics = QuestionMetrics()
+    metrics.add("neo4j_filas", 2)
+    fork = metrics.fork()
+    fork.add("neo4j_filas", 5)
+    assert metrics.values == {"neo4j_filas": 2}
+    assert fork.values == {"neo4j_filas": 7}
+    assert fork.started == metrics.started
+
+
+def test_registry_renders_prometheus_text(tmp_path):
+    path = tmp_path / "metrics.prom"
+    registry = MetricsRegistry(path=str(path))
+    registry.observe({"neo4j_seg": 0.02, "qa_llm_tokens_entrada": 40, "neo4j_filas": 3,
+                      "total_seg": 0.3}, "llm")
+    registry.observe({"neo4j_seg": 2.0, "total_seg": 2.1}, "router")
+    registry.observe_error()
+
+    text = path.read_text(encoding="utf-8")
+    assert 'dt_preguntas_total{camino="llm"} 1' in text
+    assert 'dt_preguntas_total{camino="router"} 1' in text
+    assert 'dt_etapa_segundos_bucket{etapa="neo4j",le="0.05"} 1' in text
+    assert 'dt_etapa_segundos_bucket{etapa="neo4j",le="+Inf"} 2' in text
+    assert 'dt_llm_tokens_total{etapa="qa_llm",direccion="entrada"} 40' in text
+    assert "dt_neo4j_filas_total 3" in text
+    # El error llegó después de la última escritura del archivo
+    assert "dt_errores_total 1" in registry.render()
+
+
+def test_registry_serves_metrics_over_http():
+    registry = MetricsRegistry(path=None)
+    registry.observe({"total_seg": 0.1}, "cache")
+    server = registry.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert body == registry.render()
@@ -0,0 +1,84 @@
+import threading
+import types
+from contextlib import closing
+
+from answer_cache import AnswerCache
+from qa_pipeline import QAPipeline
+from request_pool import LLMLimiter
+
+QUESTION = "¿Cómo juega el rival por las bandas?"
+CONTEXT = [{"r.nombre": "Boca Unidos", "r.estilo": "Ataca por la izquierda"}]
+
+
+class Graph:
+    get_structured_schema = {}
+
+    def query(self, query, params=None):
+        return []
+
+
+class QAChain:
+    def __init__(self):
+        self.calls = []
+        self.finished = 0
+
+    def stream(self, inputs, config=None):
+        self.calls.append(inputs)
+        try:
+            # Algunos proveedores mandan trozos vacíos entre tokens
+            yield from ["Boca Unidos ", "", "ataca ", {"text": "por la izquierda."}]
+        finally:
+            self.finished += 1
+
+
+class Pipeline(QAPipeline):
+    def resolve_cypher(self, question, graph_version, metrics=None):
+        return "MATCH (r:Rival) RETURN r.nombre, r.estilo", {}, False
+
+    def execute_cypher(self, cypher, params, metrics=None):
+        return CONTEXT
+
+
+def test_streamed_answer_is_finished_and_cached():
+    chain = types.SimpleNamespace(graph=Graph(), qa_chain=QAChain())
+    pipeline = Pipeline(chain, AnswerCache(), None, None, validate_cypher=False,
+                        format_simple_results=False)
+
+    response = pipeline.prepare(QUESTION)
+    assert response["result"] is None
+    chunks = list(pipeline.stream_answer(QUESTION, response["intermediate_steps"]["context"],
+                                         response["_metrics"]))
+    assert chunks == ["Boca Unidos ", "ataca ", "por la izquierda."]
+    assert chain.qa_chain.calls == [{"question": QUESTION, "context": CONTEXT}]
+
+    response["result"] = "".join(chunks)
+    pipeline.finish(QUESTION, response)
+    assert response["answered_by"] == "llm"
+    assert "metrics" in response and "_metrics" not in response
+
+    # La segunda vez sale del caché, sin volver a llamar al LLM
+    cached = pipeline.prepare(QUESTION)
+    assert cached["path"] == "cache"
+    assert cached["result"] == "Boca Unidos ataca por la izquierda."
+    assert len(chain.qa_chain.calls) == 1
+
+
+def test_abandoned_stream_frees_the_llm_slot_when_closed():
+    chain = types.SimpleNamespace(graph=Graph(), qa_chain=QAChain())
+    limiter = LLMLimiter(max_concurrent=1)
+    pipeline = Pipeline(chain, AnswerCache(), None, None, validate_cypher=False, llm_limiter=limiter)
+
+    # Como un rerun de Streamlit a mitad de la respuesta
+    with closing(pipeline.stream_answer(QUESTION, CONTEXT)) as stream:
+        assert next(stream) == "Boca Unidos "
+    assert chain.qa_chain.finished == 1
+
+    # Otra llamada consigue el turno sin esperar a que se recolecte el generador
+    acquired = threading.Event()
+
+    def _other_call():
+        with limiter.slot():
+            acquired.set()
+
+    threading.Thread(target=_other_call, daemon=True).start()
+    assert acquired.wait(2)
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+from report_classifier import CategoryClassifier, load_or_train
+
+TRAINING = [
+    ("Gran partido, convirtió dos goles y asistió", "Rendimiento_Positivo"),
+    ("Excelente actuación, gol de cabeza y asistencia", "Rendimiento_Positivo"),
+    ("Muy buen rendimiento, marcó un gol", "Rendimiento_Positivo"),
+    ("Perdió la marca en el córner y llegó el gol rival", "Errores_Clave"),
+    ("Error en la salida, regaló la pelota en el área", "Errores_Clave"),
+    ("Falló un pase atrás que terminó en gol del rival", "Errores_Clave"),
+]
+
+
+def _write_dataset(path):
+    pd.DataFrame(TRAINING * 5, columns=["explicacion", "categoria"]).to_csv(path, index=False)
+
+
+def test_predicts_categories_in_batches():
+    texts, labels = zip(*TRAINING * 5)
+    classifier = CategoryClassifier.train(list(texts), list(labels))
+    assert classifier.categories == ["Errores_Clave", "Rendimiento_Positivo"]
+
+    reports = ["Marcó dos goles y una asistencia", "Regaló la pelota en la salida", None]
+    predictions = classifier.predict(reports, batch_size=2)
+    assert [c for c, _ in predictions[:2]] == ["Rendimiento_Positivo", "Errores_Clave"]
+    assert len(predictions) == 3
+    assert all(0 < confianza <= 1 for _, confianza in predictions)
+    assert classifier.predict_one(reports[0]) == predictions[0]
+
+
+def test_model_is_retrained_only_when_the_dataset_changes(tmp_path):
+    dataset = str(tmp_path / "dataset.csv")
+    model = str(tmp_path / "modelo.joblib")
+    _write_dataset(dataset)
+
+    first = load_or_train(dataset, model)
+    assert os.path.exists(model)
+    mtime = os.path.getmtime(model)
+    assert load_or_train(dataset, model).signature == first.signature
+    assert os.path.getmtime(model) == mtime
+
+    with open(dataset, "a", encoding="utf-8") as f:
+        f.write("Otro gol de tiro libre,Rendimiento_Positivo\n")
+    assert load_or_train(dataset, model).signature != first.signature
@@ -0,0 +1,87 @@
+import os
+
+import report_search
+from report_search import ReportIndex, build_index, report_id
+
+
+def _index(tmp_path):
+    index_dir = str(tmp_path / "indice")
+    build_index(
+        ["Presión alta en la salida", "Juego aéreo dominante del rival"],
+        ["tactica", "tactica"],
+        index_dir,
+    )
+    return index_dir
+
+
+def test_report_id_ignores_case_accents_and_spaces():
+    assert report_id("Juego  AÉREO dominante") == report_id("juego aereo dominante")
+    assert report_id("juego aereo") != report_id("juego rapido")
+
+
+def test_adding_the_same_report_twice_is_idempotent(tmp_path):
+    index_dir = _index(tmp_path)
+    index = ReportIndex(index_dir)
+    reporte = "El delantero 'Martinez' aprovecha los espacios a la espalda"
+    assert index.add([reporte], ["ataque"]) == 1
+    assert index.add([reporte.upper()], ["ataque"]) == 1
+    # También después de reabrir (log en disco) y de compactar
+    reopened = ReportIndex(index_dir)
+    assert reopened.add([reporte]) == 1
+    compacted = reopened.compact()
+    assert len(compacted) == 3
+    assert compacted.add([reporte]) == 0
+    assert compacted.search("delantero espacios", k=1)[0]["explicacion"] == reporte
+
+
+def test_old_log_lines_without_id_are_loaded(tmp_path):
+    index_dir = _index(tmp_path)
+    with open(f"{index_dir}/nuevos.jsonl", "w", encoding="utf-8") as f:
+        f.write('{"explicacion": "Marca poco en defensa", "categoria": null}\n')
+    index = ReportIndex(index_dir)
+    assert index.pending == 1
+    assert index.add(["marca poco en defensa"]) == 1
+    assert report_search.report_id("Marca poco en defensa") in index._delta_ids
+
+
+def test_search_ranks_both_segments(tmp_path):
+    index = ReportIndex(_index(tmp_path))
+    index.add(["El rival gana casi todo el juego aéreo en pelota parada"], ["Razón_Defensiva"])
+    results = index.search("juego aéreo del rival", k=3)
+    assert {r["origen"] for r in results} == {"archivo", "nuevo"}
+    assert [r["puntaje"] for r in results] == sorted((r["puntaje"] for r in results), reverse=True)
+    assert results[0]["explicacion"] == "Juego aéreo dominante del rival"
+    excluded = index.search("juego aéreo del rival", exclude_text="Juego aéreo dominante del rival")
+    assert "Juego aéreo dominante del rival" not in [r["explicacion"] for r in excluded]
+    assert index.search("de la y") == []
+
+
+def test_rebuild_after_the_csv_changes_keeps_added_reports(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    dataset.write_text(
+        "explicacion,categoria\n\"Presión alta en la salida\",tactica\n", encoding="utf-8",
+    )
+    index_dir = str(tmp_path / "indice")
+    index = report_search.open_or_build(str(dataset), index_dir)
+    index.add(["Marca poco en defensa"], ["Razón_Defensiva"])
+    index = index.compact()
+    index.add(["Pierde la pelota en zona de riesgo"])
+
+    # El CSV cambia (y ya trae uno de los reportes compactados)
+    dataset.write_text(
+        "explicacion,categoria\n\"Presión alta en la salida\",tactica\n"
+        "\"Juego aéreo dominante del rival\",tactica\n\"marca poco en defensa\",Razón_Defensiva\n",
+        encoding="utf-8",
+    )
+    os.utime(dataset, (0, 0))
+    rebuilt = report_search.open_or_build(str(dataset), index_dir)
+    assert len(rebuilt) == 4
+    assert rebuilt.pending == 1
+    assert rebuilt.search("pelota zona riesgo", k=1)[0]["origen"] == "nuevo"
+    assert rebuilt.add(["Marca poco en defensa", "Pierde la pelota en zona de riesgo"]) == 1
+
+    # Los compactados que el CSV no trae también sobreviven
+    dataset.write_text("explicacion,categoria\n\"Presión alta en la salida\",tactica\n", encoding="utf-8")
+    rebuilt = report_search.open_or_build(str(dataset), index_dir)
+    assert len(rebuilt) == 3
+    assert rebuilt.search("marca defensa", k=1)[0]["explicacion"] == "Marca poco en defensa"
@@ -0,0 +1,68 @@
+import threading
+
+from metrics import QuestionMetrics
+from request_pool import RequestPool
+
+
+class FakePipeline:
+    """Prepara preguntas cuando se lo indica el test, contando las llamadas."""
+
+    llm_limiter = None
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.prepared = []
+
+    def prepare(self, question):
+        self.release.wait(5)
+        self.prepared.append(question)
+        metrics = QuestionMetrics()
+        metrics.add("neo4j_seg", 0.5)
+        return {
+            "result": None,
+            "intermediate_steps": {"query": "MATCH (n) RETURN n", "context": [], "params": {}},
+            "path": "llm",
+            "_metrics": metrics,
+        }
+
+    def run(self, question):
+        response = self.prepare(question)
+        response["result"] = "respuesta"
+        response["metrics"] = response.pop("_metrics").close()
+        return response
+
+
+def test_identical_questions_in_flight_are_prepared_once():
+    pipeline = FakePipeline()
+    pool = RequestPool(pipeline, max_workers=2)
+    first = pool.submit("¿Qué jugadores deben ser sustituidos?", stage="prepare")
+    second = pool.submit("que jugadores deben ser SUSTITUIDOS", stage="prepare")
+    other_stage = pool.submit("¿Qué jugadores deben ser sustituidos?", stage="run")
+    pipeline.release.set()
+    for job in (first, second, other_stage):
+        job.wait(5)
+
+    assert second is first
+    assert other_stage is not first
+    assert len(pipeline.prepared) == 2
+    assert pool.stats()["fusionadas"] == 1
+    assert pool.stats()["en_vuelo"] == 0
+
+
+def test_each_waiter_gets_its_own_metrics():
+    pipeline = FakePipeline()
+    pipeline.release.set()
+    pool = RequestPool(pipeline)
+    job = pool.submit("¿Quién es el jugador clave?", stage="prepare")
+    job.wait(5)
+
+    mine, theirs = job.result(), job.result()
+    assert mine["_metrics"] is not theirs["_metrics"]
+    # Cada sesión redacta su propia respuesta con el LLM
+    mine["_metrics"].add("llm_respuesta_seg", 2.0)
+    theirs["_metrics"].add("llm_respuesta_seg", 3.0)
+    closed = [mine["_metrics"].close(), theirs["_metrics"].close()]
+    assert [values["llm_respuesta_seg"] for values in closed] == [2.0, 3.0]
+    assert all(values["neo4j_seg"] == 0.5 for values in closed)
+    # Lo preparado en el pool no se modifica
+    assert "llm_respuesta_seg" not in job.future.result()["_metrics"].values
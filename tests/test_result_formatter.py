@@ -0,0 +1,29 @@
+from result_formatter import format_result, result_shape
+from result_governor import SUMMARY_KEY
+
+
+def test_simple_shapes_are_answered_without_the_llm():
+    assert format_result([]) == "No encontré información en el grafo para responder esa pregunta."
+    assert format_result([{"e.cansancio": 87.5}]) == "Cansancio: 87.5."
+    assert format_result([{"j.nombre": "Messi"}, {"j.nombre": "Suárez"}, {"j.nombre": "Messi"}]) == (
+        "Nombre (2): Messi y Suárez."
+    )
+    assert format_result([
+        {"j.nombre": "Messi", "e.riesgoLesion": 70},
+        {"j.nombre": "Suárez", "e.riesgoLesion": None},
+    ]) == "- Nombre: Messi · Riesgo de lesión: 70\n- Nombre: Suárez"
+
+
+def test_id_columns_keep_their_own_label():
+    assert format_result([{"j.id": "J01"}]) == "Id: J01."
+    assert format_result([{"partido_id": "P01"}]) == "Partido: P01."
+
+
+def test_summaries_and_complex_results():
+    summary = [{SUMMARY_KEY: 42, "muestra": [{"j.nombre": "Messi"}, {"j.nombre": "Suárez"}]}]
+    assert format_result(summary) == "Nombre (42 en total, muestro 2): Messi y Suárez."
+    summary[0]["valores_frecuentes"] = {"j.nombre": []}
+    assert result_shape(summary) == "complex"
+    # Nodos completos o tablas anchas los redacta el LLM
+    assert format_result([{"j": {"nombre": "Messi"}}]) is None
+    assert format_result([{f"c{i}": i for i in range(5)}] * 2) is None
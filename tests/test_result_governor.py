@@ -0,0 +1,106 @@
+import pytest
+
+from metrics import QuestionMetrics
+from result_governor import SUMMARY_KEY, ResultGovernor, aggregate_queries, limit_query
+
+
+@pytest.mark.parametrize("query, limited", [
+    ("MATCH (j:Jugador) RETURN j.nombre", "MATCH (j:Jugador) RETURN j.nombre\nLIMIT 11"),
+    ("MATCH (j:Jugador) RETURN j.nombre LIMIT 50;", "MATCH (j:Jugador) RETURN j.nombre LIMIT 11;"),
+    ("MATCH (j:Jugador) RETURN j.nombre LIMIT 3", "MATCH (j:Jugador) RETURN j.nombre LIMIT 3"),
+    ("MATCH (j:Jugador) RETURN j.nombre LIMIT $n", "MATCH (j:Jugador) RETURN j.nombre LIMIT $n"),
+    # En un UNION el LIMIT solo tomaría la última parte
+    ("MATCH (a:Rival) RETURN a.nombre UNION MATCH (b:Jugador) RETURN b.nombre",
+     "MATCH (a:Rival) RETURN a.nombre UNION MATCH (b:Jugador) RETURN b.nombre"),
+])
+def test_limit_is_added_or_lowered_on_the_final_return(query, limited):
+    assert limit_query(query, 11) == limited
+
+
+def test_aggregate_queries_count_rows_and_property_values():
+    queries = aggregate_queries(
+        "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e) RETURN j.nombre AS jugador, count(e) AS estados"
+    )
+    prefix = "MATCH (j:Jugador)-[:TIENE_ESTADO]->(e) WITH j.nombre AS c0, count(e) AS c1\n"
+    assert queries == {
+        "total": prefix + "RETURN count(*) AS total",
+        # Las agregaciones no se resumen
+        "jugador": prefix + "WITH c0 AS valor WHERE valor IS NOT NULL\n"
+                            "RETURN valor, count(*) AS cantidad ORDER BY cantidad DESC, valor LIMIT 5",
+    }
+
+
+class FakeGraph:
+    """Grafo sin driver: query() devuelve filas según la consulta."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, query, params=None):
+        self.queries.append(query)
+        if query.endswith("RETURN count(*) AS total"):
+            return [{"total": len(self.rows)}]
+        if "WITH c0 AS valor" in query:
+            return [{"valor": "Boca Unidos", "cantidad": 30}, {"valor": "Los Primos", "cantidad": 1}]
+        if "AS cantidad" in query:
+            # Todos distintos: no aporta nada sobre la muestra
+            return [{"valor": row["j.nombre"], "cantidad": 1} for row in self.rows[:5]]
+        return self.rows[:11]
+
+
+def test_small_results_pass_through():
+    graph = FakeGraph([{"r.nombre": "Boca Unidos"}, {"r.nombre": "Los Primos"}])
+    metrics = QuestionMetrics()
+    rows = ResultGovernor().run(graph, "MATCH (r:Rival) RETURN r.nombre", metrics=metrics)
+    assert rows == graph.rows
+    assert graph.queries == ["MATCH (r:Rival) RETURN r.nombre\nLIMIT 11"]
+    assert metrics.close()["neo4j_filas"] == 2
+
+
+def test_large_results_become_a_server_side_summary():
+    graph = FakeGraph([{"equipo": "Boca Unidos", "j.nombre": f"Jugador {i}"} for i in range(31)])
+    metrics = QuestionMetrics()
+    (summary,) = ResultGovernor(max_rows=10).run(
+        graph, "MATCH (r:Rival)--(j:JugadorRival) RETURN r.nombre AS equipo, j.nombre", metrics=metrics,
+    )
+    assert summary[SUMMARY_KEY] == 31
+    assert summary["muestra"] == graph.rows[:10]
+    assert summary["valores_frecuentes"] == {
+        "equipo": [{"valor": "Boca Unidos", "cantidad": 30}, {"valor": "Los Primos", "cantidad": 1}],
+    }
+    values = metrics.close()
+    assert values["neo4j_filas"] == 10
+    assert values["neo4j_recortadas"] == 1
+
+
+def test_rows_are_capped_by_bytes_and_long_values_clipped():
+    graph = FakeGraph([{"texto": "x" * 1000} for _ in range(5)])
+    governor = ResultGovernor(max_rows=10, max_bytes=700, summarize=False)
+    rows, truncated = governor.fetch(graph, "MATCH (n) RETURN n.texto AS texto")
+    assert truncated
+    assert len(rows) == 2
+    assert rows[0]["texto"] == "x" * 300 + "…"
+
+
+def test_graphs_with_batched_reads_stop_at_the_cap():
+    class ReadingGraph:
+        def __init__(self):
+            self.read_rows = 0
+            self.calls = []
+
+        def _records(self):
+            for i in range(1000):
+                self.read_rows += 1
+                yield {"n": i}
+
+        def read(self, query, params=None, fetch_size=None, consume=list):
+            self.calls.append((query, fetch_size))
+            return consume(self._records())
+
+    graph = ReadingGraph()
+    rows, truncated = ResultGovernor(max_rows=10).fetch(graph, "MATCH (n) RETURN n.id AS n")
+    assert truncated
+    assert rows == [{"n": i} for i in range(10)]
+    assert graph.calls == [("MATCH (n) RETURN n.id AS n", 11)]
+    assert graph.read_rows == 11
@@ -0,0 +1,76 @@
+import types
+
+from schema_bootstrap import bootstrap_schema, index_usage_report, schema_statements
+
+
+class FakeSession:
+    def __init__(self, plans=None):
+        self.statements = []
+        self.plans = plans or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, statement, params=None):
+        self.statements.append(statement)
+        plan = self.plans.get(statement.removeprefix("EXPLAIN "))
+        return types.SimpleNamespace(consume=lambda: types.SimpleNamespace(plan=plan))
+
+
+class FakeDriver:
+    def __init__(self, session):
+        self._session = session
+        self.databases = []
+
+    def session(self, database=None):
+        self.databases.append(database)
+        return self._session
+
+
+def test_statements_are_idempotent_and_cover_the_lookup_keys():
+    statements = schema_statements()
+    assert all("IF NOT EXISTS" in s for s in statements)
+    assert len(set(statements)) == len(statements)
+    assert ("CREATE CONSTRAINT partido_id_unico IF NOT EXISTS "
+            "FOR (n:Partido) REQUIRE n.id IS UNIQUE") in statements
+    assert "CREATE TEXT INDEX rival_nombre_texto IF NOT EXISTS FOR (n:Rival) ON (n.nombre)" in statements
+
+
+def test_bootstrap_runs_every_statement_and_waits_only_if_asked():
+    session = FakeSession()
+    # Un Neo4jGraph de LangChain trae el driver en _driver
+    graph = types.SimpleNamespace(_driver=FakeDriver(session), _database="dt")
+    assert bootstrap_schema(graph, wait=False) == len(schema_statements())
+    assert session.statements == schema_statements()
+    # En la base del grafo, no en la por defecto del servidor
+    assert graph._driver.databases == ["dt"]
+
+    session.statements.clear()
+    driver = FakeDriver(session)
+    bootstrap_schema(driver, database="dt")
+    assert session.statements[-1] == "CALL db.awaitIndexes(300)"
+    assert driver.databases == ["dt"]
+
+
+def test_report_tells_index_seeks_from_label_scans():
+    seek = "MATCH (r:Rival) WHERE r.nombre CONTAINS $x RETURN r"
+    scan = "MATCH (e:EstadoFisico) RETURN e"
+    session = FakeSession(plans={
+        seek: {"operatorType": "ProduceResults@neo4j", "children": [
+            {"operatorType": "NodeIndexContainsScan@neo4j",
+             "args": {"Details": "TEXT INDEX r:Rival(nombre)"}},
+        ]},
+        scan: {"operatorType": "ProduceResults", "children": [{"operatorType": "NodeByLabelScan"}]},
+    })
+    report = index_usage_report(FakeDriver(session), [
+        ("rival", seek, {"x": "Boca"}),
+        ("estados", scan, {}),
+    ])
+    assert report == [
+        {"consulta": "rival", "indices": ["NodeIndexContainsScan (TEXT INDEX r:Rival(nombre))"],
+         "escaneos": [], "usa_indice": True},
+        {"consulta": "estados", "indices": [], "escaneos": ["NodeByLabelScan"], "usa_indice": False},
+    ]
@@ -0,0 +1,79 @@
+import types
+
+from cypher_cache import CypherTemplateCache
+from qa_pipeline import QAPipeline
+from schema_cache import PROPERTY_KEYS_QUERY, load_schema_cache, save_schema_cache
+
+
+class FakeGraph:
+    """Neo4jGraph mínimo: schema, refresh_schema() y CALL db.propertyKeys()."""
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.refreshes = 0
+        self._read_schema()
+
+    def _read_schema(self):
+        self.structured_schema = {
+            "node_props": {"EstadoFisico": [{"property": key, "type": "FLOAT"} for key in sorted(self.keys)]},
+            "rel_props": {},
+            "relationships": [],
+        }
+        self.schema = "EstadoFisico {" + ", ".join(sorted(self.keys)) + "}"
+
+    def refresh_schema(self):
+        self.refreshes += 1
+        self._read_schema()
+
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    def query(self, query, params=None):
+        assert query == PROPERTY_KEYS_QUERY
+        return [{"propertyKey": key} for key in self.keys]
+
+
+def test_cache_is_stale_with_another_graph_version_or_new_properties(tmp_path):
+    path = str(tmp_path / "schema.json")
+    graph = FakeGraph({"cansancio", "minuto"})
+    save_schema_cache(3, graph, path, graph.keys)
+
+    assert load_schema_cache(3, path, {"cansancio"})["schema"] == graph.schema
+    assert load_schema_cache(3, path)["structured_schema"] == graph.structured_schema
+    assert load_schema_cache(4, path, graph.keys) is None
+    assert load_schema_cache(3, path, graph.keys | {"ritmo_cardiaco"}) is None
+
+
+def test_state_writes_with_new_properties_reload_the_schema(tmp_path):
+    path = str(tmp_path / "schema.json")
+    graph = FakeGraph({"cansancio", "minuto"})
+    chain = types.SimpleNamespace(graph=graph, graph_schema=graph.schema)
+    templates = CypherTemplateCache()
+    pipeline = QAPipeline(chain, None, None, templates, None, schema_version=3, schema_cache_path=path)
+    templates.put("cansancio de [JUGADOR_0]", "MATCH (j:Jugador {nombre: $jugador_0}) RETURN j")
+
+    # Telemetría que solo actualiza valores: no se relee
+    pipeline.ensure_schema_fresh(3, 1)
+    pipeline.ensure_schema_fresh(3, 2)
+    assert graph.refreshes == 0
+    assert len(templates) == 1
+
+    # La telemetría empieza a mandar ritmo_cardiaco: solo sube la versión de estado
+    graph.keys.add("ritmo_cardiaco")
+    pipeline.ensure_schema_fresh(3, 3)
+    assert graph.refreshes == 1
+    assert "ritmo_cardiaco" in chain.graph_schema
+    assert pipeline.stats["schema:recargas"] == 1
+    # Las plantillas se generaron con el schema anterior
+    assert len(templates) == 0
+    assert load_schema_cache(3, path, graph.keys)["schema"] == graph.schema
+
+    # Una versión del grafo nueva siempre relee
+    pipeline.ensure_schema_fresh(4, 3)
+    assert graph.refreshes == 2
+    assert load_schema_cache(4, path, graph.keys) is not None
@@ -0,0 +1,100 @@
+import types
+
+import graph_version
+from scouting import (
+    WRITE_RIVALS_QUERY, extract_rival_info, ingest_reports, read_reports, update_graph_with_entities,
+)
+
+REPORTS = [
+    "Análisis de 'Los Primos': cuidado con 'Martinez' y 'Gomez'.",
+    "Análisis de 'Los Primos': 'Martinez' marca mucho.",
+    "Análisis de 'Boca Unidos': 'Pereyra' es rápido.",
+    "Sin datos del rival.",
+]
+
+
+class FakeNlp:
+    pipe_names = ["tok2vec", "morphologizer", "parser", "ner"]
+
+    def pipe(self, texts, batch_size, n_process, disable):
+        self.disabled = disable
+        for text in texts:
+            yield types.SimpleNamespace(text=text, ents=[])
+
+
+class FakeDriver:
+    """Cada execute_write guarda (consulta, filas) en writes."""
+
+    def __init__(self):
+        self.writes = []
+        self.databases = []
+
+    def session(self, database=None):
+        self.databases.append(database)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work, rows):
+        work(self, rows)
+
+    def run(self, query, rows):
+        self.writes.append((query, rows))
+        return types.SimpleNamespace(consume=lambda: None)
+
+
+def test_extract_rival_info_reads_quoted_names():
+    assert extract_rival_info([], REPORTS[0]) == ("Los Primos", ["Martinez", "Gomez"])
+    assert extract_rival_info([], REPORTS[3]) == (None, [])
+
+
+def test_ingest_merges_each_batch_into_one_write():
+    nlp, driver = FakeNlp(), FakeDriver()
+    progress = []
+    stats = ingest_reports(nlp, driver, REPORTS, write_batch_size=3,
+                           progress=lambda done, total: progress.append((done, total)), database="dt")
+
+    assert nlp.disabled == ["morphologizer", "parser"]
+    assert driver.writes == [
+        (WRITE_RIVALS_QUERY, [
+            {"rival": "Los Primos", "jugadores": ["Martinez", "Gomez"]},
+            {"rival": "Boca Unidos", "jugadores": ["Pereyra"]},
+        ]),
+    ]
+    # En la base configurada, la misma que lee el chat
+    assert driver.databases == ["dt"]
+    assert progress == [(3, 4), (4, 4)]
+    assert {k: stats[k] for k in ("reportes", "reportes_con_datos", "rivales", "jugadores")} == {
+        "reportes": 4, "reportes_con_datos": 3, "rivales": 2, "jugadores": 3,
+    }
+    assert graph_version.get_graph_version() == 1
+
+
+def test_read_reports_by_extension(tmp_path):
+    csv_path = tmp_path / "reportes.csv"
+    csv_path.write_text("fecha,texto\n2024-01-01,Uno\n2024-01-02,\n", encoding="utf-8")
+    jsonl_path = tmp_path / "reportes.jsonl"
+    jsonl_path.write_text('{"reporte": "Uno"}\n\n{"texto": "Dos"}\n{"otro": 1}\n', encoding="utf-8")
+    txt_path = tmp_path / "reportes.txt"
+    txt_path.write_text("Uno\nsigue\n\n  \nDos\n", encoding="utf-8")
+
+    assert read_reports(str(csv_path)) == ["Uno"]
+    assert read_reports(str(jsonl_path)) == ["Uno", "Dos"]
+    assert read_reports(str(txt_path)) == ["Uno\nsigue", "Dos"]
+
+
+def test_ingest_bumps_the_graph_version_once_per_file():
+    driver = FakeDriver()
+    ingest_reports(FakeNlp(), driver, REPORTS, write_batch_size=1)
+    assert len(driver.writes) == 3
+    assert graph_version.get_graph_version() == 1
+
+
+def test_single_report_bumps_the_graph_version():
+    message = update_graph_with_entities(FakeDriver(), [], REPORTS[2])
+    assert message.startswith("✅")
+    assert graph_version.get_graph_version() == 1
@@ -0,0 +1,32 @@
+import types
+
+import startup
+from startup import ChainLoader
+
+
+class FakeGraph:
+    schema = ""
+    structured_schema = {}
+
+    def refresh_schema(self):
+        self.schema = "Node properties: Jugador {nombre: STRING}"
+        self.structured_schema = {"node_props": {"Jugador": [{"property": "nombre", "type": "STRING"}]}}
+
+
+def test_schema_bootstrap_failure_does_not_block_startup(tmp_path, monkeypatch):
+    def _failing_bootstrap(graph, wait=True):
+        raise RuntimeError("ya existen nodos con el mismo id")
+
+    monkeypatch.setattr(startup, "chat_model", lambda settings, model=None: None)
+    monkeypatch.setattr(startup, "neo4j_graph", lambda settings: FakeGraph())
+    monkeypatch.setattr(startup, "bootstrap_schema", _failing_bootstrap)
+    monkeypatch.setattr(startup, "build_chain", lambda llm, graph: types.SimpleNamespace(graph=graph))
+    loader = ChainLoader(schema_cache_path=str(tmp_path / "schema.json"))
+
+    loader._connect_graph()
+
+    assert loader.graph_ready
+    assert loader.graph_error is None
+    assert "ya existen nodos" in str(loader.schema_error)
+    assert loader.chain.graph is loader.graph
+    assert loader.schema_source == "neo4j"
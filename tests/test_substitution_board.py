@@ -0,0 +1,104 @@
+import pytest
+
+import substitution_board
+from substitution_board import SubstitutionBoard
+
+
+class FakeGraph:
+    """Responde las consultas del tablero con una fila por jugador."""
+
+    def __init__(self):
+        self.clock = 1_000_000
+        self.players = {}
+        self.queries = []
+
+    def player(self, jugador_id, nombre, **state):
+        self.players[jugador_id] = {"jugador": nombre, "cambio": self.clock, **state}
+
+    def update(self, jugador_id, **state):
+        self.clock += 10_000
+        self.players[jugador_id].update(state, cambio=self.clock)
+
+    def _rows(self, since=None):
+        return [
+            {
+                "jugador_id": jugador_id, "jugador": p["jugador"], "partido_id": "P01", "minuto": 70,
+                "cansancio": p.get("cansancio"), "riesgoLesion": p.get("riesgoLesion"),
+                "accion": p.get("accion"), "confianza": p.get("confianza"), "ahora": self.clock,
+            }
+            for jugador_id, p in self.players.items()
+            if since is None or p["cambio"] > since
+        ]
+
+    def query(self, query, params=None):
+        self.queries.append(query)
+        if query == substitution_board.BOARD_QUERY:
+            return self._rows()
+        if query == substitution_board.CHANGED_BOARD_QUERY:
+            return self._rows(params["desde"])
+        if query == substitution_board.COUNT_PLAYERS_QUERY:
+            return [{"total": len(self.players)}]
+        raise AssertionError(f"consulta inesperada: {query}")
+
+
+@pytest.fixture
+def graph():
+    graph = FakeGraph()
+    graph.player("J01", "Martinez", cansancio=75.0, riesgoLesion=60.0, accion="Sustitucion inmediata")
+    graph.player("J02", "Gomez", cansancio=30.0, riesgoLesion=10.0, accion="Mantener")
+    graph.player("J03", "Perez", cansancio=50.0, riesgoLesion=20.0, accion="Mantener con esfuerzo")
+    graph.player("J04", "Lopez")
+    return graph
+
+
+def _names(board):
+    return [row["jugador"] for row in board.rows()]
+
+
+def test_rows_are_sorted_by_urgency(graph):
+    board = SubstitutionBoard()
+    assert board.ensure_fresh(graph, (1, 1)) == ["J01", "J02", "J03", "J04"]
+    assert _names(board) == ["Martinez", "Perez", "Gomez", "Lopez"]
+    assert board.substitutions() == ["Martinez"]
+
+
+def test_same_version_does_not_query(graph):
+    board = SubstitutionBoard()
+    board.ensure_fresh(graph, (1, 1))
+    graph.queries.clear()
+    assert board.ensure_fresh(graph, (1, 1)) == []
+    assert graph.queries == []
+
+
+def test_state_change_refreshes_only_changed_players(graph):
+    board = SubstitutionBoard()
+    board.ensure_fresh(graph, (1, 1))
+    # Dentro del margen de CHANGE_OVERLAP_MS se releen filas sin cambios: no cuentan
+    graph.clock += substitution_board.CHANGE_OVERLAP_MS * 2
+    graph.update("J02", cansancio=92.0, riesgoLesion=80.0, accion="Sustitucion inmediata")
+    graph.queries.clear()
+
+    assert board.ensure_fresh(graph, (1, 2)) == ["J02"]
+    assert substitution_board.BOARD_QUERY not in graph.queries
+    assert board.stats["incrementales"] == 1
+    assert _names(board)[:2] == ["Gomez", "Martinez"]
+    assert board.substitutions() == ["Gomez", "Martinez"]
+
+
+def test_new_player_rebuilds_the_board(graph):
+    board = SubstitutionBoard()
+    board.ensure_fresh(graph, (1, 1))
+    graph.player("J05", "Silva", cansancio=10.0, riesgoLesion=5.0, accion="Mantener")
+    assert board.ensure_fresh(graph, (2, 1)) == ["J05"]
+    assert board.stats["completas"] == 2
+    assert len(board.rows()) == 5
+
+
+def test_full_refresh_after_expiry(graph, monkeypatch):
+    board = SubstitutionBoard(full_refresh_seconds=60)
+    clock = [100.0]
+    monkeypatch.setattr(substitution_board.time, "monotonic", lambda: clock[0])
+    board.ensure_fresh(graph, (1, 1))
+    clock[0] += 61
+    board.ensure_fresh(graph, (1, 1))
+    assert board.stats["completas"] == 2
@@ -0,0 +1,200 @@
+import os
+import types
+
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+
+import bulk_loader
+import fuzzy_engine
+import telemetry
+from graph_version import get_graph_version, get_state_version
+from telemetry import TelemetryIngestor, parse_reading
+
+
+class FakeStore:
+    """
+    Grafo en memoria que entiende las consultas de bulk_loader (jugadores,
+    estados, recomendaciones), telemetry y fuzzy_engine.
+    """
+
+    def __init__(self):
+        self.jugadores = {}
+        self.estados = {}  # id -> props (+ jugador_id)
+        self.recomendaciones = {}  # id -> props (+ estado_id)
+
+    def run(self, query, rows=None, ids=None):
+        counters = types.SimpleNamespace(nodes_created=0, relationships_created=0)
+        records = []
+        if query == _dataset("jugadores")["query"]:
+            for row in rows:
+                self.jugadores.setdefault(row["id"], {}).update(row["props"])
+        elif query == _dataset("estados")["query"]:
+            for row in rows:
+                estado = self.estados.setdefault(row["id"], {"jugador_id": row["jugador_id"]})
+                estado.update(row["props"], partido_id=row["partido_id"])
+        elif query == _dataset("recomendaciones")["query"]:
+            for row in rows:
+                self.recomendaciones.setdefault(row["id"], {"estado_id": row["estado_id"]}).update(row["props"])
+        elif query == telemetry.WRITE_READINGS_QUERY:
+            for row in rows:
+                if row["jugador_id"] not in self.jugadores:
+                    continue
+                estado_id = next(
+                    (i for i, e in self.estados.items()
+                     if e["jugador_id"] == row["jugador_id"] and e.get("partido_id") == row["partido_id"]),
+                    None,
+                )
+                if estado_id is None:
+                    estado_id = f"{row['partido_id']}-{row['jugador_id']}"
+                    self.estados[estado_id] = {"jugador_id": row["jugador_id"], "partido_id": row["partido_id"]}
+                    counters.nodes_created += 1
+                    counters.relationships_created += 1
+                self.estados[estado_id].update(row["props"])
+                records.append({
+                    "jugador_id": row["jugador_id"], "partido_id": row["partido_id"], "estado_id": estado_id,
+                })
+        elif query == fuzzy_engine.READ_STATES_QUERY:
+            records = [
+                {"estado_id": i, "cansancio": e.get("cansancio", 0.0),
+                 "riesgoLesion": e.get("riesgoLesion", 0.0), "minuto": e.get("minuto", 0)}
+                for i, e in self.estados.items() if ids is None or i in ids
+            ]
+        elif query == fuzzy_engine.WRITE_RECOMMENDATIONS_QUERY:
+            for row in rows:
+                rec_id = next(
+                    (i for i, r in self.recomendaciones.items() if r["estado_id"] == row["estado_id"]),
+                    "R-" + row["estado_id"],
+                )
+                rec = self.recomendaciones.setdefault(rec_id, {"estado_id": row["estado_id"]})
+                rec.update(accion=row["accion"], confianza=row["confianza"])
+        else:
+            raise AssertionError(f"consulta inesperada: {query}")
+        return _Result(records, counters)
+
+    def recommendation_of(self, jugador_id):
+        return [
+            r for r in self.recomendaciones.values()
+            if self.estados[r["estado_id"]]["jugador_id"] == jugador_id
+        ]
+
+
+class _Result:
+    def __init__(self, records, counters):
+        self._records = records
+        self._summary = types.SimpleNamespace(counters=counters)
+
+    def data(self):
+        return list(self._records)
+
+    def consume(self):
+        return self._summary
+
+
+class FakeDriver:
+    def __init__(self, store):
+        self.store = store
+        self.databases = []
+
+    def session(self, database=None):
+        self.databases.append(database)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return self.store.run(query, **params)
+
+    def execute_write(self, work, *args):
+        return work(self, *args)
+
+
+def _dataset(name):
+    return next(d for d in bulk_loader.DATASETS if d["name"] == name)
+
+
+@pytest.fixture
+def driver():
+    driver = FakeDriver(FakeStore())
+    for name in ("jugadores", "estados", "recomendaciones"):
+        path = bulk_loader._find_file(bulk_loader.DEFAULT_DATA_DIR, name)
+        assert path is not None and os.path.exists(path)
+        bulk_loader.load_dataset(driver, _dataset(name), path, database="dt")
+    return driver
+
+
+def test_reading_rewrites_the_recommendation_of_the_loaded_state(driver):
+    store = driver.store
+    assert [r["accion"] for r in store.recommendation_of("J01")] == ["Sustitucion inmediata"]
+
+    ingestor = TelemetryIngestor(driver, recompute=True, database="dt")
+    ingestor._flush([parse_reading({
+        "jugador_id": "J01", "partido_id": "P01", "cansancio": 20, "riesgoLesion": 5, "minuto": 30,
+    })])
+    # Carga, lote de telemetría y recomendaciones: todo en la base configurada
+    assert set(driver.databases) == {"dt"}
+
+    # La lectura actualiza E01 (no crea otro estado) y su recomendación R01
+    assert ingestor.stats["recomendaciones_ultimo"]["estados"] == 1
+    assert sorted(store.estados) == ["E01", "E02", "E03"]
+    assert store.estados["E01"]["cansancio"] == 20.0
+    (accion,), _ = fuzzy_engine.infer_naive([20.0], [5.0], [30])
+    assert [r["accion"] for r in store.recommendation_of("J01")] == [accion]
+    assert store.recomendaciones["R01"]["accion"] == accion != "Sustitucion inmediata"
+    # Solo cambiaron propiedades: sube la versión de estado, no la del grafo
+    assert get_graph_version() == 0
+    assert get_state_version() == 2
+
+
+def test_reading_for_a_new_match_creates_a_state(driver):
+    ingestor = TelemetryIngestor(driver, recompute=True)
+    ingestor._flush([parse_reading({"jugador_id": "J02", "partido_id": "P02", "cansancio": 90, "riesgoLesion": 80})])
+    assert "P02-J02" in driver.store.estados
+    assert [r["estado_id"] for r in driver.store.recommendation_of("J02")] == ["E02", "P02-J02"]
+    assert get_graph_version() == 1
+
+
+def test_malformed_readings_are_discarded_not_raised(tmp_path):
+    ingestor = TelemetryIngestor(driver=None)
+    for raw in (
+        {"jugador_id": "J01", "partido_id": "P01", "cansancio": "alto"},
+        {"jugador_id": "J01", "partido_id": "P01", "minuto": "12.5"},
+        {"jugador_id": "J01", "partido_id": "P01", "cansancio": 50, "ts": "ayer"},
+        "[1, 2]",
+        "{no es json",
+    ):
+        assert ingestor.submit(raw) is False
+    assert ingestor.stats["descartadas"] == 5
+    assert ingestor.stats["recibidas"] == 0
+
+    path = tmp_path / "partido.jsonl"
+    path.write_text(
+        '{"jugador_id": "J01", "partido_id": "P01", "cansancio": 40, "ts": 1}\n'
+        "[1, 2]\n"
+        "{roto\n"
+        '{"jugador_id": "J02", "partido_id": "P01", "cansancio": 60, "ts": "x"}\n',
+        encoding="utf-8",
+    )
+    for raw in telemetry.replay_file(str(path), speed=0):
+        ingestor.submit(raw)
+    assert ingestor.stats["recibidas"] == 2
+    assert ingestor.stats["descartadas"] == 7
+
+
+def test_failed_batch_is_recorded_on_the_ingestor(capsys):
+    class DownDriver:
+        def session(self, database=None):
+            raise ServiceUnavailable("Neo4j no responde")
+
+    ingestor = TelemetryIngestor(DownDriver())
+    ingestor._flush([parse_reading({"jugador_id": "J01", "partido_id": "P01", "cansancio": 40})])
+
+    assert isinstance(ingestor.last_error, ServiceUnavailable)
+    assert ingestor.stats["errores"] == 1
+    assert ingestor.stats["descartadas"] == 1
+    assert ingestor.stats["lotes"] == 0
+    # Sin prints desde el hilo de escritura
+    assert capsys.readouterr().out == ""